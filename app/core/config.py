@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -27,22 +27,160 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "0320"
     SYNC_ECHO: bool = False
 
+    # 커넥션 풀 (시뮬레이션은 영속화 구간에만 커넥션을 점유)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+
     # Keys
     OPENAI_API_KEY: str | None = None
     GOOGLE_API_KEY: str | None = None  # 피해자를 Gemini로 전환할 때 필요
 
+    # OpenAI 호환 엔드포인트 풀(여러 키 / 여러 base_url / 로컬 서버). 비우면 OPENAI_API_KEY 하나만 사용
+    #   JSON 목록, 예: [{"name": "k1", "api_key": "sk-...", "weight": 2},
+    #                  {"name": "local", "base_url": "http://localhost:8001/v1", "models": ["qwen2.5-7b"]}]
+    #   base_url 생략 = OpenAI 기본, api_key 생략 = OPENAI_API_KEY(로컬 서버는 없어도 됨), models 생략 = 전 모델
+    OPENAI_ENDPOINTS: List[Dict[str, Any]] = []
+    OPENAI_ENDPOINT_EJECT_SEC: float = 30.0  # 일시 오류/인증 오류 난 엔드포인트를 빼 두는 시간
+    OPENAI_ENDPOINT_HEALTH_SEC: float = 0.0  # 주기적 헬스체크(GET /models) 간격, 0이면 끔
+
+    # LLM HTTP 커넥션 풀(OpenAI 클라이언트 공용, keep-alive 재사용)
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_SEC: float = 30.0
+
+    # LLM 응답 캐시(같은 모델·파라미터·메시지면 저장된 응답 재사용)
+    # 백엔드: off | memory(프로세스 내 LRU) | sqlite(로컬 파일) | postgres(앱 DB llm_cache 테이블)
+    LLM_CACHE_BACKEND: str = "memory"
+    # 캐시할 역할(쉼표 구분). attacker/victim은 확률적으로 두기 위해 기본 제외
+    LLM_CACHE_ROLES: str = "admin,planner,assessor"
+    LLM_CACHE_TTL_SEC: float = 7 * 24 * 3600  # 0이면 만료 없음
+    LLM_CACHE_MAX_ENTRIES: int = 5000  # 0이면 제한 없음
+    LLM_CACHE_SQLITE_PATH: str = ".llm_cache.sqlite3"
+
+    # LLM 호출 한도(토큰 버킷, provider·model·key별 RPM/TPM)
+    # 모드: off | local(프로세스 내) | file(같은 머신의 프로세스 간, 파일 잠금) | postgres(서버 간)
+    #   API와 run_cycle.py를 함께 돌릴 때는 file 또는 postgres로 한도를 공유
+    LLM_RATE_LIMIT_MODE: str = "local"
+    LLM_RPM: int = 500  # 기본 분당 요청 수
+    LLM_TPM: int = 200000  # 기본 분당 토큰 수
+    # 모델별 덮어쓰기: "gpt-4.1-mini=500:200000,o4-mini=300:100000"
+    LLM_RATE_LIMITS: str = ""
+    LLM_RATE_LIMIT_BURST_SEC: float = 10.0  # 버킷 용량 = 분당 한도의 N초분
+    LLM_RATE_LIMIT_OUTPUT_TOKENS: int = 512  # 호출 전 선차감할 예상 출력 토큰
+    LLM_RATE_LIMIT_FILE: str = ".llm_ratelimit.json"
+
+    # LLM 재시도(429/5xx/네트워크 오류만, 지수 백오프 + 지터) / 프로바이더별 서킷 브레이커
+    LLM_RETRY_MAX: int = 4
+    LLM_RETRY_BASE_SEC: float = 1.0
+    LLM_RETRY_MAX_SEC: float = 30.0
+    LLM_BREAKER_FAILURES: int = 5  # 연속 실패 N회면 차단(open)
+    LLM_BREAKER_RESET_SEC: float = 30.0  # 차단 후 N초 뒤 시험 호출 1건 허용
+    LLM_BREAKER_PROBE_TIMEOUT_SEC: float = 120.0  # 결과 없이 사라진 시험 호출을 포기하고 새로 허용
+
     # 역할별 모델명
     ATTACKER_MODEL: str = "gpt-4.1-mini"
     VICTIM_MODEL: str = "gpt-4.1-mini"
     ADMIN_MODEL: str = "gpt-4.1-mini"
+    AGENT_MODEL: str = "o4-mini"  # 플래너/사후평가/에이전트
 
-    # 피해자 프로바이더 선택: "openai" | "gemini"
+    # 피해자 프로바이더 선택: "openai" | "gemini" | "fake"
     VICTIM_PROVIDER: str = "openai"
+    # 피해자 페일오버(openai ↔ gemini): 주 프로바이더 장애 시 다른 쪽으로 전환(키가 있을 때만)
+    VICTIM_FAILOVER: bool = False
+    VICTIM_FAILOVER_MODEL: Optional[str] = None  # 비우면 gpt-4.1-mini / gemini-2.5-flash-lite
+    # 피해자 모델 캐스케이드: 작은 모델로 먼저 답하고, 트리거가 걸리면 VICTIM_MODEL로 승격
+    #   트리거: 핵심 단계(키워드) / 지침 주입 run / 작은 모델 답변 품질 불량(휴리스틱)
+    VICTIM_CASCADE: bool = False
+    VICTIM_CASCADE_MODEL: Optional[str] = None  # 비우면 gpt-4.1-nano / gemini-2.5-flash-lite
+    VICTIM_CASCADE_ON_GUIDANCE: bool = True  # 지침이 있는 run은 전부 큰 모델
+    # 현재 단계 또는 직전 공격자 발화에 이 단어가 있으면 핵심 단계(쉼표 구분)
+    VICTIM_CASCADE_KEY_TERMS: str = "송금,이체,인증번호,비밀번호,OTP,카드번호,앱 설치,링크,현금,대출"
+    VICTIM_CASCADE_MAX_CHARS: int = 300  # 작은 모델 답변이 이보다 길면 품질 불량
+
+    # 가짜 프로바이더(부하 테스트): 모델명을 "fake"로 두거나 VICTIM_PROVIDER=fake
+    LLM_FAKE_LATENCY_MEDIAN_MS: float = 600.0  # 응답 지연 중앙값(0이면 즉시)
+    LLM_FAKE_LATENCY_SIGMA: float = 0.5  # 로그정규 분포 폭(클수록 꼬리가 김)
+    LLM_FAKE_PHISHING_RATE: float = 0.3  # 가짜 판정에서 phishing=true 비율
+    LLM_FAKE_ATTACKER_TURNS: int = 5  # 공격자가 종료 선언하기 전 발화 수
+    LLM_FAKE_SEED: Optional[int] = None  # 주면 공격자/피해자 대사도 재현 가능
+    LLM_FAKE_SCRIPT_PATH: Optional[str] = None  # {"attacker": [...], "victim": [...]}
+
+    # LLM 호출 원장(llm_call_ledger)과 예산 상한(USD, 0이면 제한 없음)
+    LLM_LEDGER_ENABLED: bool = True
+    # 모델별 단가 덮어쓰기(USD / 1M 토큰 [입력, 출력]), 예: {"gpt-4.1-mini": [0.4, 1.6]}
+    LLM_PRICES: Dict[str, List[float]] = {}
+    LLM_BUDGET_PER_CASE_USD: float = 0.0  # 케이스 누적(에이전트 재실행 포함)
+    LLM_BUDGET_PER_JOB_USD: float = 0.0  # 에이전트 잡 1건
+    LLM_BUDGET_PER_CYCLE_USD: float = 0.0  # run_cycle.py 실행 1회
+
+    # 같은 요청이 동시에 진행 중이면 업스트림 호출 1번을 함께 기다림(single-flight)
+    # 대상 역할(쉼표 구분, 빈 값이면 끔). attacker/victim은 케이스마다 다른 샘플이 필요해 기본 제외
+    LLM_SINGLEFLIGHT_ROLES: str = "admin,planner,assessor,agent"
+
+    # 판정/플래너/사후평가 구조화 출력: response_format(json_schema, strict)로 스키마 강제
+    #   OpenAI 호환 서버가 json_schema를 지원하지 않으면 False(검증·재질의는 그대로 동작)
+    LLM_STRUCTURED_OUTPUT: bool = True
+    LLM_STRUCTURED_REASK: int = 1  # 스키마 검증 실패 시 재질의 횟수
+    # JSON 문법이 깨진 출력(코드펜스·스마트/안쪽 따옴표·잘림 등)은 재질의 전에 관대한 파서로 보정
+    LLM_STRUCTURED_TOLERANT: bool = True
+
+    # 실시간(증분) 판정: 피해자 턴마다 백그라운드로 판정을 갱신해 종료 직후 바로 저장
+    #   이전 판정 + 새 피해자 발화만 보냄. 실패하면 종료 시 전체 판정(summarize_case)으로 대체
+    LIVE_JUDGE: bool = False
+    LIVE_JUDGE_WORKERS: int = 8  # 동기 엔진 백그라운드 스레드 수(동시 케이스 수 정도)
+    # 규칙 기반 사전 판정: 완료 발화(송금했/설치했/인증번호+숫자)·명확한 방어만 로컬 판정, 애매하면 LLM
+    #   켜기 전에 python -m app.prejudge_agreement 로 기존 LLM 판정과의 일치율 확인
+    PREJUDGE_ENABLED: bool = False
+    # 판정 프롬프트/규칙 버전: 바꾸면 올리고 rejudge.py --not-version 으로 이전 판정만 다시 판정
+    JUDGE_PROMPT_VERSION: str = "v1"
+    # 판정 메모(judge_memo 테이블): 시나리오·피해자 발화·프롬프트 버전·모델이 같으면 이전 판정 재사용
+    #   시뮬 종료/include_judgement/run_cycle에서 같은 케이스를 거듭 판정할 때 LLM 호출 생략
+    JUDGE_MEMO_ENABLED: bool = True
 
     # 턴 제한
     MAX_OFFENDER_TURNS: int = 10
     MAX_VICTIM_TURNS: int = 10
 
+    # 시뮬레이션 엔진: True면 ainvoke 기반 비동기 엔진 사용
+    SIM_ASYNC_ENGINE: bool = False
+    # 비동기 엔진에서 한 프로세스가 동시에 돌리는 시뮬레이션 수 상한
+    SIM_CONCURRENCY: int = 8
+
+    # 대화 로그 쓰기 버퍼: N턴마다 또는 가장 오래된 턴이 N초 대기하면 일괄 INSERT
+    #   (TURN_FLUSH_EVERY=1 이면 예전처럼 턴마다 commit)
+    TURN_FLUSH_EVERY: int = 4
+    TURN_FLUSH_INTERVAL_SEC: float = 2.0
+
+    # 대화 히스토리 창: 최근 N개 메시지만 원문, 이전은 요약 1개로 접음 (0이면 전체 전송)
+    SIM_CONTEXT_KEEP_TURNS: int = 12
+    # 역할별 히스토리 토큰 상한 (0이면 제한 없음, 넘으면 원문 구간을 더 접음)
+    SIM_CONTEXT_TOKEN_BUDGET_ATTACKER: int = 0
+    SIM_CONTEXT_TOKEN_BUDGET_VICTIM: int = 0
+    # 요약 SystemMessage 자체의 토큰 상한
+    SIM_CONTEXT_SUMMARY_TOKENS: int = 400
+
+    # LLM 호출 녹화/재생: "off" | "record" | "replay"
+    #   replay는 녹화된 응답만 사용(API 호출/비용 없음, 키 불필요)
+    LLM_CASSETTE_MODE: str = "off"
+    LLM_CASSETTE_DIR: str = "cassettes"
+
+    # 공격자 첫 발화 풀 크기(시나리오·지침·모델별). 풀이 차면 재사용, 0이면 사용 안 함
+    #   켜면 첫 발화의 다양성이 풀 크기로 제한됨 → 기본은 끄고 run_cycle(--opening-pool)에서만 사용
+    OPENING_CACHE_POOL_SIZE: int = 0
+
+    # 중단된 시뮬레이션 재개: 마지막 턴 저장 후 N초 이상 멈춘 running 케이스를 이어서 실행
+    #   재개 표식(턴 payload.max_rounds)이 있는 케이스만 대상. 기본은 끔(켜면 API 기동 시 주기 스위프)
+    SIM_RESUME_ON_STARTUP: bool = False
+    SIM_RESUME_STALE_SEC: float = 900.0
+    SIM_RESUME_SWEEP_INTERVAL_SEC: float = 300.0
+    SIM_RESUME_MAX_CASES: int = 20  # 스위프 1회당 최대 재개 수
+
+    # Monte Carlo(같은 페어 N회 반복): 신뢰구간 반폭이 이 값 이하면 조기 중단
+    MC_CI_HALF_WIDTH: float = 0.1
+    MC_MIN_SAMPLES: int = 10  # 조기 중단 판단 전 최소 표본 수
+    MC_MAX_SAMPLES: int = 200  # 요청당 최대 실행 수
+
     @property
     def sync_dsn(self) -> str:
         if self.DATABASE_URL:           # ← .env에 있으면 그걸 사용
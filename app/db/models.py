@@ -82,7 +82,7 @@
 # app/db/models.py
 from __future__ import annotations
 from sqlalchemy import (Column, Integer, String, Boolean, Text, ForeignKey,
-                        TIMESTAMP, Index, UniqueConstraint)
+                        TIMESTAMP, Index, UniqueConstraint, Float)
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from uuid import uuid4
@@ -132,6 +132,12 @@ class AdminCase(Base):
         TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc))
     completed_at: Mapped[datetime | None] = mapped_column(
         TIMESTAMP(timezone=True), nullable=True)
+    # 판정에 쓴 모델("rule"=규칙 사전 판정)과 프롬프트 버전(JUDGE_PROMPT_VERSION) — 재판정 대상 선택용
+    judge_model: Mapped[str | None] = mapped_column(String(100),
+                                                    nullable=True)
+    judge_version: Mapped[str | None] = mapped_column(String(40),
+                                                      nullable=True,
+                                                      index=True)
 
 
 # 4) 대화 로그 (하이브리드: TEXT + JSONB)
@@ -231,3 +237,70 @@ class PersonalizedPrevention(Base):
 
     __table_args__ = (Index("ix_pp_case_run_victim", "case_id", "run",
                             "victim_id"), )
+
+
+# 8) LLM 응답 캐시 — (모델, 파라미터, 렌더링된 메시지) 해시 → 응답
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    role: Mapped[str | None] = mapped_column(String(20))
+    model: Mapped[str | None] = mapped_column(String(100))
+    content: Mapped[str] = mapped_column(Text)
+    hits: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc))
+    last_used_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        index=True)
+
+
+# 9) LLM 호출 한도(토큰 버킷) — 프로세스 간 공유용 (provider:model:key 단위)
+class LLMRateBucket(Base):
+    __tablename__ = "llm_rate_bucket"
+    key: Mapped[str] = mapped_column(String(200), primary_key=True)
+    requests: Mapped[float] = mapped_column(Float, nullable=False)  # 남은 요청 수
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)  # 남은 토큰 수
+    updated_at: Mapped[float] = mapped_column(Float,
+                                              nullable=False)  # epoch 초
+
+
+# 10) LLM 호출 원장 — 호출 1건당 1행(토큰·지연·비용)
+class LLMCallLedger(Base):
+    __tablename__ = "llm_call_ledger"
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True),
+                                     primary_key=True,
+                                     default=uuid4)
+    case_id: Mapped[UUID | None] = mapped_column(UUID(as_uuid=True),
+                                                 nullable=True,
+                                                 index=True)
+    run: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    job_id: Mapped[str | None] = mapped_column(String(64),
+                                               nullable=True,
+                                               index=True)
+    batch_id: Mapped[str | None] = mapped_column(String(64),
+                                                 nullable=True,
+                                                 index=True)
+    role: Mapped[str] = mapped_column(String(20))
+    model: Mapped[str] = mapped_column(String(100))
+    prompt_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    latency_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    cost_usd: Mapped[float] = mapped_column(Float, default=0.0)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        index=True)
+
+
+# 11) 판정 메모 — (판정 프롬프트(시나리오+피해자 발화), 프롬프트 버전, 모델) 해시 → 판정
+class JudgeMemo(Base):
+    __tablename__ = "judge_memo"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    judge_model: Mapped[str] = mapped_column(String(100))
+    judge_version: Mapped[str] = mapped_column(String(40))
+    phishing: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    evidence: Mapped[str] = mapped_column(Text)
+    hits: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc))
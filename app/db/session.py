@@ -5,15 +5,27 @@
 # engine = create_engine(settings.sync_dsn, echo=settings.SYNC_ECHO)
 # SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+import threading
+import time
+from typing import Any, Dict
 
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from app.core.config import settings
 
+_pool_kwargs: Dict[str, Any] = {}
+if not settings.sqlalchemy_url.startswith("sqlite"):
+    _pool_kwargs = dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
 
 engine = create_engine(settings.sqlalchemy_url,
                        echo=settings.SYNC_ECHO,
-                       pool_pre_ping=True)
+                       pool_pre_ping=True,
+                       **_pool_kwargs)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
@@ -36,3 +48,88 @@ def try_get_db():
     except Exception:
         # DB 미설정/연결 실패 시 None
         yield None
+
+
+def release_connection(db: Session) -> None:
+    """
+    열린 트랜잭션을 끝내 커넥션을 풀에 반납한다.
+    LLM 호출처럼 오래 기다리기 직전에 호출(세션 객체는 계속 사용 가능).
+    """
+    if db.in_transaction():
+        db.commit()
+
+
+# ── 커넥션 풀 사용량 계측 ─────────────────────────────
+class _PoolStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.total_hold_sec = 0.0
+        self.max_hold_sec = 0.0
+
+    def on_checkout(self, rec) -> None:
+        rec.info["checkout_at"] = time.monotonic()
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out,
+                                        self.checked_out)
+
+    def on_checkin(self, rec) -> None:
+        started = rec.info.pop("checkout_at", None)
+        held = (time.monotonic() - started) if started is not None else 0.0
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+            self.total_hold_sec += held
+            self.max_hold_sec = max(self.max_hold_sec, held)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            avg_hold = (self.total_hold_sec /
+                        self.checkouts) if self.checkouts else 0.0
+            return {
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "avg_hold_ms": round(avg_hold * 1000, 1),
+                "max_hold_ms": round(self.max_hold_sec * 1000, 1),
+            }
+
+
+_pool_stats = _PoolStats()
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_conn, rec, proxy):
+    _pool_stats.on_checkout(rec)
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_conn, rec):
+    _pool_stats.on_checkin(rec)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """커넥션 풀 현황 + 점유율(utilisation = 사용 중 / 최대 커넥션 수)."""
+    snap = _pool_stats.snapshot()
+    pool = engine.pool
+    size = overflow_cap = capacity = None
+    if isinstance(pool, QueuePool) and _pool_kwargs:
+        size = pool.size()
+        # create_engine에 넘긴 설정값(DB_MAX_OVERFLOW) 기준
+        overflow_cap = max(0, int(_pool_kwargs["max_overflow"]))
+        capacity = size + overflow_cap
+    snap.update({
+        "pool_size": size,
+        "max_overflow": overflow_cap,
+        "capacity": capacity,
+        "utilisation": (round(snap["checked_out"] / capacity, 3)
+                        if capacity else None),
+        "peak_utilisation": (round(snap["peak_checked_out"] / capacity, 3)
+                             if capacity else None),
+        "status": pool.status(),
+    })
+    return snap
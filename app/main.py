@@ -1,4 +1,6 @@
 # app/main.py
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -12,7 +14,11 @@ from app.db.base import Base
 from app.routers import health, offenders, victims, conversations, admin_cases
 from app.routers import conversations_read, simulator as simulator_router
 from app.routers import agent as agent_router
+from app.routers import metrics as metrics_router
 from app.routers.personalized import router as personalized_router
+from app.services.sim_recovery import sweeper_loop
+from app.services.llm_providers import close_llm_clients, aclose_llm_clients
+from app.services.llm_endpoints import endpoint_health_loop
 
 Base.metadata.create_all(bind=engine)
 
@@ -44,10 +50,32 @@ app.include_router(conversations, prefix=settings.API_PREFIX)
 app.include_router(admin_cases, prefix=settings.API_PREFIX)
 app.include_router(personalized_router, prefix="/api")
 
-# 이 3 개는 아직 모듈이므로 .router 필요
+# 아래 모듈들은 .router 필요
 app.include_router(conversations_read.router, prefix=settings.API_PREFIX)
 app.include_router(simulator_router.router, prefix=settings.API_PREFIX)
 app.include_router(agent_router.router, prefix=settings.API_PREFIX)
+app.include_router(metrics_router.router, prefix=settings.API_PREFIX)
+
+
+@app.on_event("startup")
+async def start_resume_sweeper():
+    # 워커가 죽어 running으로 남은 케이스를 주기적으로 찾아 이어서 실행
+    if settings.SIM_RESUME_ON_STARTUP:
+        app.state.resume_sweeper = asyncio.create_task(sweeper_loop())
+
+
+@app.on_event("startup")
+async def start_endpoint_health_checks():
+    # OpenAI 호환 엔드포인트 풀 능동 헬스체크(수동 제외/복귀는 호출 결과로 항상 동작)
+    if settings.OPENAI_ENDPOINTS and settings.OPENAI_ENDPOINT_HEALTH_SEC > 0:
+        app.state.endpoint_health = asyncio.create_task(endpoint_health_loop())
+
+
+@app.on_event("shutdown")
+async def close_llm_pools():
+    # 공용 LLM 커넥션 풀 정리(비동기 풀은 이 루프 것, 동기 풀은 프로세스 공용)
+    await aclose_llm_clients()
+    close_llm_clients()
 
 
 @app.get("/")
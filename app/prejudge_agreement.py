@@ -0,0 +1,78 @@
+# app/prejudge_agreement.py
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from sqlalchemy import or_
+
+from app.db import models as m
+from app.db.session import SessionLocal
+from app.services.prejudge import PREJUDGE_TAG, agreement
+
+# 규칙 기반 사전 판정(PREJUDGE_ENABLED) 검증용:
+# DB에 저장된 LLM 판정(admincase.phishing)과 규칙 판정의 일치율을 계산
+#   python -m app.prejudge_agreement --limit 2000 --show 10
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--limit", type=int, default=0, help="최근 N건만(0이면 전체)")
+    p.add_argument("--show", type=int, default=5, help="불일치 예시 출력 개수")
+    p.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    return p.parse_args()
+
+
+def load_corpus(db, limit: int = 0) -> List[Tuple[bool, List[Tuple[int, str]]]]:
+    """LLM이 판정한 완료 케이스 + 피해자 발화(규칙 판정으로 저장된 케이스는 제외)."""
+    q = (db.query(m.AdminCase.id, m.AdminCase.phishing).filter(
+        m.AdminCase.phishing.isnot(None),
+        m.AdminCase.status == "completed",
+        or_(m.AdminCase.evidence.is_(None),
+            ~m.AdminCase.evidence.startswith(PREJUDGE_TAG)),
+    ).order_by(m.AdminCase.completed_at.desc()))
+    if limit:
+        q = q.limit(limit)
+    cases = q.all()
+    if not cases:
+        return []
+
+    turns: Dict[object, List[Tuple[int, str]]] = defaultdict(list)
+    logs = (db.query(m.ConversationLog.case_id, m.ConversationLog.turn_index,
+                     m.ConversationLog.content).filter(
+                         m.ConversationLog.case_id.in_([c.id for c in cases]),
+                         m.ConversationLog.role == "victim").order_by(
+                             m.ConversationLog.case_id,
+                             m.ConversationLog.turn_index.asc()))
+    for case_id, turn_index, content in logs.yield_per(1000):
+        turns[case_id].append((turn_index, content))
+    return [(c.phishing, turns[c.id]) for c in cases if turns[c.id]]
+
+
+def main():
+    args = parse_args()
+    db = SessionLocal()
+    try:
+        report = agreement(load_corpus(db, args.limit), show=args.show)
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    cf = report["confusion"]
+    print(f"[PREJUDGE] corpus={report['cases']} "
+          f"local={report['local']} ({report['local_ratio'] * 100:.1f}%) "
+          f"agreement={report['agree']}/{report['local']} "
+          f"({report['agreement'] * 100:.1f}%)")
+    print(f"  rule=true : llm=true {cf['tt']} / llm=false {cf['tf']}")
+    print(f"  rule=false: llm=true {cf['ft']} / llm=false {cf['ff']}")
+    print(f"  ambiguous(→LLM): {report['ambiguous']}")
+    for d in report["disagreements"]:
+        print(f"  - llm={d['llm']} rule={d['rule']}: {d['evidence']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,11 @@ from app.services.agent.orchestrator import (
     run_two_bot_simulation,  # ★ 재시뮬
     postrun_assess_and_save,  # ★ 사후평가 + PersonalizedPrevention 저장
 )
-from app.services.simulation import run_two_bot_simulation
+from app.services.simulation import (
+    run_two_bot_simulation,
+    run_two_bot_simulation_async,
+)
+from app.core.config import settings
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -96,7 +100,11 @@ async def run_agent_async(
                 guideline=g.get("text") or "",
                 case_scenario={},  # 시나리오 보존
             )
-            case_id2, total_turns = run_two_bot_simulation(db_local, args)
+            if settings.SIM_ASYNC_ENGINE:
+                case_id2, total_turns = await run_two_bot_simulation_async(
+                    db_local, args)
+            else:
+                case_id2, total_turns = run_two_bot_simulation(db_local, args)
 
             # 3) (run=2) 사후평가 + PersonalizedPrevention 저장
             final = postrun_assess_and_save(
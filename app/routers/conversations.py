@@ -1,5 +1,6 @@
 # app/routers/conversations.py
 from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import timezone, datetime
 from zoneinfo import ZoneInfo
@@ -12,14 +13,24 @@ from app.schemas.conversation import (
     ConversationRunRequest,
     ConversationRunLogs,
     ConversationLogOut,
+    ConversationForkBody,
+    ConversationForkResult,
+    MonteCarloBody,
+)
+from app.services.simulation import (
+    run_two_bot_simulation,
+    run_two_bot_simulation_async,
+    fork_case,
+    resume_simulation,
 )
-from app.services.simulation import run_two_bot_simulation
 from app.services.conversations_read import fetch_logs_by_case
+from app.services.monte_carlo import run_monte_carlo
 from app.services.admin_summary import summarize_case
 
-import uuid, asyncio
+import uuid, asyncio, json
 from starlette.concurrency import run_in_threadpool
 from app.db.session import SessionLocal
+from app.core.config import settings
 
 router = APIRouter(prefix="/conversations", tags=["conversations"])
 KST = ZoneInfo("Asia/Seoul")
@@ -66,10 +77,14 @@ async def _run_simulation_job(job_id: str, req: ConversationRunRequest):
         if "max_rounds" not in args and "max_turns" in args:
             args["max_rounds"] = args["max_turns"]
 
-        # run_two_bot_simulation 이 동기라고 가정 → 스레드풀에서 실행
-        case_id, total_turns = await run_in_threadpool(run_two_bot_simulation,
-                                                       db,
-                                                       SimpleNamespace(**args))
+        if settings.SIM_ASYNC_ENGINE:
+            # 비동기 엔진: 이벤트 루프에서 직접 실행(스레드 점유 없음)
+            case_id, total_turns = await run_two_bot_simulation_async(
+                db, SimpleNamespace(**args))
+        else:
+            # 동기 엔진 → 스레드풀에서 실행
+            case_id, total_turns = await run_in_threadpool(
+                run_two_bot_simulation, db, SimpleNamespace(**args))
 
         JOBS[job_id].update({
             "status": "done",
@@ -110,6 +125,35 @@ async def run_conversation_async(
     return {"job_id": job_id, "status": "accepted"}  # 필요시 202 사용 가능
 
 
+# ✅ NEW: Monte Carlo — 같은 페어 N회 동시 실행, 끝나는 대로 NDJSON 한 줄씩 스트리밍
+@router.post("/monte-carlo/{offender_id}/{victim_id}")
+async def run_monte_carlo_stream(
+    offender_id: int,
+    victim_id: int,
+    payload: MonteCarloBody,
+):
+    mc = {"n", "concurrency", "ci_half_width", "min_samples", "confidence"}
+    req = ConversationRunRequest(offender_id=offender_id,
+                                 victim_id=victim_id,
+                                 **payload.model_dump(exclude=mc))
+    args = req.model_dump()
+    if "max_rounds" not in args and "max_turns" in args:
+        args["max_rounds"] = args["max_turns"]
+
+    async def _events():
+        async for ev in run_monte_carlo(
+                SimpleNamespace(**args),
+                min(payload.n, settings.MC_MAX_SAMPLES),
+                concurrency=payload.concurrency,
+                ci_half_width=payload.ci_half_width,
+                min_samples=payload.min_samples,
+                confidence=payload.confidence,
+        ):
+            yield json.dumps(ev, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
+
+
 # ✅ NEW: 잡 상태 조회 (클라이언트 폴링용)
 @router.get("/job/{job_id}")
 def get_job(job_id: str):
@@ -181,10 +225,67 @@ def run_conversation_with_ids(
 
 
 # ✅ NEW: (선택) 증분 조회 tail 엔드포인트 — 실시간 폴링에 유용
-from fastapi import Query
+from fastapi import Query, HTTPException
 from uuid import UUID
 
 
+# ✅ NEW: 분기 이어서 실행 잡(새 케이스를 끝까지 실행하고 판정)
+async def _run_fork_job(job_id: str, case_id: UUID):
+    db = SessionLocal()
+    try:
+        _, _, total_turns = await run_in_threadpool(resume_simulation, db,
+                                                    case_id)
+        JOBS[job_id].update({
+            "status": "done",
+            "total_turns": int(total_turns),
+        })
+    except Exception as e:
+        JOBS[job_id].update({
+            "status": "error",
+            "error": f"{e}",
+        })
+    finally:
+        db.close()
+
+
+# ✅ NEW: 분기 실행 — 앞부분은 새 케이스로 복사(LLM 재호출 없음), 이어서 실행은 잡으로(폴링)
+@router.post("/{case_id}/fork", response_model=ConversationForkResult)
+async def fork_conversation(
+        case_id: UUID,
+        payload: ConversationForkBody,
+        response: Response,
+        db: Session = Depends(get_db),
+):
+    try:
+        new_case_id, stored = await run_in_threadpool(
+            fork_case,
+            db,
+            case_id,
+            run=payload.run,
+            turn_index=payload.turn_index,
+            inject_text=payload.inject_text,
+            max_rounds=payload.max_turns,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_id = str(uuid.uuid4())
+    JOBS[job_id] = {"status": "running", "case_id": str(new_case_id)}
+    asyncio.create_task(_run_fork_job(job_id, new_case_id))
+
+    response.headers["Location"] = f"/api/conversations/job/{job_id}"
+    response.headers["Retry-After"] = "1"
+    return {
+        "case_id": new_case_id,
+        "forked_from_case_id": case_id,
+        "run": payload.run,
+        "turn_index": payload.turn_index,
+        "stored_turns": stored,
+        "job_id": job_id,
+        "status": "accepted",
+    }
+
+
 @router.get("/{case_id}/tail", response_model=ConversationRunLogs)
 def get_conversation_tail(
         case_id: UUID,
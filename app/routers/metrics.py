@@ -0,0 +1,162 @@
+# app/routers/metrics.py
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.db.session import pool_stats
+from app.utils.deps import get_db
+from app.services.opening_cache import opening_cache
+from app.services.llm_providers import llm_client_stats
+from app.services.llm_cache import llm_cache
+from app.services.llm_ratelimit import rate_limiter
+from app.services.llm_resilience import resilience_stats
+from app.services.llm_cost import cost_summary
+from app.services.llm_singleflight import single_flight
+from app.services.llm_cascade import cascade_stats
+from app.services.llm_endpoints import endpoint_pool
+from app.services.llm_structured import structured_stats
+from app.services.prejudge import prejudge_stats
+from app.services.judge_memo import judge_memo_stats
+from app.services.turn_metrics import turn_latency_percentiles
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/db-pool")
+def get_db_pool_stats():
+    """
+    커넥션 풀 점유 현황.
+    - checked_out / peak_checked_out: 현재·최대 동시 사용 커넥션 수
+    - avg_hold_ms / max_hold_ms: 커넥션 1회 점유 시간(짧을수록 LLM 대기 중 미점유)
+    - utilisation: 사용 중 / (pool_size + max_overflow)
+    """
+    return pool_stats()
+
+
+@router.get("/opening-cache")
+def get_opening_cache_stats():
+    """공격자 첫 발화 풀 재사용 현황(hits = 첫 LLM 왕복을 건너뛴 실행 수)."""
+    return opening_cache.stats()
+
+
+@router.get("/llm-clients")
+def get_llm_client_stats():
+    """공용 LLM 클라이언트 재사용 현황(created가 거의 늘지 않아야 정상)."""
+    return llm_client_stats()
+
+
+@router.get("/llm-endpoints")
+async def get_llm_endpoint_stats(probe: bool = Query(
+    False, description="true면 지금 헬스체크(GET /models) 후 반환")):
+    """
+    OpenAI 호환 엔드포인트 풀(OPENAI_ENDPOINTS)별 진행 중 요청 수 / 호출·오류 수 / 건강 상태 / 평균 지연.
+    풀을 쓰지 않으면 빈 목록
+    """
+    if probe and endpoint_pool.enabled():
+        await endpoint_pool.check_health()
+    return endpoint_pool.stats()
+
+
+@router.get("/llm-cache")
+def get_llm_cache_stats():
+    """LLM 응답 캐시 적중 현황(프로세스 기준 카운터)."""
+    return llm_cache.stats()
+
+
+@router.get("/llm-rate-limit")
+def get_llm_rate_limit_stats():
+    """
+    토큰 버킷 한도기 현황(이 프로세스 기준, provider:model:key별).
+    throttled / wait_sec: 한도 때문에 기다린 호출 수·누적 대기 시간
+    """
+    return rate_limiter.stats()
+
+
+@router.get("/llm-resilience")
+def get_llm_resilience_stats():
+    """
+    프로바이더별 서킷 브레이커 상태(closed/open/half_open)와 재시도 현황.
+    retries / errors_<분류> / short_circuited(차단 중 거절) / failovers
+    """
+    return resilience_stats()
+
+
+@router.get("/llm-single-flight")
+def get_llm_single_flight_stats():
+    """
+    동시에 진행 중이던 같은 요청을 합친 현황.
+    calls(업스트림 호출) / coalesced(합쳐져 아낀 호출) / saved_ratio / 역할별
+    """
+    return single_flight.stats()
+
+
+@router.get("/llm-structured")
+def get_llm_structured_stats():
+    """
+    판정/플래너/사후평가 출력의 스키마 검증 현황(역할별).
+    calls / repaired(관대한 파서로 복구) / parse_failures / parse_failure_rate / reasks / reask_ok / failed
+    """
+    return structured_stats()
+
+
+@router.get("/prejudge")
+def get_prejudge_stats():
+    """
+    규칙 기반 사전 판정(PREJUDGE_ENABLED) 현황.
+    local_true / local_false(LLM 생략) / ambiguous(LLM으로 넘김) / local_ratio
+    """
+    return prejudge_stats()
+
+
+@router.get("/judge-memo")
+def get_judge_memo_stats():
+    """
+    판정 메모(JUDGE_MEMO_ENABLED) 현황(이 프로세스 기준).
+    hits(LLM 판정 생략) / misses / errors(DB 오류로 메모 없이 진행) / hit_ratio
+    """
+    return judge_memo_stats()
+
+
+@router.get("/victim-cascade")
+def get_victim_cascade_stats():
+    """
+    피해자 모델 캐스케이드(VICTIM_CASCADE) 누적 현황. run별 값은 마지막 턴 payload.run_stats.cascade(실행 로그의 [CASCADE] 줄).
+    escalation_rate / escalations(사유별) / saved_cost_usd / saved_latency_ms(큰 모델 평균 지연 기준 추정)
+    """
+    return cascade_stats()
+
+
+@router.get("/turns")
+def get_turn_metrics(
+        since_minutes: float = Query(60.0, gt=0, description="최근 N분"),
+        db: Session = Depends(get_db),
+):
+    """
+    턴별 계측값(ConversationLog.payload.metrics)의 역할·모델별 p50/p95/p99.
+    wall_ms / ttft_ms / prompt_tokens / completion_tokens / db_last_flush_ms
+    """
+    return {
+        "since_minutes": since_minutes,
+        "groups": turn_latency_percentiles(db, since_minutes=since_minutes),
+    }
+
+
+@router.get("/llm-cost")
+def get_llm_cost(
+        since_minutes: Optional[float] = Query(None, gt=0, description="최근 N분"),
+        case_id: Optional[UUID] = Query(None),
+        job_id: Optional[str] = Query(None),
+        batch_id: Optional[str] = Query(None, description="run_cycle 실행 ID"),
+        db: Session = Depends(get_db),
+):
+    """
+    LLM 호출 원장(llm_call_ledger)의 모델·역할별 호출 수 / 토큰 / 평균 지연 / 비용(USD).
+    cassette 재생·응답 캐시 적중은 실제 호출이 아니므로 포함되지 않음
+    """
+    return cost_summary(db,
+                        since_minutes=since_minutes,
+                        case_id=case_id,
+                        job_id=job_id,
+                        batch_id=batch_id)
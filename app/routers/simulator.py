@@ -5,13 +5,14 @@ from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List, Tuple
 from uuid import UUID, uuid4
 from datetime import datetime, timezone
-import os, json
+import os
 
 # DB / Models
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db import models as m
 from app.db.session import try_get_db
+from app.utils.tolerant_json import tolerant_loads
 
 # (선택) 기존 OpenAI 더미 호출 그대로 사용
 from openai import OpenAI
@@ -122,7 +123,7 @@ def _ask_llm(target: str, inject_msg: str,
     )
     text = resp.choices[0].message.content.strip()
     try:
-        data = json.loads(text)
+        data = tolerant_loads(text)
         return {
             "offender": str(data.get("offender", "")).strip() or "(가상) 공격자 멘트",
             "victim": str(data.get("victim", "")).strip() or "(가상) 피해자 멘트",
@@ -37,6 +37,8 @@ class ConversationRunRequest(BaseModel):
     max_turns: int = 30
     agent_mode: Literal["off", "admin", "police"] = "off"
     case_scenario: Optional[Dict[str, Any]] = None
+    # LLM cassette 이름(replay 시 녹화했던 case_id). 없으면 새 case_id 사용
+    cassette_id: Optional[str] = None
 
     @property
     def max_rounds(self) -> int:
@@ -47,6 +49,33 @@ class ConversationRunRequest(BaseModel):
         return self.case_scenario
 
 
+# 🔹 Monte Carlo: 같은 페어를 N번 독립 실행(각각 새 케이스)해 피싱 성공률 추정
+class MonteCarloBody(ConversationRunBody):
+    n: int = Field(30, ge=1)
+    concurrency: Optional[int] = Field(None, ge=1)
+    ci_half_width: Optional[float] = Field(None, ge=0)  # 0이면 조기 중단 안 함
+    min_samples: Optional[int] = Field(None, ge=1)
+    confidence: float = Field(0.95, gt=0, lt=1)
+
+
+# 🔹 분기 실행: (case_id, run)의 turn_index 지점부터 새 run으로 이어가기
+class ConversationForkBody(BaseModel):
+    run: int = 1
+    turn_index: int = Field(..., ge=1)
+    inject_text: Optional[str] = None  # turn_index 턴에 넣을 대체 발화
+    max_turns: Optional[int] = Field(None, ge=1)  # 없으면 원본 run의 값
+
+
+class ConversationForkResult(BaseModel):
+    case_id: UUID  # 분기로 새로 만든 케이스(판정도 여기에 저장)
+    forked_from_case_id: UUID
+    run: int
+    turn_index: int
+    stored_turns: int
+    job_id: str  # 이어서 실행 상태: GET /conversations/job/{job_id}
+    status: str
+
+
 class ConversationRunResult(BaseModel):
     case_id: UUID
     total_turns: int
@@ -0,0 +1,77 @@
+# app/schemas/llm_outputs.py
+from __future__ import annotations
+
+from typing import List, Literal
+
+from pydantic import BaseModel, ConfigDict
+
+# 판정/플래너/사후평가 LLM 출력 스키마
+# - OpenAI structured output(json_schema, strict)에 그대로 쓰이므로 모든 필드는 필수(기본값 없음)
+# - 검증 시 모르는 키는 무시(extra="ignore")
+
+Outcome = Literal["attacker_success", "attacker_fail"]
+GuidanceType = Literal["P", "A"]
+Category = Literal["institution_impersonation", "acquaintance_impersonation",
+                   "loan_scam", "extortion_threat"]
+
+
+class _Out(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+class JudgeVerdict(_Out):
+    """summarize_case(PROMPT_LLM_ONLY) 출력."""
+    phishing: bool
+    evidence: str
+
+
+class Trace(_Out):
+    decision_notes: List[str]
+
+
+class PlannerGuidance(_Out):
+    type: GuidanceType
+    category: Category
+    title: str
+    text: str
+    sample_lines: List[str]
+    rationale: str
+
+
+class MethodsUsedAppend(_Out):
+    type: GuidanceType
+    category: str
+    title: str
+    guideline_excerpt: str
+
+
+class PlannerOutput(_Out):
+    """AGENT_PLANNER_PROMPT 출력."""
+    phishing: bool
+    outcome: Outcome
+    reasons: List[str]
+    guidance: PlannerGuidance
+    methods_used_append: MethodsUsedAppend
+    trace: Trace
+
+
+class PreventionAnalysis(_Out):
+    outcome: Literal["success", "fail"]
+    reasons: List[str]
+    risk_level: Literal["low", "medium", "high"]
+
+
+class PersonalizedPreventionOut(_Out):
+    summary: str
+    analysis: PreventionAnalysis
+    steps: List[str]
+    tips: List[str]
+
+
+class AssessorOutput(_Out):
+    """AGENT_POSTRUN_ASSESSOR_PROMPT 출력."""
+    phishing: bool
+    outcome: Outcome
+    reasons: List[str]
+    personalized_prevention: PersonalizedPreventionOut
+    trace: Trace
@@ -4,23 +4,25 @@ from __future__ import annotations
 from sqlalchemy.orm import Session
 from uuid import UUID
 from app.db import models as m
+from app.db.session import release_connection
 from app.services.llm_providers import admin_chat  # o-시리즈 전용 분기(temperature=1) 적용
+from app.services.llm_cassette import cassette_scope, set_turn
+from app.services.llm_cost import ledger_scope
+from app.services.llm_structured import astructured_invoke, structured_invoke
+from app.schemas.llm_outputs import JudgeVerdict
+from app.services.prejudge import PreVerdict, prejudge
+from app.services.judge_memo import memo_enabled, memo_get, memo_key, memo_put
+from app.core.config import settings
 from datetime import datetime, timezone
-import json, re
+import asyncio
+import json
 from typing import Any
 
 # =========================
 # LLM 프롬프트 (피해자 발화만 제공)
 # =========================
-PROMPT_LLM_ONLY = """
-당신은 연구용 보이스피싱 분석가입니다.
-아래 대화 로그를 읽고, 보이스피싱 피해 발생 여부와 그 근거를 **JSON으로만** 출력하세요.
-
-[중요 전제]
-- 대화가 아직 종료되지 않았을 수 있음. **현재까지의 로그만** 근거로 판정하고, 미래 상황은 가정하지 말 것.
-- **아래 로그에는 '피해자'의 발화만 제공된다. 오직 피해자의 실제 행동/확인 발화(송금·인출·앱 설치·링크/QR 접속·민감정보 제공 등)만으로 판정할 것.**
-- 애매하면 보수적으로 보되, 아래의 **완료/고위험 행위**가 하나라도 확인되면 `phishing=true`.
-
+# 판정 기준(전체 판정 / 실시간 증분 판정 공용)
+JUDGE_CRITERIA = """
 [판정 기준] (하나라도 충족 시 phishing=true)
 A) **금전 이동 완료/직접 시도**
    - “송금/이체/입금/출금/인출/ATM에서 찾음/락커(보관함)에 넣음/현금 전달/자동이체/강제출금/안전계좌” 등 **실제 금전 이동**이 완료 또는 즉시 실행 단계
@@ -36,6 +38,18 @@ D) **지인/기관 사칭에 따른 실행**
 1. 위 A~D 이벤트가 **전혀 발생하지 않았음**
 2. 현재까지 **피해자의 발화 기준**으로 금전 이동·민감정보 제공·앱/링크 실행이 **발생하지 않음**
 3. 피해자가 대표번호 재확인/지점 방문/신고/거절/통화 종료 등으로 **명확히 방어**하고 이후 실행이 없음
+""".strip()
+
+PROMPT_LLM_ONLY = ("""
+당신은 연구용 보이스피싱 분석가입니다.
+아래 대화 로그를 읽고, 보이스피싱 피해 발생 여부와 그 근거를 **JSON으로만** 출력하세요.
+
+[중요 전제]
+- 대화가 아직 종료되지 않았을 수 있음. **현재까지의 로그만** 근거로 판정하고, 미래 상황은 가정하지 말 것.
+- **아래 로그에는 '피해자'의 발화만 제공된다. 오직 피해자의 실제 행동/확인 발화(송금·인출·앱 설치·링크/QR 접속·민감정보 제공 등)만으로 판정할 것.**
+- 애매하면 보수적으로 보되, 아래의 **완료/고위험 행위**가 하나라도 확인되면 `phishing=true`.
+
+""" + JUDGE_CRITERIA + """
 
 [출력 형식] (매우 엄격)
 - 오직 JSON 객체 1개만 출력(코드블록, 설명, 주석 금지)
@@ -56,228 +70,229 @@ D) **지인/기관 사칭에 따른 실행**
 
 [출력 예시]
 {{"phishing": true, "evidence": "피해자 발화 기준, turn 7에서 \\"700만원 송금했어요\\", turn 10에서 \\"락커 24번에 넣었습니다\\" 등 금전 이동 완료가 확인됨. 또한 turn 5에서 OTP 제공 발화가 나타남."}}
-""".strip()
+""").strip()
 
 
 # =========================
 # 대화 포맷터 (피해자 발화만)
 # =========================
-def _format_dialog_victim_only(db: Session, case_id: UUID) -> str:
-    """
-    DB의 대화 로그에서 '피해자' 발화만 판정용 평문으로 변환.
-    형식: 2 [피해자] ...내용...
-    """
+def victim_line(turn_index: int, content: str) -> str:
+    return f"{turn_index} [피해자] {content}"  # 0패딩 제거 유지
+
+
+def victim_turns(db: Session, case_id: UUID) -> list[tuple[int, str]]:
+    """피해자 발화만 [(turn_index, 내용), ...] (turn_index 순)."""
     logs = (db.query(m.ConversationLog).filter(
         m.ConversationLog.case_id == case_id).order_by(
             m.ConversationLog.turn_index.asc()).all())
-    lines: list[str] = []
-    for lg in logs:
-        if lg.role != "victim":
-            continue
-        lines.append(f"{lg.turn_index} [피해자] {lg.content}")  # 0패딩 제거 유지
-    return "\n".join(lines)
-
+    return [(lg.turn_index, lg.content) for lg in logs if lg.role == "victim"]
 
-# ====== 유틸: 코드펜스/따옴표 정리, JSON 블록 추출, 필드 이스케이프 ======
-def _strip_code_fences(s: str) -> str:
-    s = s.strip()
-    s = re.sub(r"^```(?:json)?\s*", "", s, flags=re.I)
-    s = re.sub(r"\s*```$", "", s)
-    return s.strip()
 
+def _victim_lines(db: Session, case_id: UUID) -> list[str]:
+    return [victim_line(t, c) for t, c in victim_turns(db, case_id)]
 
-def _normalize_quotes(s: str) -> str:
-    # 스마트 따옴표 → ASCII
-    return (s.replace("\u201c",
-                      '"').replace("\u201d",
-                                   '"').replace("\u2018",
-                                                "'").replace("\u2019", "'"))
 
-
-def _extract_json_with_balancing(s: str) -> str:
-    """
-    문자열 s에서 첫 '{'부터 시작하는 JSON 객체 블록을 탐색하면서
-    따옴표/이스케이프를 고려해 {}, [] 균형을 맞춰 끝까지 캡처.
-    끝까지 읽었는데도 스택이 남아있으면 필요한 닫는 괄호를 자동으로 붙여서 반환.
-    """
-    start = s.find("{")
-    if start == -1:
-        return s.strip()
-
-    stack = []
-    in_str = False
-    esc = False
-    end = None
-
-    for i in range(start, len(s)):
-        ch = s[i]
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-        else:
-            if ch == '"':
-                in_str = True
-            elif ch == "{":
-                stack.append("}")
-            elif ch == "[":
-                stack.append("]")
-            elif ch in ("}", "]"):
-                if stack and stack[-1] == ch:
-                    stack.pop()
-                    if not stack:
-                        end = i
-                        break
-
-    if end is not None:
-        return s[start:end + 1]
-
-    balanced = s[start:]
-    while stack:
-        balanced += stack.pop()
-    return balanced
-
-
-def _escape_inner_quotes_for_value_of(key: str, text: str) -> str:
+def _format_dialog_victim_only(db: Session, case_id: UUID) -> str:
     """
-    text 안에서 "key": "...." 값을 찾아, 내부의 미-이스케이프된 " 를 \" 로 바꿔줌.
-    이미 \\" 는 그대로 둔다.
+    DB의 대화 로그에서 '피해자' 발화만 판정용 평문으로 변환.
+    형식: 2 [피해자] ...내용...
     """
-    pat = re.compile(
-        rf'("{re.escape(key)}"\s*:\s*")(?P<val>.*)(")\s*(?=[,}}])', re.S)
-
-    def _fix(m: re.Match) -> str:
-        val = m.group("val")
-        # 이미 이스케이프된 \" 는 유지하고 나머지 " 만 이스케이프
-        val_fixed = re.sub(r'(?<!\\)"', r'\\"', val)
-        return m.group(1) + val_fixed + m.group(3)
-
-    return pat.sub(_fix, text)
+    return "\n".join(_victim_lines(db, case_id))
 
 
 # =========================
-# JSON 파서 (느슨) — 강화 버전
+# 메인: 케이스 요약/판정 (LLM-only)
 # =========================
-# === 교체: JSON 파서 (느슨) — 안전 우선/최소 보정 ===
-def _json_loads_lenient(s: str) -> dict[str, Any]:
-    """
-    1) 코드펜스/스마트따옴표 정리 후, 객체 블록만 추출
-    2) 먼저 '있는 그대로' json.loads 시도
-       - 성공하면 스키마 화이트리스트로 불필요 키 제거 (citations 등 무시)
-    3) 실패 시에만 최소 보정(숫자 0패딩/트레일링 콤마) → 재시도
-    4) 그래도 실패하면 evidence 내부의 미-이스케이프 따옴표를 이스케이프 → 최종 시도
-    """
-    # 0) 주변 노이즈 제거 & 따옴표 정규화
-    s0 = _normalize_quotes(_strip_code_fences(s))
-    # 1) JSON 블록만 추출(괄호 균형 맞추기 포함)
-    raw = _extract_json_with_balancing(s0)
-
-    # --- 1차: 아무 보정 없이 그대로 파싱 시도 ---
-    try:
-        data = json.loads(raw)
-        return {
-            "phishing": bool(data.get("phishing", False)),
-            "evidence": str(data.get("evidence", "")),
-        }
-    except Exception:
-        pass  # 아래 단계로
-
-    # --- 2차: 최소 보정 후 재시도 (따옴표는 건드리지 않음) ---
-    fixed_min = raw
-    # 숫자 앞 0 제거 (": 03," → ": 3,")
-    fixed_min = re.sub(r'(:\s*)0+(\d+)(\s*[,\}])', r': \2\3', fixed_min)
-    # 트레일링 콤마 제거
-    fixed_min = re.sub(r",(\s*[}\]])", r"\1", fixed_min)
-
-    try:
-        data = json.loads(fixed_min)
-        return {
-            "phishing": bool(data.get("phishing", False)),
-            "evidence": str(data.get("evidence", "")),
-        }
-    except Exception:
-        pass  # 아래 단계로
-
-    # --- 3차(최후): evidence 내부의 미-이스케이프 " 보정 후 재시도 ---
-    fixed_esc = _escape_inner_quotes_for_value_of("evidence", fixed_min)
-    try:
-        data = json.loads(fixed_esc)
-        return {
-            "phishing": bool(data.get("phishing", False)),
-            "evidence": str(data.get("evidence", "")),
-        }
-    except Exception as e:
-        raise ValueError(
-            f"LLM JSON 파싱 실패: {e}\nRAW:\n{raw}\nFIXED:\n{fixed_esc}") from e
+EMPTY_DIALOG_EVIDENCE = "피해자 발화가 없어 피해 발생을 확인할 수 없음."
 
 
-# =========================
-# 메인: 케이스 요약/판정 (LLM-only)
-# =========================
-def summarize_case(db: Session, case_id: UUID):
-    """
-    현재까지의 로그 중 **피해자 발화만** LLM에 전달하여 판정.
-    규칙 기반(정규식) 매칭 제거 → LLM 결과만 저장.
-    ADMIN_MODEL은 .env(예: o4-mini)로 제어.
-    """
+def _get_case(db: Session, case_id: UUID) -> m.AdminCase:
     case = db.get(m.AdminCase, case_id)
     if case is None:
         raise ValueError(f"AdminCase {case_id} not found")
+    return case
 
+
+def _scenario_str(case: m.AdminCase) -> str:
     # 시나리오 정규화
     scenario_obj = case.scenario
-    scenario_str = json.dumps(scenario_obj, ensure_ascii=False) if isinstance(
+    return json.dumps(scenario_obj, ensure_ascii=False) if isinstance(
         scenario_obj, (dict, list)) else str(scenario_obj or "")
 
-    # 피해자 발화만 사용
-    dialog = _format_dialog_victim_only(db, case_id)
 
-    # 피해자 발화가 전혀 없는 경우: 보수적 false로 마감
+def judge_seed(db: Session, case_id: UUID) -> tuple[str, list[str]]:
+    """실시간 판정 시작점: (시나리오 문자열, 지금까지 저장된 피해자 발화 줄)."""
+    case = _get_case(db, case_id)
+    scenario_str = _scenario_str(case)
+    lines = _victim_lines(db, case_id)
+    release_connection(db)
+    return scenario_str, lines
+
+
+def _judge_prompt(
+        db: Session,
+        case_id: UUID) -> tuple[m.AdminCase, list[tuple[int, str]], str]:
+    """케이스를 읽고 (케이스, 피해자 발화, 판정 프롬프트). 피해자 발화가 없으면 프롬프트는 빈 문자열."""
+    case = _get_case(db, case_id)
+    scenario_str = _scenario_str(case)
+
+    # 피해자 발화만 사용
+    turns = victim_turns(db, case_id)
+    dialog = "\n".join(victim_line(t, c) for t, c in turns)
+    # 판정 LLM 대기 동안 커넥션 반납
+    release_connection(db)
     if not dialog.strip():
-        case.phishing = False
-        case.evidence = "피해자 발화가 없어 피해 발생을 확인할 수 없음."
-        case.defense_count = 0
-        case.status = "completed"
-        case.completed_at = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(case)
-        return {
-            "phishing": False,
-            "evidence": case.evidence,
-            "defense_count": 0
-        }
-
-    # LLM 호출 (피해자 발화만 전달)
-    llm = admin_chat()  # 내부에서 ADMIN_MODEL 사용
-    resp = llm.invoke(
-        PROMPT_LLM_ONLY.format(scenario=scenario_str, dialog=dialog)).content
-
-    data = _json_loads_lenient(resp)
-    data = {
-        "phishing": bool(data.get("phishing", False)),
-        "evidence": str(data.get("evidence", "")),
-    }
-    if "phishing" not in data or "evidence" not in data:
-        raise RuntimeError("LLM 응답에 'phishing' 또는 'evidence' 키가 없습니다.")
+        return case, turns, ""
+    return case, turns, PROMPT_LLM_ONLY.format(scenario=scenario_str,
+                                               dialog=dialog)
 
-    # LLM 결과 그대로 저장 (evidence는 문자열로 유지)
-    phishing = bool(data["phishing"])
-    evidence = str(data["evidence"] or "")
 
+# 규칙 사전 판정으로 저장된 케이스의 judge_model
+PREJUDGE_MODEL = "rule"
+
+
+def _prejudged(turns: list[tuple[int, str]]) -> PreVerdict | None:
+    """PREJUDGE_ENABLED이고 규칙으로 명백히 결정되면 그 판정(아니면 None → LLM)."""
+    if not settings.PREJUDGE_ENABLED:
+        return None
+    pre = prejudge(turns)
+    return pre if pre.decided else None
+
+
+def save_verdict(db: Session,
+                 case_id: UUID,
+                 phishing: bool,
+                 evidence: str,
+                 judge_model: str | None = None,
+                 judge_version: str | None = None) -> dict[str, Any]:
+    """이미 얻은 판정(예: 실시간 판정)을 LLM 호출 없이 저장."""
+    return _save_verdict(db, _get_case(db, case_id), phishing, evidence,
+                         judge_model, judge_version)
+
+
+def _save_verdict(db: Session,
+                  case: m.AdminCase,
+                  phishing: bool,
+                  evidence: str,
+                  judge_model: str | None = None,
+                  judge_version: str | None = None) -> dict[str, Any]:
+    # LLM 결과 그대로 저장 (evidence는 문자열로 유지)
     case.phishing = phishing
     case.evidence = evidence
+    case.judge_model = judge_model
+    case.judge_version = judge_version
     case.defense_count = 0
     case.status = "completed"
     case.completed_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(case)
-
+    db.commit()  # refresh 생략: 이후 트랜잭션(커넥션)을 다시 열지 않음
     return {"phishing": phishing, "evidence": evidence, "defense_count": 0}
 
 
+def _verdict(phishing: bool, evidence: str,
+             judge_model: str | None) -> dict[str, Any]:
+    return {
+        "phishing": phishing,
+        "evidence": evidence,
+        "judge_model": judge_model,
+        "judge_version": settings.JUDGE_PROMPT_VERSION,
+    }
+
+
+def _local_verdict(turns: list[tuple[int, str]],
+                   prompt: str) -> dict[str, Any] | None:
+    """LLM 없이 끝나는 판정(피해자 발화 없음 / 규칙 사전 판정). 아니면 None."""
+    # 피해자 발화가 전혀 없는 경우: 보수적 false로 마감
+    if not prompt:
+        return _verdict(False, EMPTY_DIALOG_EVIDENCE, None)
+    # 규칙으로 명백한 케이스(완료 발화 / 명확한 방어)는 LLM 없이 마감
+    pre = _prejudged(turns)
+    if pre is not None:
+        return _verdict(pre.phishing, pre.evidence, PREJUDGE_MODEL)
+    return None
+
+
+def _memo_key(prompt: str, model: str) -> str | None:
+    """판정 메모 키(JUDGE_MEMO_ENABLED가 아니면 None)."""
+    if not memo_enabled():
+        return None
+    return memo_key(prompt, model, settings.JUDGE_PROMPT_VERSION)
+
+
+def judge_case(db: Session,
+               case_id: UUID,
+               model: str | None = None) -> dict[str, Any]:
+    """
+    판정만 하고 저장하지 않음(재판정 CLI는 결과를 모아 한 번에 씀).
+    return: {"phishing", "evidence", "judge_model", "judge_version"}
+    """
+    _, turns, prompt = _judge_prompt(db, case_id)
+    local = _local_verdict(turns, prompt)
+    if local is not None:
+        return local
+
+    # 같은 입력(시나리오 + 피해자 발화 + 버전 + 모델)을 이미 판정했으면 재사용
+    mdl = model or settings.ADMIN_MODEL
+    key = _memo_key(prompt, mdl)
+    if key is not None:
+        memo = memo_get(key)
+        if memo is not None:
+            return memo
+
+    # LLM 호출 (피해자 발화만 전달) — JSON 스키마 강제 + 검증 실패 시에만 재질의
+    llm = admin_chat(mdl)
+    with cassette_scope(case_id, inherit=True), ledger_scope(case_id=case_id):
+        set_turn(None)
+        verdict = structured_invoke("admin", llm, JudgeVerdict, prompt)
+    out = _verdict(verdict.phishing, verdict.evidence, mdl)
+    if key is not None:
+        memo_put(key, out)
+    return out
+
+
+async def judge_case_async(db: Session,
+                           case_id: UUID,
+                           model: str | None = None) -> dict[str, Any]:
+    """judge_case의 비동기 버전(LLM은 ainvoke, DB 작업만 스레드로)."""
+    _, turns, prompt = await asyncio.to_thread(_judge_prompt, db, case_id)
+    local = _local_verdict(turns, prompt)
+    if local is not None:
+        return local
+
+    mdl = model or settings.ADMIN_MODEL
+    key = _memo_key(prompt, mdl)
+    if key is not None:
+        memo = await asyncio.to_thread(memo_get, key)
+        if memo is not None:
+            return memo
+
+    llm = admin_chat(mdl)
+    with cassette_scope(case_id, inherit=True), ledger_scope(case_id=case_id):
+        set_turn(None)
+        verdict = await astructured_invoke("admin", llm, JudgeVerdict, prompt)
+    out = _verdict(verdict.phishing, verdict.evidence, mdl)
+    if key is not None:
+        await asyncio.to_thread(memo_put, key, out)
+    return out
+
+
+def summarize_case(db: Session, case_id: UUID, model: str | None = None):
+    """
+    현재까지의 로그 중 **피해자 발화만** LLM에 전달하여 판정하고 저장.
+    PREJUDGE_ENABLED이면 규칙으로 명백한 케이스만 로컬 판정(나머지는 LLM).
+    JUDGE_MEMO_ENABLED이면 시나리오·피해자 발화·버전·모델이 같은 이전 판정을 LLM 없이 재사용.
+    ADMIN_MODEL은 .env(예: o4-mini)로 제어(model로 덮어쓰기 가능).
+    """
+    return save_verdict(db, case_id, **judge_case(db, case_id, model))
+
+
+async def summarize_case_async(db: Session,
+                               case_id: UUID,
+                               model: str | None = None):
+    """summarize_case의 비동기 버전(LLM은 ainvoke, DB 작업만 스레드로)."""
+    verdict = await judge_case_async(db, case_id, model)
+    return await asyncio.to_thread(save_verdict, db, case_id, **verdict)
+
+
 # # app/services/admin_summary.py
 # from __future__ import annotations
 
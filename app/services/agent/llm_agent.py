@@ -6,8 +6,12 @@ from sqlalchemy.orm import Session
 from sqlalchemy import asc
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.services.llm_providers import agent_chat
+from app.services.llm_cassette import cassette_scope
+from app.services.llm_cost import ledger_scope
 from app.services.admin_summary import summarize_case
 from app.db import models as m
+from app.db.session import release_connection
+from app.utils.tolerant_json import tolerant_loads
 
 
 class SimpleAgent:
@@ -56,7 +60,9 @@ class LLMAgent:
             m.ConversationLog.case_id == case_id).order_by(
                 asc(m.ConversationLog.run),
                 asc(m.ConversationLog.turn_index)).limit(limit).all())
-        return [{"role": r.role, "text": r.content} for r in rows]
+        context = [{"role": r.role, "text": r.content} for r in rows]
+        release_connection(self.db)  # LLM 대기 동안 커넥션 반납
+        return context
 
     def decide_kind(self, case_id: UUID) -> str:
         turns = self._load_context(case_id, limit=30)
@@ -68,9 +74,10 @@ class LLMAgent:
             "- 'A' = 공격 시나리오(적대적 스트레스테스트)\n"
             "JSON 스키마(한국어): {\"kind\": \"P\"|\"A\", \"reason\": \"한국어 설명\"}\n"
             f"대화: {json.dumps(turns, ensure_ascii=False)}"))
-        out = self.llm.invoke([sys, user]).content.strip()
+        with cassette_scope(case_id), ledger_scope(case_id=case_id):
+            out = self.llm.invoke([sys, user]).content.strip()
         try:
-            data = json.loads(out)
+            data = tolerant_loads(out)
             kind = data.get("kind")
             return "P" if kind == "P" else ("A" if kind == "A" else "P")
         except Exception:
@@ -87,9 +94,11 @@ class LLMAgent:
                      "  \"steps\": [\"구체적 실행 단계(한국어)\", ...]\n"
                      "}\n"
                      f"대화: {json.dumps(turns, ensure_ascii=False)}"))
-        out = self.llm.invoke([sys, user]).content.strip()
+        with cassette_scope(case_id, run_no), ledger_scope(case_id=case_id,
+                                                          run=run_no):
+            out = self.llm.invoke([sys, user]).content.strip()
         try:
-            data = json.loads(out)
+            data = tolerant_loads(out)
             if not isinstance(
                     data,
                     dict) or "summary" not in data or "steps" not in data:
@@ -10,13 +10,18 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, asc
 
 from app.db import models as m
+from app.db.session import release_connection
 from app.services.conversations_read import fetch_logs_by_case
 from app.services.simulation import run_two_bot_simulation
 from app.services.llm_providers import agent_chat
+from app.services.llm_cassette import cassette_scope
+from app.services.llm_cost import ledger_scope
 from app.services.prompts_agent import (
     AGENT_PLANNER_PROMPT,
     AGENT_POSTRUN_ASSESSOR_PROMPT,  # ✅ 추가
 )
+from app.services.llm_structured import StructuredOutputError, structured_invoke
+from app.schemas.llm_outputs import AssessorOutput, PlannerOutput
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -128,14 +133,19 @@ def plan_first_run_only(
     # 참여자
     offender_id, victim_id, _ = _get_primary_ids_from_case(db, case_id)
 
-    # Planner 실행
-    chain = AGENT_PLANNER_PROMPT | agent_chat()
-    resp = chain.invoke({
+    # Planner 실행(스키마 강제 + 검증 실패 시에만 재질의)
+    llm = agent_chat("planner")
+    inputs = {
         "scenario_json": _scenario_json(db, case_id),
         "logs_json": _logs_json_for_run1(db, case_id),
-    })
-    raw = getattr(resp, "content", str(resp)).strip()
-    plan = json.loads(raw)
+    }
+    release_connection(db)  # LLM 대기 동안 커넥션 반납
+    with cassette_scope(case_id, 1), ledger_scope(case_id=case_id, run=1):
+        plan = structured_invoke("planner",
+                                 llm,
+                                 PlannerOutput,
+                                 inputs,
+                                 prompt=AGENT_PLANNER_PROMPT).model_dump()
 
     # next_run 산출 및 case 분석 저장(마지막 판정 근거)
     rows = fetch_logs_by_case(db, case_id)
@@ -164,16 +174,23 @@ def postrun_assess_and_save(
     run=2 로그만 보고 사후평가(AGENT_POSTRUN_ASSESSOR) → PersonalizedPrevention 저장
     """
     # 1) assessor 호출
-    chain = AGENT_POSTRUN_ASSESSOR_PROMPT | agent_chat()
-    resp = chain.invoke({
+    llm = agent_chat("assessor")
+    inputs = {
         "scenario_json": _scenario_json(db, case_id),
         "logs_json": _logs_json_for_run(db, case_id, run_no),
-    })
-    raw = getattr(resp, "content", str(resp)).strip()
+    }
+    release_connection(db)  # LLM 대기 동안 커넥션 반납
     try:
-        post = json.loads(raw)
-    except Exception as e:
-        logger.error(f"[AGENT][postrun] JSON 파싱 실패: {e} raw={raw[:300]}")
+        with cassette_scope(case_id, run_no), ledger_scope(case_id=case_id,
+                                                           run=run_no):
+            post = structured_invoke(
+                "assessor",
+                llm,
+                AssessorOutput,
+                inputs,
+                prompt=AGENT_POSTRUN_ASSESSOR_PROMPT).model_dump()
+    except StructuredOutputError as e:
+        logger.error(f"[AGENT][postrun] JSON 파싱 실패: {e}")
         post = {
             "phishing": bool(plan.get("phishing")),
             "outcome": plan.get("outcome"),
@@ -301,19 +318,21 @@ def run_agent_pipeline_by_case(db: Session,
         db, case_id)
 
     # 1) Planner 호출 (run=1만 입력)
-    planner_chain = AGENT_PLANNER_PROMPT | agent_chat()
-    planner_resp = planner_chain.invoke({
-        "scenario_json":
-        _scenario_json(db, case_id),
-        "logs_json":
-        _logs_json_for_run1(db, case_id),
-    })
-    planner_raw = getattr(planner_resp, "content", str(planner_resp)).strip()
+    planner_llm = agent_chat("planner")
+    planner_inputs = {
+        "scenario_json": _scenario_json(db, case_id),
+        "logs_json": _logs_json_for_run1(db, case_id),
+    }
+    release_connection(db)  # LLM 대기 동안 커넥션 반납
     try:
-        plan = json.loads(planner_raw)
-    except Exception as e:
-        logger.error(
-            f"[AGENT][planner] JSON 파싱 실패: {e} raw={planner_raw[:300]}")
+        with cassette_scope(case_id, 1), ledger_scope(case_id=case_id, run=1):
+            plan = structured_invoke("planner",
+                                     planner_llm,
+                                     PlannerOutput,
+                                     planner_inputs,
+                                     prompt=AGENT_PLANNER_PROMPT).model_dump()
+    except StructuredOutputError as e:
+        logger.error(f"[AGENT][planner] JSON 파싱 실패: {e}")
         raise
 
     preview = _build_preview_from_plan(plan)
@@ -343,20 +362,23 @@ def run_agent_pipeline_by_case(db: Session,
     case_id2, total_turns = run_two_bot_simulation(db, sim_args)
 
     # 4) Post-run Assessor 호출(run=2만 입력) → PersonalizedPrevention 저장
-    assessor_chain = AGENT_POSTRUN_ASSESSOR_PROMPT | agent_chat()
-    assessor_resp = assessor_chain.invoke({
-        "scenario_json":
-        _scenario_json(db, case_id2),
-        "logs_json":
-        _logs_json_for_run(db, case_id2, next_run),
-    })
-    assessor_raw = getattr(assessor_resp, "content",
-                           str(assessor_resp)).strip()
+    assessor_llm = agent_chat("assessor")
+    assessor_inputs = {
+        "scenario_json": _scenario_json(db, case_id2),
+        "logs_json": _logs_json_for_run(db, case_id2, next_run),
+    }
+    release_connection(db)  # LLM 대기 동안 커넥션 반납
     try:
-        post = json.loads(assessor_raw)
-    except Exception as e:
-        logger.error(
-            f"[AGENT][postrun] JSON 파싱 실패: {e} raw={assessor_raw[:300]}")
+        with cassette_scope(case_id2, next_run), ledger_scope(
+                case_id=case_id2, run=next_run):
+            post = structured_invoke(
+                "assessor",
+                assessor_llm,
+                AssessorOutput,
+                assessor_inputs,
+                prompt=AGENT_POSTRUN_ASSESSOR_PROMPT).model_dump()
+    except StructuredOutputError as e:
+        logger.error(f"[AGENT][postrun] JSON 파싱 실패: {e}")
         # 실패 시, planner의 최소 정보로라도 저장
         post = {
             "phishing": bool(plan.get("phishing")),
@@ -0,0 +1,152 @@
+# app/services/context_window.py
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+import re
+
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+
+from app.core.config import settings
+
+# 역할별 화자 이름(요약 줄 앞에 붙임): AIMessage=본인, HumanMessage=상대
+_SPEAKERS = {
+    "attacker": ("사기범", "피해자"),
+    "victim": ("피해자", "사기범"),
+}
+_SUMMARY_HEAD = "[이전 대화 요약] 아래는 앞선 대화의 요지입니다(원문 일부 발췌)."
+_SNIPPET_CHARS = 80
+
+
+def _make_counter() -> Callable[[str], int]:
+    """tiktoken이 있으면 실제 토큰 수, 없으면 글자 수 기반 근사치."""
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(enc.encode(text or ""))
+    except Exception:
+        # 한국어는 대략 1~2글자당 1토큰
+        return lambda text: (len(text or "") + 1) // 2
+
+
+_count_tokens: Callable[[str], int] | None = None
+
+
+def count_tokens(text: str) -> int:
+    global _count_tokens
+    if _count_tokens is None:
+        _count_tokens = _make_counter()
+    return _count_tokens(text)
+
+
+def _snippet(text: str) -> str:
+    """첫 문장(최대 _SNIPPET_CHARS자)만 발췌."""
+    norm = re.sub(r"\s+", " ", text or "").strip()
+    first = re.split(r"(?<=[.?!。？！])\s", norm, maxsplit=1)[0]
+    if len(first) > _SNIPPET_CHARS:
+        first = first[:_SNIPPET_CHARS].rstrip() + "…"
+    return first
+
+
+class RollingContext:
+    """
+    한 역할(공격자/피해자)의 대화 히스토리 창.
+    - 최근 keep_turns개 메시지는 원문 그대로 전송
+    - 그보다 오래된 메시지는 요약(발췌) SystemMessage 한 개로 접음
+    - token_budget(>0)을 넘으면 원문 구간을 더 접는다(최소 2개 메시지는 유지)
+    - 전체 히스토리를 보냈을 때 대비 절감 토큰을 누적 집계
+    히스토리는 뒤에 추가만 된다고 가정(이미 접은 앞부분은 다시 보지 않음).
+    """
+
+    def __init__(
+        self,
+        role: str,
+        *,
+        keep_turns: int | None = None,
+        token_budget: int | None = None,
+        summary_budget: int | None = None,
+    ):
+        if role not in _SPEAKERS:
+            raise ValueError(f"Unsupported role: {role}")
+        self.role = role
+        self.keep_turns = int(settings.SIM_CONTEXT_KEEP_TURNS
+                              if keep_turns is None else keep_turns)
+        if token_budget is None:
+            token_budget = (settings.SIM_CONTEXT_TOKEN_BUDGET_ATTACKER
+                            if role == "attacker" else
+                            settings.SIM_CONTEXT_TOKEN_BUDGET_VICTIM)
+        self.token_budget = int(token_budget)
+        self.summary_budget = int(settings.SIM_CONTEXT_SUMMARY_TOKENS
+                                  if summary_budget is None else
+                                  summary_budget)
+        self._counts: List[int] = []  # 히스토리 메시지별 토큰 수(추가분만 계산)
+        self._folded = 0  # 요약으로 접힌 앞부분 메시지 수
+        self._lines: List[str] = []
+        self._line_tokens: List[int] = []
+        self.calls = 0
+        self.full_tokens = 0
+        self.sent_tokens = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_turns > 0 or self.token_budget > 0
+
+    def _sync_counts(self, history: List[BaseMessage]) -> None:
+        if len(history) < len(self._counts):
+            # 히스토리가 교체됨(재개/분기) → 처음부터 다시
+            self._counts, self._folded = [], 0
+            self._lines, self._line_tokens = [], []
+        for msg in history[len(self._counts):]:
+            self._counts.append(count_tokens(str(msg.content)))
+
+    def _fold(self, msg: BaseMessage) -> None:
+        me, other = _SPEAKERS[self.role]
+        speaker = me if isinstance(msg, AIMessage) else other
+        line = f"- {speaker}: {_snippet(str(msg.content))}"
+        self._lines.append(line)
+        self._line_tokens.append(count_tokens(line))
+        # 요약도 상한을 넘으면 가장 오래된 줄부터 버림
+        while (self.summary_budget > 0 and len(self._lines) > 1
+               and sum(self._line_tokens) > self.summary_budget):
+            self._lines.pop(0)
+            self._line_tokens.pop(0)
+        self._folded += 1
+
+    def view(self, history: List[BaseMessage]) -> List[BaseMessage]:
+        """프롬프트에 넣을 메시지 목록(요약 + 최근 원문)."""
+        self._sync_counts(history)
+        full = sum(self._counts)
+        if not self.enabled:
+            sent_msgs = list(history)
+            sent = full
+        else:
+            if self.keep_turns > 0:
+                while len(history) - self._folded > self.keep_turns:
+                    self._fold(history[self._folded])
+            if self.token_budget > 0:
+                while (len(history) - self._folded > 2 and sum(
+                        self._counts[self._folded:]) + sum(self._line_tokens)
+                       > self.token_budget):
+                    self._fold(history[self._folded])
+            sent_msgs = list(history[self._folded:])
+            sent = sum(self._counts[self._folded:])
+            if self._lines:
+                summary = "\n".join([_SUMMARY_HEAD, *self._lines])
+                sent_msgs.insert(0, SystemMessage(summary))
+                sent += count_tokens(summary)
+        self.calls += 1
+        self.full_tokens += full
+        self.sent_tokens += sent
+        return sent_msgs
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.full_tokens - self.sent_tokens
+        return {
+            "role": self.role,
+            "calls": self.calls,
+            "history_tokens_full": self.full_tokens,
+            "history_tokens_sent": self.sent_tokens,
+            "saved_tokens": saved,
+            "saved_ratio": (round(saved / self.full_tokens, 3)
+                            if self.full_tokens else 0.0),
+            "folded_messages": self._folded,
+        }
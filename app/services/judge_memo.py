@@ -0,0 +1,115 @@
+# app/services/judge_memo.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import hashlib
+import threading
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db import models as m
+from app.db.session import SessionLocal
+from app.services.llm_cassette import cassette_mode
+
+logger = get_logger(__name__)
+
+# 판정 메모(JUDGE_MEMO_ENABLED)
+# - 한 케이스가 시뮬 종료 → include_judgement → run_cycle 등에서 여러 번 판정되는데,
+#   판정에 쓰이는 입력(시나리오 + 피해자 발화)이 그대로면 이전 판정을 LLM 호출 없이 재사용
+# - key = sha256(프롬프트 버전, 모델, 렌더링된 판정 프롬프트). 공격자 발화는 프롬프트에 없으므로
+#   공격자 턴만 늘어난 경우도 hit. 프롬프트 문구/버전/모델이 바뀌면 자동으로 miss
+# - cassette record/replay에서는 쓰지 않음(녹화된 호출 순서가 DB 상태에 따라 달라지지 않게)
+# - 테이블이 없거나 DB 오류면 메모 없이 진행(판정 자체는 막지 않음)
+
+
+def memo_key(prompt: str, model: str, version: str) -> str:
+    h = hashlib.sha256()
+    for part in (version, model, prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def memo_enabled() -> bool:
+    return bool(settings.JUDGE_MEMO_ENABLED) and cassette_mode() == "off"
+
+
+class _Stats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def add(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": bool(settings.JUDGE_MEMO_ENABLED),
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+_stats = _Stats()
+
+
+def judge_memo_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+def memo_get(key: str) -> Optional[Dict[str, Any]]:
+    """메모된 판정 {"phishing", "evidence", "judge_model", "judge_version"} 또는 None."""
+    try:
+        with SessionLocal() as db:
+            row = db.execute(
+                select(m.JudgeMemo.phishing, m.JudgeMemo.evidence,
+                       m.JudgeMemo.judge_model,
+                       m.JudgeMemo.judge_version).where(
+                           m.JudgeMemo.key == key)).first()
+            if row is None:
+                _stats.add("misses")
+                return None
+            db.execute(
+                update(m.JudgeMemo).where(m.JudgeMemo.key == key).values(
+                    hits=m.JudgeMemo.hits + 1))
+            db.commit()
+    except SQLAlchemyError as e:
+        _stats.add("errors")
+        logger.warning(f"[JUDGE] memo lookup failed: {type(e).__name__}: {e}")
+        return None
+    _stats.add("hits")
+    return {
+        "phishing": row.phishing,
+        "evidence": row.evidence,
+        "judge_model": row.judge_model,
+        "judge_version": row.judge_version,
+    }
+
+
+def memo_put(key: str, verdict: Dict[str, Any]) -> None:
+    try:
+        with SessionLocal() as db:
+            db.add(
+                m.JudgeMemo(key=key,
+                            judge_model=verdict["judge_model"],
+                            judge_version=verdict["judge_version"],
+                            phishing=verdict["phishing"],
+                            evidence=verdict["evidence"],
+                            hits=0))
+            db.commit()
+    except IntegrityError:
+        pass  # 동시에 같은 입력을 판정한 다른 워커가 먼저 저장
+    except SQLAlchemyError as e:
+        _stats.add("errors")
+        logger.warning(f"[JUDGE] memo store failed: {type(e).__name__}: {e}")
@@ -0,0 +1,281 @@
+# app/services/live_judge.py
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from uuid import UUID
+import asyncio
+import contextvars
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.schemas.llm_outputs import JudgeVerdict
+from app.services.admin_summary import (
+    EMPTY_DIALOG_EVIDENCE,
+    JUDGE_CRITERIA,
+    judge_seed,
+    save_verdict,
+    victim_line,
+)
+from app.services.llm_cassette import cassette_mode, detached_scope, set_turn
+from app.services.llm_providers import admin_chat
+from app.services.llm_structured import astructured_invoke, structured_invoke
+
+logger = get_logger(__name__)
+
+# 실시간(증분) 판정(LIVE_JUDGE)
+# - 피해자 턴이 끝날 때마다 백그라운드에서 판정을 갱신 → 루프가 끝나면 판정이 거의 준비돼 있음
+# - 매번 전체 로그가 아니라 "이전 판정 + 근거"와 그 뒤에 나온 피해자 발화만 보냄
+# - 한 케이스의 갱신은 순서대로 1개씩. 갱신 중에 쌓인 발화는 다음 갱신 1번에 묶어 보냄
+#   (cassette record/replay에서는 재현을 위해 발화 1줄당 갱신 1번)
+# - phishing=true는 한 번 확인되면 유지(완료된 행위는 이후 발화로 취소되지 않음)
+# - 갱신이 한 번이라도 실패하면 종료 시 기존 전체 판정(summarize_case)으로 대체
+
+PROMPT_LLM_INCREMENTAL = ("""
+당신은 연구용 보이스피싱 분석가입니다.
+진행 중인 대화의 판정을 갱신합니다. 아래의 [이전 판정]은 지금까지의 피해자 발화를 모두 보고 내린 판정이고,
+[새 피해자 발화]는 그 이후에 나온 발화입니다. 두 가지를 합쳐 현재까지의 판정을 **JSON으로만** 출력하세요.
+
+[중요 전제]
+- 대화가 아직 종료되지 않았을 수 있음. **현재까지의 로그만** 근거로 판정하고, 미래 상황은 가정하지 말 것.
+- 오직 피해자의 실제 행동/확인 발화(송금·인출·앱 설치·링크/QR 접속·민감정보 제공 등)만으로 판정할 것.
+- [이전 판정]이 true이면 true를 유지하고, 근거에 새 발화 중 핵심이 있으면 보탤 것.
+- 애매하면 보수적으로 보되, 아래의 **완료/고위험 행위**가 하나라도 확인되면 `phishing=true`.
+
+""" + JUDGE_CRITERIA + """
+
+[출력 형식] (매우 엄격)
+- 오직 JSON 객체 1개만 출력(코드블록, 설명, 주석 금지)
+- 키는 정확히 2개: "phishing", "evidence"
+- "evidence": 한 단락(2~4문장) 요약 + **핵심 발화 2~5개**를 turn_index와 함께 인용 (모두 피해자 발화)
+  - [이전 판정]의 인용 중 여전히 핵심인 것은 그대로 유지하고, 새 발화의 핵심 인용을 더할 것
+- **문자열 내부에서 큰따옴표 " 를 쓰면 반드시 \\" 로 이스케이프할 것.** (이스케이프가 어렵다면 『 』 로 인용)
+- 인용에서의 turn_index 표기는 항상 정수(1,2,3...)로 쓰고, 앞에 0을 붙이지 말 것(01, 03 금지).
+
+[참고 시나리오]
+시나리오: {scenario}
+
+[이전 판정]
+{prior}
+
+[새 피해자 발화]
+{dialog}
+""").strip()
+
+_NO_PRIOR = "없음(첫 판정)"
+# 시작 시점에 이미 저장돼 있던 발화 묶음의 cassette turn 표식
+_SEED_TURN = -1
+
+# 동기 엔진용 백그라운드 스레드(케이스마다 갱신은 1개씩만 돌므로 동시 케이스 수만큼이면 충분)
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, int(settings.LIVE_JUDGE_WORKERS)),
+                thread_name_prefix="live-judge")
+        return _executor
+
+
+def _prior_text(verdict: JudgeVerdict | None) -> str:
+    if verdict is None:
+        return _NO_PRIOR
+    return verdict.model_dump_json()
+
+
+class LiveJudge:
+    """
+    한 실행(run)의 실시간 판정.
+    add()는 루프(한 스레드/한 이벤트 루프)에서만 부르고, 갱신은 백그라운드에서 순서대로 처리.
+    """
+
+    def __init__(self,
+                 case_id: UUID,
+                 scenario: str,
+                 lines: List[str],
+                 *,
+                 aio: bool = False):
+        self.case_id = case_id
+        self.scenario = scenario
+        self.aio = aio
+        # 한 번에 보낼 발화 묶음들: (cassette turn 표식, 발화 줄들)
+        self._pending: List[Tuple[int, List[str]]] = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._future: Future | None = None
+        self._task: asyncio.Task | None = None
+        self._coalesce = cassette_mode() == "off"
+        self.verdict: JudgeVerdict | None = None
+        self.error: BaseException | None = None
+        self.updates = 0
+        self.lines_sent = 0
+        self.lines_total = len(lines)
+        if lines:
+            self._push(_SEED_TURN, lines)
+
+    @classmethod
+    def start(cls, db: Session, case_id: UUID) -> "LiveJudge":
+        """동기 엔진: 지금까지 저장된 피해자 발화로 시작(첫 갱신은 바로 백그라운드로)."""
+        scenario, lines = judge_seed(db, case_id)
+        return cls(case_id, scenario, lines)
+
+    @classmethod
+    async def astart(cls, db: Session, case_id: UUID) -> "LiveJudge":
+        scenario, lines = await asyncio.to_thread(judge_seed, db, case_id)
+        return cls(case_id, scenario, lines, aio=True)
+
+    # ---- 루프 쪽 ----
+    def add(self, turn_index: int, text: str) -> None:
+        """피해자 발화 1줄 추가 → 갱신 예약."""
+        self.lines_total += 1
+        self._push(turn_index, [victim_line(turn_index, text)])
+
+    def _push(self, turn: int, lines: List[str]) -> None:
+        with self._lock:
+            if self.error is not None:
+                return
+            self._pending.append((turn, lines))
+            if self._running:
+                return
+            self._running = True
+        if self.aio:
+            self._task = asyncio.get_running_loop().create_task(
+                self._adrain())
+        else:
+            # 예산/원장/cassette 스코프를 백그라운드 스레드로 이어줌
+            ctx = contextvars.copy_context()
+            self._future = _pool().submit(ctx.run, self._drain)
+
+    def _take(self) -> Tuple[int, List[str]] | None:
+        """다음 갱신에 보낼 묶음(없으면 실행 종료 표시 후 None). lock 안에서 호출."""
+        if not self._pending or self.error is not None:
+            self._pending.clear()
+            self._running = False
+            return None
+        if not self._coalesce:
+            return self._pending.pop(0)
+        turn = self._pending[-1][0]
+        lines = [line for _, batch in self._pending for line in batch]
+        self._pending.clear()
+        return turn, lines
+
+    # ---- 백그라운드 쪽 ----
+    def _prompt(self, lines: List[str]) -> str:
+        return PROMPT_LLM_INCREMENTAL.format(scenario=self.scenario,
+                                             prior=_prior_text(self.verdict),
+                                             dialog="\n".join(lines))
+
+    def _merge(self, new: JudgeVerdict, n_lines: int) -> None:
+        if self.verdict is not None and self.verdict.phishing:
+            new = new.model_copy(update={"phishing": True})
+        self.verdict = new
+        self.updates += 1
+        self.lines_sent += n_lines
+
+    def _fail(self, exc: BaseException) -> None:
+        logger.warning(f"[JUDGE] live judge failed case={self.case_id}: "
+                       f"{type(exc).__name__}: {exc}")
+        with self._lock:
+            self.error = exc
+
+    def _drain(self) -> None:
+        while True:
+            with self._lock:
+                batch = self._take()
+            if batch is None:
+                return
+            turn, lines = batch
+            try:
+                with detached_scope():
+                    set_turn(turn)
+                    new = structured_invoke("admin", admin_chat(),
+                                            JudgeVerdict, self._prompt(lines))
+            except Exception as e:
+                self._fail(e)
+                continue
+            self._merge(new, len(lines))
+
+    async def _adrain(self) -> None:
+        while True:
+            with self._lock:
+                batch = self._take()
+            if batch is None:
+                return
+            turn, lines = batch
+            try:
+                with detached_scope():
+                    set_turn(turn)
+                    new = await astructured_invoke("admin", admin_chat(),
+                                                   JudgeVerdict,
+                                                   self._prompt(lines))
+            except Exception as e:
+                self._fail(e)
+                continue
+            self._merge(new, len(lines))
+
+    # ---- 마감 ----
+    def cancel(self) -> None:
+        """남은 갱신을 버림(예산 초과 등 판정 없이 끝낼 때)."""
+        with self._lock:
+            self._pending.clear()
+        if self._task is not None:
+            self._task.cancel()
+
+    def _result(self, waited_ms: float) -> Optional[JudgeVerdict]:
+        logger.info(
+            f"[JUDGE] case={self.case_id} live updates={self.updates} "
+            f"lines={self.lines_sent}/{self.lines_total} "
+            f"final_wait_ms={waited_ms:.0f} "
+            f"{'fallback=full' if self.error is not None else ''}".rstrip())
+        if self.error is not None:
+            return None
+        if self.verdict is None:
+            return JudgeVerdict(phishing=False,
+                                evidence=EMPTY_DIALOG_EVIDENCE)
+        return self.verdict
+
+    def result(self) -> Optional[JudgeVerdict]:
+        """남은 갱신을 기다려 최종 판정. 실패했으면 None(전체 판정으로 대체)."""
+        started = time.perf_counter()
+        if self._future is not None:
+            self._future.result()
+        return self._result((time.perf_counter() - started) * 1000)
+
+    async def aresult(self) -> Optional[JudgeVerdict]:
+        started = time.perf_counter()
+        if self._task is not None:
+            await self._task
+        return self._result((time.perf_counter() - started) * 1000)
+
+
+def _tags(judge: LiveJudge) -> Tuple[str | None, str]:
+    # (judge_model, judge_version) — 증분 프롬프트라 전체 판정과 버전을 구분
+    return (settings.ADMIN_MODEL if judge.updates else None,
+            f"{settings.JUDGE_PROMPT_VERSION}+live")
+
+
+def finish_live_judge(db: Session, judge: LiveJudge) -> bool:
+    """실시간 판정을 케이스에 저장. 실패했으면 False(호출자가 summarize_case로 대체)."""
+    verdict = judge.result()
+    if verdict is None:
+        return False
+    save_verdict(db, judge.case_id, verdict.phishing, verdict.evidence,
+                 *_tags(judge))
+    return True
+
+
+async def afinish_live_judge(db: Session, judge: LiveJudge) -> bool:
+    verdict = await judge.aresult()
+    if verdict is None:
+        return False
+    await asyncio.to_thread(save_verdict, db, judge.case_id, verdict.phishing,
+                            verdict.evidence, *_tags(judge))
+    return True
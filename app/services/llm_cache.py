@@ -0,0 +1,337 @@
+# app/services/llm_cache.py
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.services.llm_messages import as_messages
+
+# 내용 주소(content-addressed) LLM 응답 캐시
+# key = sha256(모델, 파라미터, 렌더링된 메시지) → 같은 입력이면 같은 응답을 재사용
+# 판정/플래너/사후평가처럼 결정적이어야 하는 역할만 켜고(LLM_CACHE_ROLES),
+# 시뮬레이션 역할(attacker/victim)은 기본적으로 캐시하지 않는다.
+
+
+class _MemoryBackend:
+    """프로세스 내 LRU (TTL + 최대 항목 수)."""
+
+    def __init__(self, max_entries: int, ttl_sec: float):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            stored_at, content = hit
+            if self.ttl_sec > 0 and time.time() - stored_at > self.ttl_sec:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return content
+
+    def put(self, key: str, content: str, role: str, model: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), content)
+            self._data.move_to_end(key)
+            while self.max_entries > 0 and len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class _SqliteBackend:
+    """로컬 디스크(SQLite) — 프로세스 재시작 후에도 유지."""
+
+    def __init__(self, path: str, max_entries: int, ttl_sec: float):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache ("
+                           " key TEXT PRIMARY KEY, role TEXT, model TEXT,"
+                           " content TEXT NOT NULL, created_at REAL NOT NULL,"
+                           " last_used_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_used"
+                           " ON llm_cache(last_used_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created_at FROM llm_cache WHERE key = ?",
+                (key, )).fetchone()
+            if row is None:
+                return None
+            if self.ttl_sec > 0 and now - row[1] > self.ttl_sec:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?",
+                                   (key, ))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_used_at = ? WHERE key = ?",
+                (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, content: str, role: str, model: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, role, model, content, now, now))
+            if self.max_entries > 0:
+                # 최근 사용 순으로 max_entries개만 남김(LRU)
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM"
+                    " llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries, ))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+class _PostgresBackend:
+    """앱 DB(llm_cache 테이블) — 여러 워커/서버가 공유."""
+
+    def __init__(self, max_entries: int, ttl_sec: float):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._puts = 0
+
+    def get(self, key: str) -> Optional[str]:
+        from app.db import models as m
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            row = db.execute(
+                select(m.LLMCacheEntry.content,
+                       m.LLMCacheEntry.created_at).where(
+                           m.LLMCacheEntry.key == key)).first()
+            if row is None:
+                return None
+            now = datetime.now(timezone.utc)
+            if self.ttl_sec > 0 and row.created_at < now - timedelta(
+                    seconds=self.ttl_sec):
+                db.execute(
+                    delete(m.LLMCacheEntry).where(m.LLMCacheEntry.key == key))
+                db.commit()
+                return None
+            db.execute(
+                update(m.LLMCacheEntry).where(
+                    m.LLMCacheEntry.key == key).values(
+                        hits=m.LLMCacheEntry.hits + 1, last_used_at=now))
+            db.commit()
+            return row.content
+
+    def put(self, key: str, content: str, role: str, model: str) -> None:
+        from app.db import models as m
+        from app.db.session import SessionLocal
+
+        now = datetime.now(timezone.utc)
+        stmt = pg_insert(m.LLMCacheEntry).values(key=key,
+                                                 role=role,
+                                                 model=model,
+                                                 content=content,
+                                                 hits=0,
+                                                 created_at=now,
+                                                 last_used_at=now)
+        stmt = stmt.on_conflict_do_update(index_elements=["key"],
+                                          set_={
+                                              "content": content,
+                                              "created_at": now,
+                                              "last_used_at": now,
+                                          })
+        with SessionLocal() as db:
+            db.execute(stmt)
+            self._puts += 1
+            # 크기 제한: 매 put마다가 아니라 가끔씩 오래 안 쓴 항목 정리
+            if self.max_entries > 0 and self._puts % 50 == 0:
+                stale = (select(m.LLMCacheEntry.key).order_by(
+                    m.LLMCacheEntry.last_used_at.desc()).offset(
+                        self.max_entries))
+                db.execute(
+                    delete(m.LLMCacheEntry).where(
+                        m.LLMCacheEntry.key.in_(stale.scalar_subquery())))
+            db.commit()
+
+    def clear(self) -> None:
+        from app.db import models as m
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            db.execute(delete(m.LLMCacheEntry))
+            db.commit()
+
+
+class LLMCache:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backend = None
+        self._backend_name: str | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend_name(self) -> str:
+        return (settings.LLM_CACHE_BACKEND or "off").lower()
+
+    def roles(self) -> set[str]:
+        return {
+            r.strip().lower()
+            for r in (settings.LLM_CACHE_ROLES or "").split(",") if r.strip()
+        }
+
+    def enabled_for(self, role: str) -> bool:
+        return self.backend_name != "off" and role.lower() in self.roles()
+
+    def backend(self):
+        name = self.backend_name
+        with self._lock:
+            if self._backend is None or self._backend_name != name:
+                max_entries = int(settings.LLM_CACHE_MAX_ENTRIES)
+                ttl = float(settings.LLM_CACHE_TTL_SEC)
+                if name == "memory":
+                    self._backend = _MemoryBackend(max_entries, ttl)
+                elif name == "sqlite":
+                    self._backend = _SqliteBackend(
+                        settings.LLM_CACHE_SQLITE_PATH, max_entries, ttl)
+                elif name == "postgres":
+                    self._backend = _PostgresBackend(max_entries, ttl)
+                else:
+                    raise ValueError(
+                        f"Unsupported LLM_CACHE_BACKEND: {name}. "
+                        "Use 'off', 'memory', 'sqlite' or 'postgres'.")
+                self._backend_name = name
+            return self._backend
+
+    def get(self, key: str) -> Optional[str]:
+        content = self.backend().get(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def put(self, key: str, content: str, role: str, model: str) -> None:
+        self.backend().put(key, content, role, model)
+
+    def clear(self) -> None:
+        self.backend().clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend_name,
+                "roles": sorted(self.roles()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+llm_cache = LLMCache()
+
+
+def cache_key(model: str,
+              params: Dict[str, Any],
+              messages: Any,
+              kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """
+    모델 + 파라미터 + 렌더링된 메시지(역할, 내용) + 호출 kwargs의 해시.
+    kwargs(예: bind_schema의 response_format)가 다르면 다른 키 — 비어 있으면 예전 키와 같음.
+    """
+    rendered = [[getattr(msg, "type", "human"),
+                 getattr(msg, "content", msg)] for msg in messages]
+    payload: List[Any] = [model, params, rendered]
+    if kwargs:
+        payload.append(kwargs)
+    raw = json.dumps(payload,
+                     ensure_ascii=False,
+                     sort_keys=True,
+                     default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CachedChat(Runnable):
+    """채팅 모델 앞단의 캐시(프롬프트 | 모델 체인에 그대로 사용)."""
+
+    def __init__(self, role: str, llm: Any, model: str,
+                 params: Dict[str, Any]):
+        self.role = role
+        self.llm = llm
+        self.model = model
+        self.params = params
+
+    def _key(self, input: Any, kwargs: Dict[str, Any]) -> str:
+        return cache_key(self.model, self.params, as_messages(input), kwargs)
+
+    def _hit(self, content: str) -> AIMessage:
+        return AIMessage(content,
+                         response_metadata={
+                             "model_name": self.model,
+                             "llm_cache_hit": True
+                         })
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        key = self._key(input, kwargs)
+        content = llm_cache.get(key)
+        if content is not None:
+            return self._hit(content)
+        resp = self.llm.invoke(input, config, **kwargs)
+        llm_cache.put(key, getattr(resp, "content", str(resp)), self.role,
+                      self.model)
+        return resp
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        key = self._key(input, kwargs)
+        content = await asyncio.to_thread(llm_cache.get, key)
+        if content is not None:
+            return self._hit(content)
+        resp = await self.llm.ainvoke(input, config, **kwargs)
+        await asyncio.to_thread(llm_cache.put, key,
+                                getattr(resp, "content", str(resp)),
+                                self.role, self.model)
+        return resp
+
+
+def wrap_cache(role: str, llm: Any, model: str, params: Dict[str,
+                                                              Any]) -> Any:
+    """역할이 캐시 대상이면 CachedChat으로 감싸고, 아니면 그대로 반환."""
+    if not llm_cache.enabled_for(role):
+        return llm
+    return CachedChat(role, llm, model, params)
@@ -0,0 +1,311 @@
+# app/services/llm_cascade.py
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.llm_cost import call_cost
+from app.services.llm_messages import as_messages
+
+logger = get_logger(__name__)
+
+# 피해자 모델 캐스케이드
+# - 기본은 작은 모델(VICTIM_CASCADE_MODEL)로 답하고, 아래 경우에만 큰 모델(VICTIM_MODEL)로 승격
+#   1) 시뮬레이션이 넘겨준 트리거: 지침 주입 run(guidance) / 핵심 단계(key_step)
+#   2) 작은 모델 답변의 품질 불량(빈 답/너무 김/종료 문구/역할 이탈/형식/비한국어/직전 답 반복)
+#   3) 작은 모델 호출 실패(small_error)
+# - 작은 모델 답은 품질 확인 뒤 내보내야 하므로 스트리밍 시 한 청크로 전달(피해자 답은 짧음)
+# - 실행(run)별 통계: 승격률, 절감 비용(큰 모델이었다면의 비용 - 실제), 절감 지연(추정)
+
+_END_PHRASES = ("여기서 마무리하겠습니다", "시뮬레이션을 종료합니다")
+_ROLE_LEAK = re.compile(r"^\s*(피해자|공격자|victim|attacker|assistant|user)\s*[:：]",
+                        re.I)
+_AI_LEAK = ("ai 언어 모델", "언어 모델로서", "as an ai", "저는 ai")
+_HANGUL = re.compile(r"[가-힣]")
+_LETTER = re.compile(r"[A-Za-z가-힣]")
+
+
+def key_terms() -> List[str]:
+    return [
+        t.strip() for t in (settings.VICTIM_CASCADE_KEY_TERMS or "").split(",")
+        if t.strip()
+    ]
+
+
+def is_key_step(*texts: str | None) -> bool:
+    terms = key_terms()
+    return any(term in (text or "") for text in texts for term in terms)
+
+
+def quality_issue(text: str, previous: str | None = None) -> str | None:
+    """작은 모델 답변의 문제 유형(없으면 None)."""
+    t = (text or "").strip()
+    if len(t) < 2:
+        return "empty"
+    if len(t) > int(settings.VICTIM_CASCADE_MAX_CHARS):
+        return "too_long"
+    if any(p in t for p in _END_PHRASES):
+        return "end_phrase"
+    if _ROLE_LEAK.match(t) or any(s in t.lower() for s in _AI_LEAK):
+        return "role_leak"
+    if "```" in t or t.startswith("{"):
+        return "format"
+    letters = _LETTER.findall(t)
+    if letters and len(_HANGUL.findall(t)) / len(letters) < 0.5:
+        return "non_korean"
+    if previous and t == previous.strip():
+        return "repeat"
+    return None
+
+
+class CascadeStats:
+    """캐스케이드 집계(run별 1개 + 프로세스 전체 1개)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.small_turns = 0
+        self.escalations: Dict[str, int] = {}
+        self.saved_cost_usd = 0.0  # 큰 모델이었다면의 비용 - 실제 비용
+        self.saved_latency_ms = 0.0  # 큰 모델 평균 지연 기준 추정치
+        self.wasted_ms = 0.0  # 품질 불량/실패로 버린 작은 모델 호출
+
+    def add_small(self, saved_usd: float, saved_ms: float | None) -> None:
+        with self._lock:
+            self.turns += 1
+            self.small_turns += 1
+            self.saved_cost_usd += saved_usd
+            if saved_ms is not None:
+                self.saved_latency_ms += saved_ms
+
+    def add_escalation(self, reason: str, wasted_usd: float,
+                       wasted_ms: float) -> None:
+        with self._lock:
+            self.turns += 1
+            # guidance / key_step / quality:<유형> / small_error
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+            self.saved_cost_usd -= wasted_usd
+            self.saved_latency_ms -= wasted_ms
+            self.wasted_ms += wasted_ms
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            escalated = self.turns - self.small_turns
+            return {
+                "turns": self.turns,
+                "small_turns": self.small_turns,
+                "escalated": escalated,
+                "escalation_rate":
+                round(escalated / self.turns, 3) if self.turns else 0.0,
+                "escalations": dict(self.escalations),
+                "saved_cost_usd": round(self.saved_cost_usd, 6),
+                "saved_latency_ms": round(self.saved_latency_ms, 1),
+                "wasted_small_ms": round(self.wasted_ms, 1),
+            }
+
+
+_global_stats = CascadeStats()
+# 큰 모델 호출 지연 이동평균(ms) — 작은 모델로 끝난 턴의 절감 지연 추정용
+_strong_ms: Dict[str, float] = {}
+_strong_lock = threading.Lock()
+
+
+def cascade_stats() -> Dict[str, Any]:
+    with _strong_lock:
+        avg = {k: round(v, 1) for k, v in _strong_ms.items()}
+    return {**_global_stats.summary(), "strong_latency_ms_avg": avg}
+
+
+def _observe_strong(model: str, ms: float) -> None:
+    with _strong_lock:
+        prev = _strong_ms.get(model)
+        _strong_ms[model] = ms if prev is None else prev * 0.9 + ms * 0.1
+
+
+def _strong_estimate(model: str) -> float | None:
+    with _strong_lock:
+        return _strong_ms.get(model)
+
+
+# 시뮬레이션 → 캐스케이드: 이번 피해자 턴의 승격 사유(없으면 None)와 run 통계
+_hint: ContextVar[Tuple[Optional[str], Optional[CascadeStats]]] = ContextVar(
+    "victim_cascade_hint", default=(None, None))
+
+
+def set_cascade_hint(reason: str | None,
+                     stats: CascadeStats | None = None) -> None:
+    _hint.set((reason, stats))
+
+
+def _usage(msg: Any) -> Tuple[int, int]:
+    usage = getattr(msg, "usage_metadata", None) or {}
+    return int(usage.get("input_tokens") or 0), int(
+        usage.get("output_tokens") or 0)
+
+
+def _text(msg: Any) -> str:
+    content = getattr(msg, "content", msg)
+    return content if isinstance(content, str) else str(content)
+
+
+def _as_chunk(msg: Any) -> Any:
+    # 스트림 소비자(msg + chunk 병합)가 그대로 쓰도록 청크 형태로 변환
+    if isinstance(msg, AIMessage) and not isinstance(msg, AIMessageChunk):
+        return AIMessageChunk(content=msg.content,
+                              response_metadata=msg.response_metadata,
+                              usage_metadata=msg.usage_metadata,
+                              id=msg.id)
+    return msg
+
+
+def _ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+class CascadeChat(Runnable):
+    """작은 모델 우선, 트리거/품질 불량이면 큰 모델로 승격."""
+
+    def __init__(self, small: Any, strong: Any, small_model: str,
+                 strong_model: str):
+        self.small = small
+        self.strong = strong
+        self.small_model = small_model
+        self.strong_model = strong_model
+
+    def _previous(self, input: Any) -> str | None:
+        # 직전 피해자 발화(히스토리의 마지막 AIMessage)
+        for msg in reversed(as_messages(input)):
+            if isinstance(msg, AIMessage):
+                return _text(msg)
+        return None
+
+    def _check_small(self, input: Any, resp: Any, ms: float,
+                     stats: CascadeStats | None) -> str | None:
+        """작은 모델 답을 받아들이면 통계 기록 후 None, 아니면 승격 사유."""
+        issue = quality_issue(_text(resp), self._previous(input))
+        if issue is not None:
+            return f"quality:{issue}"
+        pt, ct = _usage(resp)
+        saved_usd = (call_cost(self.strong_model, pt, ct) -
+                     call_cost(self.small_model, pt, ct))
+        est = _strong_estimate(self.strong_model)
+        saved_ms = None if est is None else est - ms
+        for st in filter(None, (stats, _global_stats)):
+            st.add_small(saved_usd, saved_ms)
+        return None
+
+    def _escalated(self, reason: str, resp: Any, ms: float, wasted: Any,
+                   wasted_ms: float, stats: CascadeStats | None) -> None:
+        _observe_strong(self.strong_model, ms)
+        wasted_usd = 0.0
+        if wasted is not None:
+            wasted_usd = call_cost(self.small_model, *_usage(wasted))
+        for st in filter(None, (stats, _global_stats)):
+            st.add_escalation(reason, wasted_usd, wasted_ms)
+
+    def _small_failed(self, exc: BaseException) -> str:
+        logger.warning(f"[CASCADE] {self.small_model} failed → "
+                       f"{self.strong_model}: {exc}")
+        return "small_error"
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        reason, stats = _hint.get()
+        small, small_ms = None, 0.0
+        if reason is None:
+            started = time.perf_counter()
+            try:
+                small = self.small.invoke(input, config, **kwargs)
+            except Exception as e:
+                reason = self._small_failed(e)
+            small_ms = _ms(started)
+            if small is not None:
+                reason = self._check_small(input, small, small_ms, stats)
+                if reason is None:
+                    return small
+        started = time.perf_counter()
+        resp = self.strong.invoke(input, config, **kwargs)
+        self._escalated(reason, resp, _ms(started), small, small_ms, stats)
+        return resp
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        reason, stats = _hint.get()
+        small, small_ms = None, 0.0
+        if reason is None:
+            started = time.perf_counter()
+            try:
+                small = await self.small.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                reason = self._small_failed(e)
+            small_ms = _ms(started)
+            if small is not None:
+                reason = self._check_small(input, small, small_ms, stats)
+                if reason is None:
+                    return small
+        started = time.perf_counter()
+        resp = await self.strong.ainvoke(input, config, **kwargs)
+        self._escalated(reason, resp, _ms(started), small, small_ms, stats)
+        return resp
+
+    def stream(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Iterator[Any]:
+        reason, stats = _hint.get()
+        small, small_ms = None, 0.0
+        if reason is None:
+            started = time.perf_counter()
+            try:
+                small = self.small.invoke(input, config, **kwargs)
+            except Exception as e:
+                reason = self._small_failed(e)
+            small_ms = _ms(started)
+            if small is not None:
+                reason = self._check_small(input, small, small_ms, stats)
+                if reason is None:
+                    yield _as_chunk(small)
+                    return
+        started = time.perf_counter()
+        merged = None
+        for chunk in self.strong.stream(input, config, **kwargs):
+            merged = chunk if merged is None else merged + chunk
+            yield chunk
+        self._escalated(reason, merged, _ms(started), small, small_ms, stats)
+
+    async def astream(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[Any]:
+        reason, stats = _hint.get()
+        small, small_ms = None, 0.0
+        if reason is None:
+            started = time.perf_counter()
+            try:
+                small = await self.small.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                reason = self._small_failed(e)
+            small_ms = _ms(started)
+            if small is not None:
+                reason = self._check_small(input, small, small_ms, stats)
+                if reason is None:
+                    yield _as_chunk(small)
+                    return
+        started = time.perf_counter()
+        merged = None
+        async for chunk in self.strong.astream(input, config, **kwargs):
+            merged = chunk if merged is None else merged + chunk
+            yield chunk
+        self._escalated(reason, merged, _ms(started), small, small_ms, stats)
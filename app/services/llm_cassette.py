@@ -0,0 +1,200 @@
+# app/services/llm_cassette.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+import json
+import threading
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+
+# LLM 호출 녹화/재생(cassette)
+# - record: 실제 호출 결과를 {LLM_CASSETTE_DIR}/{case}.jsonl 에 한 줄씩 추가
+# - replay: 같은 키(case, run, turn, role, seq)의 응답을 파일에서 돌려줌(실제 호출/키 불필요)
+# - off   : 래핑하지 않음(기존 동작)
+MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(KeyError):
+    """replay 모드에서 녹화된 응답이 없을 때."""
+
+
+# 현재 호출 위치(case/run/turn)와 (turn, role)별 호출 순번
+_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_cassette_scope",
+                                                          default=None)
+
+
+def cassette_mode() -> str:
+    mode = (settings.LLM_CASSETTE_MODE or "off").lower()
+    if mode not in MODES:
+        raise ValueError(
+            f"Unsupported LLM_CASSETTE_MODE: {mode}. Use one of {MODES}.")
+    return mode
+
+
+@contextmanager
+def cassette_scope(case: Any,
+                   run: Any = None,
+                   *,
+                   inherit: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    이 블록 안의 LLM 호출을 case/run 기준으로 키잉.
+    inherit=True 이면 바깥 scope가 있을 때 그대로 사용(예: 시뮬 안에서 호출된 summarize_case).
+    """
+    outer = _scope.get()
+    if inherit and outer is not None:
+        yield outer
+        return
+    scope = {"case": str(case), "run": run, "turn": None, "seq": {}}
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def detached_scope() -> Iterator[Dict[str, Any] | None]:
+    """
+    바깥 scope와 같은 case/run으로 키잉하되 turn/seq는 따로 쓰는 scope.
+    루프와 동시에 도는 백그라운드 호출(실시간 판정)이 루프의 turn을 건드리지 않게 함.
+    """
+    outer = _scope.get()
+    if outer is None:
+        yield None
+        return
+    with cassette_scope(outer["case"], outer["run"]) as scope:
+        yield scope
+
+
+def set_turn(turn_index: int | None) -> None:
+    """시뮬레이션 루프가 다음 LLM 호출의 turn_index를 알려줌."""
+    scope = _scope.get()
+    if scope is not None:
+        scope["turn"] = turn_index
+
+
+def _next_key(role: str) -> tuple[str, Dict[str, Any]]:
+    scope = _scope.get()
+    if scope is None:
+        raise RuntimeError(
+            f"LLM cassette: '{role}' 호출이 cassette_scope 밖에서 일어났습니다.")
+    turn = scope["turn"]
+    seq_key = f"{turn}:{role}"
+    seq = scope["seq"].get(seq_key, 0)
+    scope["seq"][seq_key] = seq + 1
+    key = f"{scope['run']}:{'-' if turn is None else turn}:{role}:{seq}"
+    return key, scope
+
+
+class _Store:
+    """케이스별 JSONL 파일 읽기/쓰기(프로세스 내 캐시)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def _path(self, case: str) -> Path:
+        return Path(settings.LLM_CASSETTE_DIR) / f"{case}.jsonl"
+
+    def get(self, case: str, key: str) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._loaded.get(case)
+            if entries is None:
+                entries = {}
+                path = self._path(case)
+                if path.exists():
+                    with path.open(encoding="utf-8") as f:
+                        for line in f:
+                            if line.strip():
+                                rec = json.loads(line)
+                                entries[rec["key"]] = rec
+                self._loaded[case] = entries
+        try:
+            return entries[key]
+        except KeyError:
+            raise CassetteMiss(f"{case}:{key}") from None
+
+    def put(self, case: str, rec: Dict[str, Any]) -> None:
+        path = self._path(case)
+        line = json.dumps(rec, ensure_ascii=False)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._loaded.pop(case, None)
+
+
+_store = _Store()
+
+
+class CassetteChat(Runnable):
+    """
+    채팅 모델 래퍼(프롬프트 | 모델 체인에 그대로 사용).
+    replay 모드에서는 실제 모델을 만들지 않는다(API 키 없이 재실행 가능).
+    """
+
+    def __init__(self, role: str, factory: Callable[[], Any], model: str,
+                 mode: str):
+        self.role = role
+        self.model = model
+        self.mode = mode
+        self._factory = factory
+        self._llm = None
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = self._factory()
+        return self._llm
+
+    def _replay(self) -> AIMessage:
+        key, scope = _next_key(self.role)
+        rec = _store.get(scope["case"], key)
+        return AIMessage(rec["content"])
+
+    def _record(self, key: str, scope: Dict[str, Any], resp: Any) -> None:
+        _store.put(
+            scope["case"], {
+                "key": key,
+                "run": scope["run"],
+                "turn": scope["turn"],
+                "role": self.role,
+                "model": self.model,
+                "content": getattr(resp, "content", str(resp)),
+            })
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        if self.mode == "replay":
+            return self._replay()
+        key, scope = _next_key(self.role)
+        resp = self.llm.invoke(input, config, **kwargs)
+        self._record(key, scope, resp)
+        return resp
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        if self.mode == "replay":
+            return self._replay()
+        key, scope = _next_key(self.role)
+        resp = await self.llm.ainvoke(input, config, **kwargs)
+        self._record(key, scope, resp)
+        return resp
+
+
+def wrap_chat(role: str, factory: Callable[[], Any], model: str) -> Any:
+    """off 모드면 모델을 그대로, 아니면 CassetteChat으로 감싸서 반환."""
+    mode = cassette_mode()
+    if mode == "off":
+        return factory()
+    return CassetteChat(role, factory, model, mode)
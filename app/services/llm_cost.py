@@ -0,0 +1,323 @@
+# app/services/llm_cost.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+import asyncio
+import threading
+import time
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db import models as m
+
+logger = get_logger(__name__)
+
+# LLM 호출 원장(llm_call_ledger) + 예산 상한
+# - 실제 프로바이더 호출만 기록(cassette 재생/응답 캐시 적중은 비용 0이라 기록 안 함)
+# - 비용 = 입력 토큰 × 입력 단가 + 출력 토큰 × 출력 단가 (USD / 1M 토큰)
+# - 예산: 케이스별 / 잡별 / run_cycle 실행별. 넘으면 다음 LLM 호출 전에 BudgetExceeded
+
+# 모델별 기본 단가(USD / 1M 토큰: 입력, 출력). LLM_PRICES로 덮어쓰기/추가
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "o4-mini": (1.10, 4.40),
+    "o3-mini": (1.10, 4.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "fake": (0.0, 0.0),
+}
+
+
+class BudgetExceeded(RuntimeError):
+    """예산 상한을 넘어 더 이상 LLM을 호출하지 않음."""
+
+
+def price_for(model: str) -> Tuple[float, float]:
+    """정확히 일치 → 가장 긴 접두어 일치(예: gpt-4.1-mini-2025-04-14) → (0, 0)."""
+    table = {
+        **DEFAULT_PRICES,
+        **{k: tuple(v)
+           for k, v in settings.LLM_PRICES.items()}
+    }
+    if model in table:
+        return table[model]
+    best = max((k for k in table if model.startswith(k)), key=len, default=None)
+    return table[best] if best else (0.0, 0.0)
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    p_in, p_out = price_for(model)
+    return (prompt_tokens * p_in + completion_tokens * p_out) / 1_000_000
+
+
+# =========================
+# 스코프: 원장 귀속(case/run/job/batch) + 예산
+# =========================
+@dataclass
+class Budget:
+    name: str
+    limit_usd: float
+    spent_usd: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def charge(self, usd: float) -> None:
+        with self._lock:
+            self.spent_usd += usd
+
+    @property
+    def exceeded(self) -> bool:
+        return self.spent_usd >= self.limit_usd
+
+
+_ledger_ctx: ContextVar[Dict[str, Any]] = ContextVar("llm_ledger_ctx",
+                                                     default={})
+_budgets: ContextVar[Tuple[Budget, ...]] = ContextVar("llm_budgets",
+                                                      default=())
+
+
+@contextmanager
+def ledger_scope(**fields: Any) -> Iterator[Dict[str, Any]]:
+    """case_id / run / job_id / batch_id 중 주어진 값만 바깥 스코프 위에 덮어씀."""
+    ctx = {
+        **_ledger_ctx.get(),
+        **{k: v
+           for k, v in fields.items() if v is not None}
+    }
+    token = _ledger_ctx.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _ledger_ctx.reset(token)
+
+
+@contextmanager
+def budget_scope(name: str,
+                 limit_usd: float | None,
+                 *,
+                 spent_usd: float = 0.0) -> Iterator[Budget | None]:
+    """limit_usd가 0/None이면 상한 없음(아무것도 하지 않음)."""
+    if not limit_usd or limit_usd <= 0:
+        yield None
+        return
+    budget = Budget(name, float(limit_usd), float(spent_usd))
+    token = _budgets.set(_budgets.get() + (budget, ))
+    try:
+        yield budget
+    finally:
+        _budgets.reset(token)
+
+
+def check_budget() -> None:
+    for b in _budgets.get():
+        if b.exceeded:
+            raise BudgetExceeded(
+                f"budget '{b.name}' exceeded: ${b.spent_usd:.4f} / "
+                f"${b.limit_usd:.4f}")
+
+
+def budget_exhausted() -> bool:
+    return any(b.exceeded for b in _budgets.get())
+
+
+def case_spent(db: Session, case_id: UUID) -> float:
+    """이 케이스에 지금까지 기록된 비용 합(에이전트 재실행 포함)."""
+    return float(
+        db.execute(
+            select(func.coalesce(func.sum(m.LLMCallLedger.cost_usd),
+                                 0.0)).where(m.LLMCallLedger.case_id ==
+                                             case_id)).scalar() or 0.0)
+
+
+def prior_case_spend(db: Session, case_id: UUID) -> float:
+    """케이스 예산이 켜져 있을 때만 지금까지의 비용을 읽는다(읽은 뒤 커넥션 반납)."""
+    if float(settings.LLM_BUDGET_PER_CASE_USD) <= 0:
+        return 0.0
+    from app.db.session import release_connection
+
+    spent = case_spent(db, case_id)
+    release_connection(db)
+    return spent
+
+
+@contextmanager
+def case_budget(case_id: UUID,
+                run: int | None = None,
+                spent_usd: float = 0.0) -> Iterator[Budget | None]:
+    """케이스 원장 귀속 + (LLM_BUDGET_PER_CASE_USD > 0이면) 이전 run 비용을 포함한 케이스 예산."""
+    with ledger_scope(case_id=case_id, run=run), budget_scope(
+            f"case:{case_id}",
+            float(settings.LLM_BUDGET_PER_CASE_USD),
+            spent_usd=spent_usd) as budget:
+        yield budget
+
+
+# =========================
+# 기록
+# =========================
+def _usage(msg: Any) -> Tuple[int, int]:
+    usage = getattr(msg, "usage_metadata", None) or {}
+    return int(usage.get("input_tokens") or 0), int(
+        usage.get("output_tokens") or 0)
+
+
+def _write(row: Dict[str, Any]) -> None:
+    from app.db.session import SessionLocal
+
+    try:
+        with SessionLocal() as db:
+            db.add(m.LLMCallLedger(**row))
+            db.commit()
+    except Exception as e:
+        # 원장 기록 실패로 시뮬레이션을 멈추지 않음
+        logger.warning(f"[LEDGER] write failed: {e}")
+
+
+def record_call(role: str, model: str, msg: Any,
+                latency_ms: float) -> Dict[str, Any]:
+    """예산 차감 후 원장에 쓸 행을 만든다(쓰기는 호출자가 동기/스레드로)."""
+    prompt_tokens, completion_tokens = _usage(msg)
+    meta = getattr(msg, "response_metadata", None) or {}
+    model = meta.get("model_name") or meta.get("model") or model
+    cost = call_cost(model, prompt_tokens, completion_tokens)
+    for b in _budgets.get():
+        b.charge(cost)
+    ctx = _ledger_ctx.get()
+    return {
+        "case_id": ctx.get("case_id"),
+        "run": ctx.get("run"),
+        "job_id": ctx.get("job_id"),
+        "batch_id": ctx.get("batch_id"),
+        "role": role,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "latency_ms": round(latency_ms, 1),
+        "cost_usd": cost,
+    }
+
+
+class LedgerChat(Runnable):
+    """호출 전 예산 확인, 호출 후 토큰·지연·비용을 원장에 기록."""
+
+    def __init__(self, llm: Any, role: str, model: str):
+        self.llm = llm
+        self.role = role
+        self.model = model
+
+    def _done(self, msg: Any, started: float) -> Dict[str, Any] | None:
+        if msg is None:
+            return None
+        return record_call(self.role, self.model, msg,
+                           (time.perf_counter() - started) * 1000)
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        check_budget()
+        started = time.perf_counter()
+        resp = self.llm.invoke(input, config, **kwargs)
+        row = self._done(resp, started)
+        if row and settings.LLM_LEDGER_ENABLED:
+            _write(row)
+        return resp
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        check_budget()
+        started = time.perf_counter()
+        resp = await self.llm.ainvoke(input, config, **kwargs)
+        row = self._done(resp, started)
+        if row and settings.LLM_LEDGER_ENABLED:
+            await asyncio.to_thread(_write, row)
+        return resp
+
+    def stream(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Iterator[Any]:
+        check_budget()
+        started = time.perf_counter()
+        merged = None
+        for chunk in self.llm.stream(input, config, **kwargs):
+            merged = chunk if merged is None else merged + chunk
+            yield chunk
+        row = self._done(merged, started)
+        if row and settings.LLM_LEDGER_ENABLED:
+            _write(row)
+
+    async def astream(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[Any]:
+        check_budget()
+        started = time.perf_counter()
+        merged = None
+        async for chunk in self.llm.astream(input, config, **kwargs):
+            merged = chunk if merged is None else merged + chunk
+            yield chunk
+        row = self._done(merged, started)
+        if row and settings.LLM_LEDGER_ENABLED:
+            await asyncio.to_thread(_write, row)
+
+
+# =========================
+# 집계
+# =========================
+def cost_summary(db: Session,
+                 *,
+                 since_minutes: float | None = None,
+                 case_id: UUID | None = None,
+                 job_id: str | None = None,
+                 batch_id: str | None = None) -> Dict[str, Any]:
+    """모델·역할별 호출 수 / 토큰 / 평균 지연 / 비용."""
+    L = m.LLMCallLedger
+    conds = []
+    if since_minutes:
+        conds.append(L.created_at >= datetime.now(timezone.utc) -
+                     timedelta(minutes=since_minutes))
+    if case_id is not None:
+        conds.append(L.case_id == case_id)
+    if job_id:
+        conds.append(L.job_id == job_id)
+    if batch_id:
+        conds.append(L.batch_id == batch_id)
+
+    stmt = (select(L.model, L.role,
+                   func.count().label("calls"),
+                   func.sum(L.prompt_tokens).label("prompt_tokens"),
+                   func.sum(L.completion_tokens).label("completion_tokens"),
+                   func.avg(L.latency_ms).label("avg_latency_ms"),
+                   func.sum(L.cost_usd).label("cost_usd")).where(
+                       *conds).group_by(L.model,
+                                        L.role).order_by(L.model, L.role))
+    groups: List[Dict[str, Any]] = []
+    total = 0.0
+    for row in db.execute(stmt).mappings():
+        cost = float(row["cost_usd"] or 0.0)
+        total += cost
+        groups.append({
+            "model": row["model"],
+            "role": row["role"],
+            "calls": row["calls"],
+            "prompt_tokens": int(row["prompt_tokens"] or 0),
+            "completion_tokens": int(row["completion_tokens"] or 0),
+            "avg_latency_ms": round(float(row["avg_latency_ms"] or 0.0), 1),
+            "cost_usd": round(cost, 6),
+        })
+    return {"total_cost_usd": round(total, 6), "groups": groups}
@@ -0,0 +1,283 @@
+# app/services/llm_endpoints.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import httpx
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.llm_resilience import RETRYABLE, classify, retry_after, status_of
+
+logger = get_logger(__name__)
+
+# OpenAI 호환 엔드포인트 풀(OPENAI_ENDPOINTS)
+# - 엔드포인트 = (base_url, api_key, weight, models). 여러 키·여러 서버(로컬 vLLM 등)로 분산
+# - 선택: 해당 모델을 서빙하는 건강한 엔드포인트 중 진행 중 요청 수 / weight가 가장 작은 곳
+# - 헬스: 수동(호출 결과) + 선택적 능동(GET {base_url}/models 주기 점검)
+#   429/5xx/네트워크/401/403이면 OPENAI_ENDPOINT_EJECT_SEC(또는 Retry-After) 동안 제외
+#   전부 제외 상태면 가장 먼저 풀리는 엔드포인트로 보냄(요청을 버리지 않음)
+# - 재시도는 바깥 ResilientChat이 담당: 시도마다 다시 고르므로 실패한 엔드포인트를 피해 감
+OPENAI_DEFAULT_BASE_URL = "https://api.openai.com/v1"
+_EJECTING = RETRYABLE | {"auth"}
+
+
+@dataclass
+class Endpoint:
+    name: str
+    base_url: str | None
+    api_key: str | None
+    weight: float = 1.0
+    models: List[str] = field(default_factory=list)
+    # 상태(풀 lock 안에서 갱신)
+    outstanding: int = 0
+    calls: int = 0
+    errors: int = 0
+    ejected_until: float = 0.0
+    last_error: str | None = None
+    latency_ms: float | None = None  # 이동평균
+
+    def serves(self, model: str) -> bool:
+        return not self.models or model in self.models
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    @property
+    def url(self) -> str:
+        return (self.base_url or OPENAI_DEFAULT_BASE_URL).rstrip("/")
+
+
+def _endpoint_from(raw: Dict[str, Any], idx: int) -> Endpoint:
+    base_url = raw.get("base_url") or None
+    name = raw.get("name") or (urlparse(base_url).netloc
+                               if base_url else f"openai-{idx}")
+    # 기본 OpenAI는 OPENAI_API_KEY로 채움, 로컬 서버는 키 없이도 동작
+    api_key = raw.get("api_key") or (None if base_url else
+                                     settings.OPENAI_API_KEY)
+    return Endpoint(name=name,
+                    base_url=base_url,
+                    api_key=api_key,
+                    weight=max(float(raw.get("weight") or 1.0), 1e-6),
+                    models=list(raw.get("models") or []))
+
+
+class EndpointPool:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sig: str | None = None
+        self._endpoints: List[Endpoint] = []
+
+    def enabled(self) -> bool:
+        return bool(settings.OPENAI_ENDPOINTS)
+
+    def endpoints(self) -> List[Endpoint]:
+        # 설정이 바뀌면(테스트/재설정) 다시 구성 — 상태는 초기화
+        sig = json.dumps(settings.OPENAI_ENDPOINTS,
+                         sort_keys=True,
+                         default=str)
+        with self._lock:
+            if sig != self._sig:
+                self._endpoints = [
+                    _endpoint_from(raw, i)
+                    for i, raw in enumerate(settings.OPENAI_ENDPOINTS)
+                ]
+                self._sig = sig
+            return list(self._endpoints)
+
+    def acquire(self, model: str) -> Endpoint:
+        """least-outstanding(가중치 반영)으로 고르고 진행 중 수 +1."""
+        eps = [ep for ep in self.endpoints() if ep.serves(model)]
+        if not eps:
+            raise RuntimeError(f"no OPENAI_ENDPOINTS entry serves {model}")
+        now = time.monotonic()
+        with self._lock:
+            healthy = [ep for ep in eps if not ep.ejected(now)]
+            if healthy:
+                best = min(ep.outstanding / ep.weight for ep in healthy)
+                ep = random.choice([
+                    e for e in healthy if e.outstanding / e.weight == best
+                ])
+            else:
+                ep = min(eps, key=lambda e: e.ejected_until)
+            ep.outstanding += 1
+            ep.calls += 1
+            return ep
+
+    def release(self,
+                ep: Endpoint,
+                started: float,
+                exc: BaseException | None = None) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            ep.outstanding = max(0, ep.outstanding - 1)
+            if exc is None:
+                ep.latency_ms = ms if ep.latency_ms is None else (
+                    ep.latency_ms * 0.9 + ms * 0.1)
+                return
+            ep.errors += 1
+            ep.last_error = f"{type(exc).__name__}: {exc}"[:200]
+        if _eject_kind(exc) in _EJECTING:
+            self.eject(ep, retry_after(exc))
+
+    def eject(self, ep: Endpoint, sec: float | None = None) -> None:
+        sec = max(float(settings.OPENAI_ENDPOINT_EJECT_SEC), sec or 0.0)
+        with self._lock:
+            ep.ejected_until = time.monotonic() + sec
+        logger.warning(f"[ENDPOINT] {ep.name} ejected for {sec:.0f}s: "
+                       f"{ep.last_error}")
+
+    def restore(self, ep: Endpoint) -> None:
+        with self._lock:
+            if ep.ejected_until:
+                logger.info(f"[ENDPOINT] {ep.name} healthy")
+            ep.ejected_until = 0.0
+
+    async def check_health(self) -> Dict[str, bool]:
+        """모든 엔드포인트에 GET {base_url}/models — 성공하면 복귀, 실패하면 제외."""
+        eps = self.endpoints()
+
+        async def _probe(client: httpx.AsyncClient, ep: Endpoint) -> bool:
+            headers = ({
+                "Authorization": f"Bearer {ep.api_key}"
+            } if ep.api_key else {})
+            try:
+                r = await client.get(f"{ep.url}/models", headers=headers)
+                r.raise_for_status()
+            except Exception as e:
+                with self._lock:
+                    ep.last_error = f"health: {type(e).__name__}: {e}"[:200]
+                self.eject(ep)
+                return False
+            self.restore(ep)
+            return True
+
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            results = await asyncio.gather(*(_probe(client, ep)
+                                             for ep in eps))
+        return {ep.name: ok for ep, ok in zip(eps, results)}
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        eps = self.endpoints()
+        with self._lock:
+            return [{
+                "name": ep.name,
+                "base_url": ep.url,
+                "weight": ep.weight,
+                "models": ep.models or "*",
+                "outstanding": ep.outstanding,
+                "calls": ep.calls,
+                "errors": ep.errors,
+                "healthy": not ep.ejected(now),
+                "ejected_for_sec": round(max(0.0, ep.ejected_until - now), 1),
+                "avg_latency_ms":
+                round(ep.latency_ms, 1) if ep.latency_ms is not None else None,
+                "last_error": ep.last_error,
+            } for ep in eps]
+
+
+def _eject_kind(exc: BaseException) -> str:
+    # 인증 실패(401/403)는 요청이 아니라 엔드포인트(키) 문제 → 제외 대상
+    if status_of(exc) in (401, 403):
+        return "auth"
+    return classify(exc)
+
+
+endpoint_pool = EndpointPool()
+
+
+async def endpoint_health_loop() -> None:
+    """서버 기동 후 OPENAI_ENDPOINT_HEALTH_SEC 간격으로 능동 헬스체크."""
+    interval = max(1.0, float(settings.OPENAI_ENDPOINT_HEALTH_SEC))
+    while True:
+        try:
+            await endpoint_pool.check_health()
+        except Exception:
+            logger.exception("[ENDPOINT] health check failed")
+        await asyncio.sleep(interval)
+
+
+class PooledChat(Runnable):
+    """호출마다 엔드포인트를 골라 그 엔드포인트용 채팅 모델(build(ep))로 보냄."""
+
+    def __init__(self, model: str, build: Callable[[Endpoint], Any]):
+        self.model = model
+        self.build = build
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        ep = endpoint_pool.acquire(self.model)
+        started = time.perf_counter()
+        try:
+            resp = self.build(ep).invoke(input, config, **kwargs)
+        except Exception as e:
+            endpoint_pool.release(ep, started, e)
+            raise
+        except BaseException:
+            endpoint_pool.release(ep, started)
+            raise
+        endpoint_pool.release(ep, started)
+        return resp
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        ep = endpoint_pool.acquire(self.model)
+        started = time.perf_counter()
+        try:
+            resp = await self.build(ep).ainvoke(input, config, **kwargs)
+        except Exception as e:
+            endpoint_pool.release(ep, started, e)
+            raise
+        except BaseException:  # 취소
+            endpoint_pool.release(ep, started)
+            raise
+        endpoint_pool.release(ep, started)
+        return resp
+
+    def stream(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Iterator[Any]:
+        ep = endpoint_pool.acquire(self.model)
+        started = time.perf_counter()
+        try:
+            yield from self.build(ep).stream(input, config, **kwargs)
+        except Exception as e:
+            endpoint_pool.release(ep, started, e)
+            raise
+        except BaseException:
+            endpoint_pool.release(ep, started)
+            raise
+        endpoint_pool.release(ep, started)
+
+    async def astream(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[Any]:
+        ep = endpoint_pool.acquire(self.model)
+        started = time.perf_counter()
+        try:
+            async for chunk in self.build(ep).astream(input, config,
+                                                      **kwargs):
+                yield chunk
+        except Exception as e:
+            endpoint_pool.release(ep, started, e)
+            raise
+        except BaseException:
+            endpoint_pool.release(ep, started)
+            raise
+        endpoint_pool.release(ep, started)
@@ -0,0 +1,221 @@
+# app/services/llm_fake.py
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.config import settings
+from app.services.context_window import count_tokens
+
+# 부하 테스트용 가짜 프로바이더(네트워크/API 키 없음)
+# - 모델명이 "fake"(또는 "fake-..."), 피해자는 VICTIM_PROVIDER=fake 로 선택
+# - 역할별로 대사/JSON을 만들어 주고, 지연은 로그정규분포(중앙값·sigma)로 흉내 낸다
+# - 판정/플래너/사후평가는 프롬프트 해시로 결정적(같은 입력 → 같은 결과)
+# - 공격자/피해자는 확률적(LLM_FAKE_SEED를 주면 재현 가능)
+
+_ATTACKER_LINES = [
+    "안녕하세요, 서울중앙지검 수사관입니다. 본인 명의 계좌가 범죄에 연루되어 연락드렸습니다.",
+    "지금 확인 절차가 필요합니다. 주변에 다른 분 계시면 잠시 자리를 옮겨 주시겠어요?",
+    "자산 보호를 위해 안전계좌로 잠시 이체해 두셔야 합니다.",
+    "보안 앱 설치 링크를 문자로 보내드렸습니다. 설치 후 알려 주세요.",
+    "인증번호 6자리를 불러 주시면 바로 처리해 드리겠습니다.",
+    "시간이 지체되면 계좌가 동결될 수 있으니 서둘러 주셔야 합니다.",
+]
+_ATTACKER_END = "여기서 마무리하겠습니다."
+
+_VICTIM_LINES = [
+    "네? 무슨 일이신데요?",
+    "갑자기 그런 말씀을 하시니 당황스럽네요.",
+    "제가 대표번호로 다시 확인해 보고 연락드릴게요.",
+    "그럼 어떻게 하면 되나요?",
+    "잠시만요, 가족이랑 먼저 상의해 볼게요.",
+    "알겠습니다. 말씀하신 계좌로 송금했어요.",
+    "인증번호가 왔는데 불러 드리면 되나요?",
+    "이상한데요, 경찰에 신고하겠습니다.",
+]
+
+
+def is_fake(model: str | None) -> bool:
+    name = (model or "").strip().lower()
+    return name == "fake" or name.startswith("fake-") or name.startswith(
+        "fake:")
+
+
+@lru_cache(maxsize=4)
+def _load_script(path: str | None) -> Dict[str, List[str]]:
+    """LLM_FAKE_SCRIPT_PATH(JSON: {"attacker": [...], "victim": [...]})가 있으면 대사 교체."""
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {k: list(v) for k, v in data.items() if isinstance(v, list)}
+
+
+def _rng(prompt: str, deterministic: bool) -> random.Random:
+    if deterministic or settings.LLM_FAKE_SEED is not None:
+        seed = hashlib.sha256(
+            f"{settings.LLM_FAKE_SEED}:{prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(seed[:16], 16))
+    return random.Random()
+
+
+def _judge(rng: random.Random) -> Dict[str, Any]:
+    phishing = rng.random() < float(settings.LLM_FAKE_PHISHING_RATE)
+    if phishing:
+        evidence = ("피해자 발화 기준, turn 5에서 \"말씀하신 계좌로 송금했어요\"라고 금전 이동 완료를 "
+                    "밝혔고 turn 7에서 인증번호 제공 의사를 보였음(가짜 판정).")
+    else:
+        evidence = ("피해자 발화 기준, turn 3에서 \"대표번호로 다시 확인해 보고 연락드릴게요\"라며 "
+                    "확인 의사를 밝혔고 금전 이동·민감정보 제공은 없었음(가짜 판정).")
+    return {"phishing": phishing, "evidence": evidence}
+
+
+def _planner(rng: random.Random) -> Dict[str, Any]:
+    verdict = _judge(rng)
+    gtype = "P" if verdict["phishing"] else "A"
+    title = "대표번호 재확인 습관화" if gtype == "P" else "권위 강조형 압박 보완"
+    return {
+        "phishing": verdict["phishing"],
+        "outcome":
+        "attacker_success" if verdict["phishing"] else "attacker_fail",
+        "reasons": ["가짜 플래너 판정 근거 1", "가짜 플래너 판정 근거 2"],
+        "guidance": {
+            "type": gtype,
+            "category": "institution_impersonation",
+            "title": title,
+            "text": "1) 통화를 끊는다.\n2) 대표번호로 다시 건다.\n3) 가족에게 알린다.",
+            "sample_lines": ["제가 직접 대표번호로 확인할게요.", "지금은 이체하지 않겠습니다."],
+            "rationale": "부하 테스트용 고정 지침",
+        },
+        "methods_used_append": {
+            "type": gtype,
+            "category": "institution_impersonation",
+            "title": title,
+            "guideline_excerpt": "통화를 끊고 대표번호로 재확인",
+        },
+        "trace": {
+            "decision_notes": ["가짜 프로바이더 응답"]
+        },
+    }
+
+
+def _assessor(rng: random.Random) -> Dict[str, Any]:
+    verdict = _judge(rng)
+    return {
+        "phishing": verdict["phishing"],
+        "outcome":
+        "attacker_success" if verdict["phishing"] else "attacker_fail",
+        "reasons": ["가짜 사후평가 근거 1", "가짜 사후평가 근거 2", "가짜 사후평가 근거 3"],
+        "personalized_prevention": {
+            "summary": "부하 테스트용 개인화 예방법 요약입니다. 실제 평가가 아닙니다.",
+            "analysis": {
+                "outcome": "success" if verdict["phishing"] else "fail",
+                "reasons": ["근거 1", "근거 2", "근거 3"],
+                "risk_level": "high" if verdict["phishing"] else "low",
+            },
+            "steps": ["통화를 끊는다.", "대표번호로 확인한다.", "가족에게 알린다.", "앱을 설치하지 않는다.",
+                      "인증번호를 말하지 않는다."],
+            "tips": ["수사기관은 송금을 요구하지 않는다.", "모르는 링크는 누르지 않는다.",
+                     "의심되면 112에 신고한다."],
+        },
+        "trace": {
+            "decision_notes": ["가짜 프로바이더 응답"]
+        },
+    }
+
+
+def _agent(rng: random.Random) -> Dict[str, Any]:
+    # LLMAgent.decide_kind({"kind","reason"})와 personalize({"summary","steps"}) 공용
+    return {
+        "kind": rng.choice(["P", "A"]),
+        "reason": "가짜 프로바이더 응답",
+        "summary": "부하 테스트용 맞춤 예방 대책 요약입니다.",
+        "steps": ["통화를 끊는다.", "대표번호로 확인한다.", "가족에게 알린다."],
+    }
+
+
+_JSON_ROLES = {
+    "admin": _judge,
+    "planner": _planner,
+    "assessor": _assessor,
+    "agent": _agent,
+}
+
+
+def fake_reply(role: str, messages: List[BaseMessage]) -> str:
+    prompt = "\n".join(str(getattr(m, "content", m)) for m in messages)
+    script = _load_script(settings.LLM_FAKE_SCRIPT_PATH)
+    if role in _JSON_ROLES:
+        return json.dumps(_JSON_ROLES[role](_rng(prompt, True)),
+                          ensure_ascii=False)
+    rng = _rng(prompt, False)
+    if role == "attacker":
+        # 자기 발화(AIMessage) 수로 진행도 판단 → 정해진 턴 수 이후 종료 선언
+        spoken = sum(1 for m in messages if isinstance(m, AIMessage))
+        if spoken >= int(settings.LLM_FAKE_ATTACKER_TURNS):
+            return _ATTACKER_END
+        lines = script.get("attacker") or _ATTACKER_LINES
+        return lines[spoken % len(lines)]
+    return rng.choice(script.get(role) or _VICTIM_LINES)
+
+
+def fake_latency_sec() -> float:
+    median = float(settings.LLM_FAKE_LATENCY_MEDIAN_MS) / 1000.0
+    if median <= 0:
+        return 0.0
+    sigma = float(settings.LLM_FAKE_LATENCY_SIGMA)
+    return random.lognormvariate(0.0, sigma) * median
+
+
+class FakeChatModel(BaseChatModel):
+    """역할별 대사/JSON을 지연과 함께 돌려주는 채팅 모델(스트리밍은 기본 구현)."""
+
+    role: str = "victim"
+    model_name: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        text = fake_reply(self.role, messages)
+        prompt_tokens = sum(
+            count_tokens(str(getattr(m, "content", ""))) for m in messages)
+        completion_tokens = count_tokens(text)
+        msg = AIMessage(text,
+                        response_metadata={"model_name": self.model_name},
+                        usage_metadata={
+                            "input_tokens": prompt_tokens,
+                            "output_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens,
+                        })
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+    def _generate(self,
+                  messages: List[BaseMessage],
+                  stop: Optional[List[str]] = None,
+                  run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        time.sleep(fake_latency_sec())
+        return self._result(messages)
+
+    async def _agenerate(self,
+                         messages: List[BaseMessage],
+                         stop: Optional[List[str]] = None,
+                         run_manager: Any = None,
+                         **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(fake_latency_sec())
+        return self._result(messages)
+
+
+def fake_chat(role: str, model: str = "fake") -> FakeChatModel:
+    return FakeChatModel(role=role, model_name=model)
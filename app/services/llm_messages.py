@@ -0,0 +1,22 @@
+# app/services/llm_messages.py
+from __future__ import annotations
+
+from typing import Any, List
+
+from langchain_core.messages import BaseMessage, HumanMessage, convert_to_messages
+from langchain_core.prompt_values import PromptValue
+
+# 채팅 모델 래퍼(캐시/한도/single-flight/캐스케이드)가 입력을 메시지 목록으로 볼 때 쓰는 공용 변환
+# - langchain_core 공개 API만 사용(BaseChatModel._convert_input과 같은 결과)
+#   PromptValue → to_messages(), 문자열 → [HumanMessage], 메시지/튜플/dict 목록 → convert_to_messages
+# - 래퍼끼리 private 메서드를 전달할 필요가 없음
+
+
+def as_messages(input: Any) -> List[BaseMessage]:
+    if isinstance(input, PromptValue):
+        return input.to_messages()
+    if isinstance(input, str):
+        return [HumanMessage(content=input)]
+    if isinstance(input, BaseMessage):
+        return [input]
+    return convert_to_messages(input)
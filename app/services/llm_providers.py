@@ -1,12 +1,216 @@
 # app/services/llm_providers.py
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import threading
+import httpx
 from app.core.config import settings
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
+from app.services.llm_cassette import wrap_chat
+from app.services.llm_cache import wrap_cache
+from app.services.llm_ratelimit import limited
+from app.services.llm_resilience import FailoverChat, ResilientChat
+from app.services.llm_fake import fake_chat, is_fake
+from app.services.llm_cost import LedgerChat
+from app.services.llm_cascade import CascadeChat
+from app.services.llm_endpoints import PooledChat, endpoint_pool
+from app.services.llm_singleflight import wrap_single_flight
+from app.services.turn_metrics import HTTPX_EVENT_HOOKS, AHTTPX_EVENT_HOOKS
+
+
+# =========================
+# 클라이언트 레지스트리
+# (provider, model, temperature, timeout, key)마다 채팅 모델 1개를 재사용하고,
+# OpenAI 모델들은 keep-alive 커넥션 풀(httpx)을 함께 쓴다.
+# httpx.AsyncClient는 이벤트 루프에 묶이므로 비동기 풀/모델은 루프별로 따로 둔다.
+# =========================
+class _ClientRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple, Tuple[Any, Any]] = {}  # key -> (loop, model)
+        self._http: httpx.Client | None = None
+        self._ahttp: Dict[int, Tuple[Any, httpx.AsyncClient]] = {}
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SEC,
+        )
+
+    @staticmethod
+    def _running_loop():
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def _prune(self) -> None:
+        # 닫힌 루프(asyncio.run 종료)에 묶인 풀/모델 정리 (lock 안에서 호출)
+        for lid in [k for k, v in self._ahttp.items()
+                    if v[0] is not None and v[0].is_closed()]:
+            del self._ahttp[lid]
+        for k in [k for k, v in self._models.items()
+                  if v[0] is not None and v[0].is_closed()]:
+            del self._models[k]
+
+    def http_client(self) -> httpx.Client:
+        # 요청마다 훅이 불려 턴 계측의 retries(같은 호출의 재요청 수)를 센다
+        with self._lock:
+            if self._http is None or self._http.is_closed:
+                self._http = httpx.Client(limits=self._limits(),
+                                          event_hooks=HTTPX_EVENT_HOOKS)
+            return self._http
+
+    def http_async_client(self) -> httpx.AsyncClient:
+        loop = self._running_loop()
+        with self._lock:
+            entry = self._ahttp.get(id(loop))
+            if entry is None or entry[0] is not loop or entry[1].is_closed:
+                self._prune()
+                entry = (loop,
+                         httpx.AsyncClient(limits=self._limits(),
+                                           event_hooks=AHTTPX_EVENT_HOOKS))
+                self._ahttp[id(loop)] = entry
+            return entry[1]
+
+    def get(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        loop = self._running_loop()
+        full_key = key + (id(loop), )
+        with self._lock:
+            entry = self._models.get(full_key)
+            if entry is not None and entry[0] is loop:
+                self.reused += 1
+                return entry[1]
+        model = factory()
+        with self._lock:
+            self._models[full_key] = (loop, model)
+            self.created += 1
+        return model
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "created": self.created,
+                "reused": self.reused,
+                "async_pools": len(self._ahttp),
+            }
+
+    def close(self) -> None:
+        """동기 풀 닫기 + 레지스트리 비우기(다음 호출 때 새로 생성)."""
+        with self._lock:
+            http, self._http = self._http, None
+            self._models.clear()
+            # 루프 밖에서 만든(동기 경로 모델용, 실제로 쓰이지 않은) 비동기 풀도 버림
+            self._ahttp.pop(id(None), None)
+        if http is not None:
+            http.close()
+
+    async def aclose(self) -> None:
+        """현재 이벤트 루프의 비동기 풀 닫기 + 그 루프에 묶인 모델 제거."""
+        loop = self._running_loop()
+        with self._lock:
+            entry = self._ahttp.pop(id(loop), None)
+            for k in [k for k, v in self._models.items() if v[0] is loop]:
+                del self._models[k]
+        if entry is not None:
+            await entry[1].aclose()
+
+
+_registry = _ClientRegistry()
+
+
+def close_llm_clients() -> None:
+    _registry.close()
+
+
+async def aclose_llm_clients() -> None:
+    await _registry.aclose()
+
+
+def llm_client_stats() -> Dict[str, Any]:
+    return _registry.stats()
+
+
+def _key_id(key: Optional[str]) -> str:
+    return hashlib.sha256((key or "").encode("utf-8")).hexdigest()[:12]
+
+
+def _openai_model(model: str,
+                  temperature: float,
+                  timeout: float,
+                  api_key: Optional[str],
+                  base_url: Optional[str] = None):
+    # 모든 호출은 (provider, model, key)별 RPM/TPM 버킷을 통과
+    kwargs: Dict[str, Any] = {"api_key": api_key} if api_key else {}
+    if base_url:
+        kwargs["base_url"] = base_url
+        # 로컬 OpenAI 호환 서버는 키가 없어도 됨(클라이언트 생성용 더미 키)
+        kwargs.setdefault("api_key", "EMPTY")
+    key_id = _key_id(api_key or base_url)
+    llm = _registry.get(
+        ("openai", model, temperature, timeout, key_id, base_url),
+        lambda: ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            timeout=timeout,
+            stream_usage=True,  # 스트리밍에서도 토큰 usage 수신
+            max_retries=0,  # 재시도는 ResilientChat이 분류해서 처리
+            http_client=_registry.http_client(),
+            http_async_client=_registry.http_async_client(),
+            **kwargs,
+        ))
+    return limited(llm, "openai", model, key_id)
+
+
+def _openai(model: str, temperature: float, timeout: float):
+    # 재시도/브레이커가 바깥: 재시도마다 버킷을 다시 통과
+    if endpoint_pool.enabled():
+        # 엔드포인트 풀: 시도마다 least-outstanding으로 엔드포인트(키/서버)를 고름
+        return ResilientChat(
+            PooledChat(
+                model, lambda ep: _openai_model(model, temperature, timeout,
+                                                ep.api_key, ep.base_url)),
+            "openai")
+    return ResilientChat(
+        _openai_model(model, temperature, timeout, settings.OPENAI_API_KEY),
+        "openai")
+
+
+def _has_openai() -> bool:
+    return bool(settings.OPENAI_API_KEY or endpoint_pool.enabled())
+
+
+def _chat(role: str,
+          factory: Callable[[], Any],
+          model: str,
+          temperature: float,
+          composite: bool = False):
+    # cassette(record/replay) 바깥, 응답 캐시 안쪽 — 역할별 캐시 opt-in은 LLM_CACHE_ROLES
+    # composite=True: factory가 모델 여러 개를 직접 조립(피해자 캐스케이드)
+    #   → 가짜 모델 치환/원장은 factory 안에서 모델별로 처리
+    if is_fake(model) and not composite:
+        # 부하 테스트용: 네트워크/키 없이 역할별 가짜 응답
+        factory = lambda: fake_chat(role, model)
+    # 원장(비용 기록·예산 확인)은 캐시 안쪽: 실제 프로바이더 호출만 기록
+    # single-flight는 캐시와 원장 사이: 캐시 미스가 동시에 몰려도 업스트림 1번, 원장 1행
+    params = {"temperature": temperature}
+    inner = factory if composite else (
+        lambda: LedgerChat(factory(), role, model))
+    return wrap_chat(
+        role, lambda: wrap_cache(
+            role, wrap_single_flight(role, inner(), model, params), model,
+            params), model)
 
 
 def openai_chat(model: Optional[str] = None, temperature: float = 0.7):
-    if not settings.OPENAI_API_KEY:
+    if not _has_openai():
         raise RuntimeError("OPENAI_API_KEY not set")
 
     mdl = model or settings.ADMIN_MODEL
@@ -15,55 +219,114 @@ def openai_chat(model: Optional[str] = None, temperature: float = 0.7):
 
     if is_o_series:
         # ❗ 기본값(0.7)이 실수로 들어가지 않게 temperature=1을 **명시적으로** 전달
-        return ChatOpenAI(
-            model=mdl,
-            temperature=1,  # ← 이것이 핵심
-            api_key=settings.OPENAI_API_KEY,
-            timeout=6000)
+        return _openai(mdl, temperature=1, timeout=6000)  # ← 이것이 핵심
     else:
-        return ChatOpenAI(model=mdl,
-                          temperature=temperature,
-                          api_key=settings.OPENAI_API_KEY,
-                          timeout=600000)
+        return _openai(mdl, temperature=temperature, timeout=600000)
 
 
-def agent_chat():
-    return ChatOpenAI(
-        model=getattr(settings, "AGENT_MODEL", "o4-mini"),
-        temperature=1,
-        timeout=600000,
-    )
+def agent_chat(role: str = "agent"):
+    # role: "planner" | "assessor" | "agent" (cassette 키 구분용)
+    model = settings.AGENT_MODEL
+    return _chat(role, lambda: _openai(model, temperature=1, timeout=600000),
+                 model, 1)
 
 
 def gemini_chat(model: Optional[str] = None, temperature: float = 0.7):
     if not settings.GOOGLE_API_KEY:
         raise RuntimeError("GOOGLE_API_KEY not set")
-    return ChatGoogleGenerativeAI(
-        model=model or "gemini-2.5-flash-lite",
-        google_api_key=settings.GOOGLE_API_KEY,
-        temperature=temperature,
-        timeout=600000,
-    )
+    mdl = model or "gemini-2.5-flash-lite"
+    key_id = _key_id(settings.GOOGLE_API_KEY)
+    llm = _registry.get(
+        ("gemini", mdl, temperature, 600000, key_id),
+        lambda: ChatGoogleGenerativeAI(
+            model=mdl,
+            google_api_key=settings.GOOGLE_API_KEY,
+            temperature=temperature,
+            timeout=600000,
+            max_retries=0,
+        ))
+    return ResilientChat(limited(llm, "gemini", mdl, key_id), "gemini")
 
 
 def attacker_chat():
     # gpt-4.1-mini는 temperature 조절 가능
-    return openai_chat(settings.ATTACKER_MODEL, temperature=0.7)
+    return _chat(
+        "attacker",
+        lambda: openai_chat(settings.ATTACKER_MODEL, temperature=0.7),
+        settings.ATTACKER_MODEL, 0.7)
 
 
-def victim_chat():
-    provider = getattr(settings, "VICTIM_PROVIDER", "openai").lower()
-    model = settings.VICTIM_MODEL
+_FAILOVER_DEFAULT_MODEL = {
+    "openai": "gpt-4.1-mini",
+    "gemini": "gemini-2.5-flash-lite",
+}
+
+
+def _provider_chat(provider: str, model: str):
     if provider == "gemini":
         return gemini_chat(model, temperature=0.7)
-    elif provider == "openai":
-        return openai_chat(model, temperature=0.7)
+    return openai_chat(model, temperature=0.7)
+
+
+def _victim_llm(provider: str, model: str):
+    primary = _provider_chat(provider, model)
+    if not settings.VICTIM_FAILOVER:
+        return primary
+    # openai ↔ gemini: 주 프로바이더가 재시도 후에도 429/5xx/네트워크 오류거나 브레이커가 열리면 전환
+    other = "gemini" if provider == "openai" else "openai"
+    other_ready = (bool(settings.GOOGLE_API_KEY)
+                   if other == "gemini" else _has_openai())
+    if not other_ready:
+        return primary
+    fallback = _provider_chat(
+        other, settings.VICTIM_FAILOVER_MODEL or _FAILOVER_DEFAULT_MODEL[other])
+    return FailoverChat(primary, fallback, provider, other)
+
+
+_CASCADE_DEFAULT_MODEL = {
+    "openai": "gpt-4.1-nano",
+    "gemini": "gemini-2.5-flash-lite",
+    "fake": "fake-small",
+}
+
+
+def _victim_cascade(provider: str, model: str):
+    # 작은 모델은 같은 프로바이더(페일오버 없음, 실패하면 큰 모델로 승격), 큰 모델은 기존 경로
+    small_model = (settings.VICTIM_CASCADE_MODEL
+                   or _CASCADE_DEFAULT_MODEL[provider])
+    if provider == "fake":
+        small, strong = fake_chat("victim", small_model), fake_chat(
+            "victim", model)
     else:
+        small = _provider_chat(provider, small_model)
+        strong = _victim_llm(provider, model)
+    # 원장은 모델별로: 버려진 작은 모델 호출도 비용에 잡힘
+    return CascadeChat(LedgerChat(small, "victim", small_model),
+                       LedgerChat(strong, "victim", model), small_model,
+                       model)
+
+
+def victim_chat():
+    provider = getattr(settings, "VICTIM_PROVIDER", "openai").lower()
+    model = "fake" if provider == "fake" else settings.VICTIM_MODEL
+    if provider not in _CASCADE_DEFAULT_MODEL:
         raise ValueError(
-            f"Unsupported VICTIM_PROVIDER: {provider}. Use 'openai' or 'gemini'."
-        )
+            f"Unsupported VICTIM_PROVIDER: {provider}. "
+            "Use 'openai', 'gemini' or 'fake'.")
+    if settings.VICTIM_CASCADE:
+        return _chat("victim",
+                     lambda: _victim_cascade(provider, model),
+                     model,
+                     0.7,
+                     composite=True)
+    if provider == "fake":
+        return _chat("victim", lambda: fake_chat("victim", "fake"), "fake",
+                     0.7)
+    return _chat("victim", lambda: _victim_llm(provider, model), model, 0.7)
 
 
-def admin_chat():
+def admin_chat(model: str | None = None):
     # o4-mini 경로 → temperature=1이 강제되도록 openai_chat 내부 분기 사용
-    return openai_chat(settings.ADMIN_MODEL)
+    # model: 재판정 등에서 ADMIN_MODEL 대신 쓸 모델
+    mdl = model or settings.ADMIN_MODEL
+    return _chat("admin", lambda: openai_chat(mdl), mdl, 0.7)
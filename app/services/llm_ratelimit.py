@@ -0,0 +1,360 @@
+# app/services/llm_ratelimit.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, AsyncIterator, Optional, Tuple
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.services.context_window import count_tokens
+from app.services.llm_messages import as_messages
+
+# 공용 토큰 버킷 한도기: (provider, model, key)마다 RPM/TPM 두 버킷
+# - 버킷 용량 = 분당 한도 × (LLM_RATE_LIMIT_BURST_SEC / 60) → 순간 몰림 대신 고르게 소진
+# - 호출 전 (프롬프트 토큰 + 예상 출력 토큰)을 선차감, 응답 후 실제 usage로 정산
+# - 모드: off | local(프로세스 내) | file(로컬 파일 잠금, 같은 머신의 여러 프로세스)
+#         | postgres(앱 DB llm_rate_bucket 테이블, 여러 머신)
+# 상태 = (남은 요청 수, 남은 토큰 수, 마지막 갱신 시각)
+_State = Tuple[float, float, float]
+
+
+@dataclass(frozen=True)
+class Limits:
+    rpm: int
+    tpm: int
+    burst_sec: float
+
+    @property
+    def req_cap(self) -> float:
+        return max(1.0, self.rpm * self.burst_sec / 60.0)
+
+    @property
+    def tok_cap(self) -> float:
+        return max(1.0, self.tpm * self.burst_sec / 60.0)
+
+
+def limits_for(model: str) -> Limits:
+    """LLM_RATE_LIMITS("모델=rpm:tpm,...")에 있으면 그 값, 없으면 LLM_RPM/LLM_TPM."""
+    rpm, tpm = settings.LLM_RPM, settings.LLM_TPM
+    for item in (settings.LLM_RATE_LIMITS or "").split(","):
+        name, _, val = item.partition("=")
+        if name.strip() == model and val:
+            r, _, t = val.partition(":")
+            rpm = int(r) if r.strip() else rpm
+            tpm = int(t) if t.strip() else tpm
+    return Limits(rpm, tpm, float(settings.LLM_RATE_LIMIT_BURST_SEC))
+
+
+def _take(state: Optional[_State], need: float, lim: Limits,
+          now: float) -> Tuple[_State, float]:
+    """버킷 보충 후 요청 1개 + need 토큰을 꺼낸다. return: (새 상태, 기다릴 초; 0이면 통과)"""
+    if state is None:
+        req, tok = lim.req_cap, lim.tok_cap
+    else:
+        req, tok, updated = state
+        elapsed = max(0.0, now - updated)
+        req = min(lim.req_cap, req + elapsed * lim.rpm / 60.0)
+        tok = min(lim.tok_cap, tok + elapsed * lim.tpm / 60.0)
+    # 용량보다 큰 호출은 버킷이 가득 찼을 때 통과(이후 정산에서 빚으로 남음)
+    need = min(need, lim.tok_cap)
+    if req >= 1.0 and tok >= need:
+        return (req - 1.0, tok - need, now), 0.0
+    wait = max((1.0 - req) * 60.0 / max(lim.rpm, 1),
+               (need - tok) * 60.0 / max(lim.tpm, 1), 0.01)
+    return (req, tok, now), wait
+
+
+def _settle(state: Optional[_State], delta: float, lim: Limits,
+            now: float) -> _State:
+    """실제 사용량 - 선차감분(delta)을 토큰 버킷에 반영(음수면 환급)."""
+    req, tok, updated = state or (lim.req_cap, lim.tok_cap, now)
+    return req, min(lim.tok_cap, tok - delta), updated
+
+
+class _LocalBackend:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, _State] = {}
+
+    def take(self, key: str, need: float, lim: Limits) -> float:
+        with self._lock:
+            self._state[key], wait = _take(self._state.get(key), need, lim,
+                                           time.time())
+            return wait
+
+    def settle(self, key: str, delta: float, lim: Limits) -> None:
+        with self._lock:
+            self._state[key] = _settle(self._state.get(key), delta, lim,
+                                       time.time())
+
+
+class _FileBackend:
+    """같은 머신의 프로세스끼리 JSON 파일 하나를 flock으로 공유."""
+
+    def __init__(self, path: str):
+        import fcntl  # POSIX 전용
+        self._fcntl = fcntl
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _update(self, key: str, fn) -> Any:
+        with self._lock, open(self.path + ".lock", "a") as lf:
+            self._fcntl.flock(lf, self._fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    data = {}
+                cur = data.get(key)
+                new, out = fn(tuple(cur) if cur else None)
+                data[key] = list(new)
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+                return out
+            finally:
+                self._fcntl.flock(lf, self._fcntl.LOCK_UN)
+
+    def take(self, key: str, need: float, lim: Limits) -> float:
+        return self._update(key, lambda s: _take(s, need, lim, time.time()))
+
+    def settle(self, key: str, delta: float, lim: Limits) -> None:
+        self._update(key, lambda s:
+                     (_settle(s, delta, lim, time.time()), None))
+
+
+class _PostgresBackend:
+    """여러 머신/프로세스가 llm_rate_bucket 행을 SELECT ... FOR UPDATE로 공유."""
+
+    def _update(self, key: str, lim: Limits, fn) -> Any:
+        from sqlalchemy import select, update
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from app.db import models as m
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            db.execute(
+                pg_insert(m.LLMRateBucket).values(
+                    key=key,
+                    requests=lim.req_cap,
+                    tokens=lim.tok_cap,
+                    updated_at=time.time()).on_conflict_do_nothing(
+                        index_elements=["key"]))
+            row = db.execute(
+                select(m.LLMRateBucket).where(
+                    m.LLMRateBucket.key == key).with_for_update()).scalar_one()
+            new, out = fn((row.requests, row.tokens, row.updated_at))
+            db.execute(
+                update(m.LLMRateBucket).where(
+                    m.LLMRateBucket.key == key).values(requests=new[0],
+                                                       tokens=new[1],
+                                                       updated_at=new[2]))
+            db.commit()
+            return out
+
+    def take(self, key: str, need: float, lim: Limits) -> float:
+        return self._update(key, lim,
+                            lambda s: _take(s, need, lim, time.time()))
+
+    def settle(self, key: str, delta: float, lim: Limits) -> None:
+        self._update(key, lim, lambda s:
+                     (_settle(s, delta, lim, time.time()), None))
+
+
+class RateLimiter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backend = None
+        self._backend_mode: str | None = None
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def mode(self) -> str:
+        return (settings.LLM_RATE_LIMIT_MODE or "off").lower()
+
+    def backend(self):
+        mode = self.mode
+        with self._lock:
+            if self._backend is None or self._backend_mode != mode:
+                if mode == "local":
+                    self._backend = _LocalBackend()
+                elif mode == "file":
+                    self._backend = _FileBackend(settings.LLM_RATE_LIMIT_FILE)
+                elif mode == "postgres":
+                    self._backend = _PostgresBackend()
+                else:
+                    raise ValueError(
+                        f"Unsupported LLM_RATE_LIMIT_MODE: {mode}. "
+                        "Use 'off', 'local', 'file' or 'postgres'.")
+                self._backend_mode = mode
+            return self._backend
+
+    def _record(self, key: str, waited: float, est: float) -> None:
+        with self._lock:
+            st = self._stats.setdefault(key, {
+                "calls": 0,
+                "throttled": 0,
+                "wait_sec": 0.0,
+                "tokens_reserved": 0.0,
+                "tokens_used": 0.0,
+            })
+            st["calls"] += 1
+            st["throttled"] += int(waited > 0)
+            st["wait_sec"] += waited
+            st["tokens_reserved"] += est
+
+    def _record_used(self, key: str, used: float) -> None:
+        with self._lock:
+            if key in self._stats:
+                self._stats[key]["tokens_used"] += used
+
+    @staticmethod
+    def _jitter(wait: float) -> float:
+        # 여러 프로세스가 같은 시각에 깨어나 다시 몰리지 않도록
+        return min(wait, 5.0) * (1.0 + random.random() * 0.1)
+
+    def acquire(self, key: str, need: float, lim: Limits) -> float:
+        backend = self.backend()
+        waited = 0.0
+        while True:
+            wait = backend.take(key, need, lim)
+            if wait <= 0:
+                self._record(key, waited, need)
+                return waited
+            wait = self._jitter(wait)
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, key: str, need: float, lim: Limits) -> float:
+        backend = self.backend()
+        local = isinstance(backend, _LocalBackend)
+        waited = 0.0
+        while True:
+            wait = (backend.take(key, need, lim) if local else await
+                    asyncio.to_thread(backend.take, key, need, lim))
+            if wait <= 0:
+                self._record(key, waited, need)
+                return waited
+            wait = self._jitter(wait)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def settle(self, key: str, reserved: float, used: float | None,
+               lim: Limits) -> None:
+        if used is None:
+            return
+        self._record_used(key, used)
+        if used != reserved:
+            self.backend().settle(key, used - reserved, lim)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "buckets": {
+                    k: {
+                        **v, "wait_sec": round(v["wait_sec"], 3)
+                    }
+                    for k, v in self._stats.items()
+                },
+            }
+
+
+rate_limiter = RateLimiter()
+
+
+def _usage_total(msg: Any) -> float | None:
+    usage = getattr(msg, "usage_metadata", None) or {}
+    total = usage.get("total_tokens")
+    if total is None and usage:
+        total = (usage.get("input_tokens") or 0) + (usage.get("output_tokens")
+                                                    or 0)
+    return None if total is None else float(total)
+
+
+class RateLimitedChat(Runnable):
+    """채팅 모델을 감싸 호출 전 토큰 버킷을 통과시킨다(invoke/stream 모두)."""
+
+    def __init__(self, llm: Any, provider: str, model: str, key_id: str):
+        self.llm = llm
+        self.model = model
+        self.key = f"{provider}:{model}:{key_id}"
+
+    def _estimate(self, input: Any) -> float:
+        try:
+            messages = as_messages(input)
+            prompt = sum(
+                count_tokens(m.content if isinstance(m.content, str) else
+                             json.dumps(m.content, ensure_ascii=False))
+                for m in messages)
+        except Exception:
+            prompt = count_tokens(str(input))
+        return float(prompt + settings.LLM_RATE_LIMIT_OUTPUT_TOKENS)
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        lim, need = limits_for(self.model), self._estimate(input)
+        rate_limiter.acquire(self.key, need, lim)
+        resp = self.llm.invoke(input, config, **kwargs)
+        rate_limiter.settle(self.key, need, _usage_total(resp), lim)
+        return resp
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        lim, need = limits_for(self.model), self._estimate(input)
+        await rate_limiter.aacquire(self.key, need, lim)
+        resp = await self.llm.ainvoke(input, config, **kwargs)
+        await asyncio.to_thread(rate_limiter.settle, self.key, need,
+                                _usage_total(resp), lim)
+        return resp
+
+    def stream(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Iterator[Any]:
+        lim, need = limits_for(self.model), self._estimate(input)
+        rate_limiter.acquire(self.key, need, lim)
+        used = None
+        for chunk in self.llm.stream(input, config, **kwargs):
+            n = _usage_total(chunk)
+            if n is not None:
+                used = (used or 0.0) + n
+            yield chunk
+        rate_limiter.settle(self.key, need, used, lim)
+
+    async def astream(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[Any]:
+        lim, need = limits_for(self.model), self._estimate(input)
+        await rate_limiter.aacquire(self.key, need, lim)
+        used = None
+        async for chunk in self.llm.astream(input, config, **kwargs):
+            n = _usage_total(chunk)
+            if n is not None:
+                used = (used or 0.0) + n
+            yield chunk
+        await asyncio.to_thread(rate_limiter.settle, self.key, need, used,
+                                lim)
+
+
+def limited(llm: Any, provider: str, model: str, key_id: str) -> Any:
+    """LLM_RATE_LIMIT_MODE가 off가 아니면 RateLimitedChat으로 감싼다."""
+    if rate_limiter.mode == "off":
+        return llm
+    return RateLimitedChat(llm, provider, model, key_id)
@@ -0,0 +1,417 @@
+# app/services/llm_resilience.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+import asyncio
+import random
+import threading
+import time
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# LLM 호출 복원력
+# - 분류된 재시도: 429 / 5xx / 네트워크·타임아웃만 지수 백오프(+지터)로 재시도, 그 외 4xx는 즉시 실패
+# - 프로바이더별 서킷 브레이커: 연속 실패가 쌓이면 잠시 차단(open) → 시험 호출 1건(half_open) → 복구
+# - (선택) 피해자 페일오버: openai ↔ gemini
+RETRYABLE = {"rate_limit", "server", "network"}
+
+
+class CircuitOpenError(RuntimeError):
+    """브레이커가 열려 있어 호출하지 않음(페일오버 대상)."""
+
+
+def status_of(exc: BaseException) -> int | None:
+    for cand in (getattr(exc, "status_code", None), getattr(exc, "code", None),
+                 getattr(getattr(exc, "response", None), "status_code",
+                         None)):
+        if isinstance(cand, int):
+            return cand
+    return None
+
+
+def classify(exc: BaseException) -> str:
+    """rate_limit | server | network | client | circuit_open | unknown"""
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    status = status_of(exc)
+    if status is not None:
+        if status == 429:
+            return "rate_limit"
+        if status >= 500:
+            return "server"
+        if status in (408, 409):  # 요청 타임아웃 / 일시 충돌
+            return "network"
+        if 400 <= status < 500:
+            return "client"
+    name = type(exc).__name__
+    if isinstance(exc, (TimeoutError, ConnectionError)) or any(
+            s in name
+            for s in ("Timeout", "Connection", "Transport", "NetworkError")):
+        return "network"
+    if any(s in name for s in ("RateLimit", "ResourceExhausted")):
+        return "rate_limit"
+    if any(s in name for s in ("ServiceUnavailable", "InternalServerError",
+                               "ServerError", "DeadlineExceeded")):
+        return "server"
+    return "unknown"
+
+
+def retry_after(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        val = headers.get("retry-after")
+        return float(val) if val is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_sec(attempt: int, exc: BaseException | None = None) -> float:
+    """full jitter: U(0, min(max, base·2^attempt)), Retry-After가 더 길면 그 값."""
+    cap = min(float(settings.LLM_RETRY_MAX_SEC),
+              float(settings.LLM_RETRY_BASE_SEC) * (2**attempt))
+    delay = random.uniform(0, cap)
+    hinted = retry_after(exc) if exc is not None else None
+    return max(delay, hinted or 0.0)
+
+
+class CircuitBreaker:
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0  # 연속 실패 수
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self._probing = False
+        self._probe_at = 0.0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self.opened_at < float(settings.LLM_BREAKER_RESET_SEC):
+                    return False
+                self.state = "half_open"
+                self._probing = False
+            # half_open: 시험 호출은 한 번에 하나만
+            # (결과를 알리지 못하고 사라진 시험 호출은 LLM_BREAKER_PROBE_TIMEOUT_SEC 후 새로 허용)
+            if self._probing and now - self._probe_at < float(
+                    settings.LLM_BREAKER_PROBE_TIMEOUT_SEC):
+                return False
+            self._probing = True
+            self._probe_at = now
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"[BREAKER] {self.name} closed")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or (
+                    self.state == "closed" and
+                    self.failures >= int(settings.LLM_BREAKER_FAILURES)):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.opened_count += 1
+                logger.warning(f"[BREAKER] {self.name} open "
+                               f"(failures={self.failures})")
+
+    def release(self) -> None:
+        # 재시도 불가 오류(4xx 등)는 프로바이더 장애가 아니므로 상태만 되돌림
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "opened_count": self.opened_count,
+            }
+
+
+class _Stats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.data: Dict[str, Dict[str, int]] = {}
+
+    def add(self, provider: str, field: str, n: int = 1) -> None:
+        with self._lock:
+            st = self.data.setdefault(provider, {})
+            st[field] = st.get(field, 0) + n
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self.data.items()}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_stats = _Stats()
+
+
+def breaker_for(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def resilience_stats() -> Dict[str, Any]:
+    counters = _stats.snapshot()
+    with _breakers_lock:
+        names = set(_breakers) | set(counters)
+        return {
+            name: {
+                **(_breakers[name].stats() if name in _breakers else {
+                    "state": "closed"
+                }),
+                **counters.get(name, {}),
+            }
+            for name in sorted(names)
+        }
+
+
+class ResilientChat(Runnable):
+    """재시도 + 서킷 브레이커. 스트리밍은 첫 청크 전 실패만 재시도."""
+
+    def __init__(self, llm: Any, provider: str):
+        self.llm = llm
+        self.provider = provider
+        self.breaker = breaker_for(provider)
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            _stats.add(self.provider, "short_circuited")
+            raise CircuitOpenError(f"{self.provider} circuit is open")
+        _stats.add(self.provider, "calls")
+
+    def _on_error(self, exc: BaseException, attempt: int) -> float | None:
+        """재시도하면 대기 초, 아니면 None(브레이커는 호출 단위로 실패 집계)."""
+        kind = classify(exc)
+        _stats.add(self.provider, f"errors_{kind}")
+        if kind not in RETRYABLE:
+            self.breaker.release()
+            return None
+        if attempt >= int(settings.LLM_RETRY_MAX):
+            self.breaker.failure()
+            return None
+        _stats.add(self.provider, "retries")
+        delay = backoff_sec(attempt, exc)
+        logger.warning(f"[RETRY] {self.provider} {kind} attempt={attempt + 1} "
+                       f"sleep={delay:.2f}s: {exc}")
+        return delay
+
+    @contextmanager
+    def _probe_guard(self) -> Iterator[None]:
+        """
+        취소(CancelledError)·스트림 중단(GeneratorExit) 등 Exception이 아닌 종료도
+        시험 호출 자리를 돌려줌(안 그러면 half_open에 갇혀 계속 차단).
+        """
+        try:
+            yield
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                self.breaker.release()
+            raise
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        self._admit()
+        with self._probe_guard():
+            return self._invoke(input, config, **kwargs)
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        self._admit()
+        with self._probe_guard():
+            return await self._ainvoke(input, config, **kwargs)
+
+    def stream(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Iterator[Any]:
+        self._admit()
+        with self._probe_guard():
+            yield from self._stream(input, config, **kwargs)
+
+    async def astream(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[Any]:
+        self._admit()
+        with self._probe_guard():
+            async for chunk in self._astream(input, config, **kwargs):
+                yield chunk
+
+    def _invoke(self, input: Any, config: Optional[RunnableConfig],
+                **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                resp = self.llm.invoke(input, config, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.success()
+            return resp
+
+    async def _ainvoke(self, input: Any, config: Optional[RunnableConfig],
+                       **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                resp = await self.llm.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.success()
+            return resp
+
+    def _stream(self, input: Any, config: Optional[RunnableConfig],
+                **kwargs: Any) -> Iterator[Any]:
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for chunk in self.llm.stream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                delay = None if started else self._on_error(e, attempt)
+                if delay is None:
+                    if started:
+                        self.breaker.failure()
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.success()
+            return
+
+    async def _astream(self, input: Any, config: Optional[RunnableConfig],
+                       **kwargs: Any) -> AsyncIterator[Any]:
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async for chunk in self.llm.astream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                delay = None if started else self._on_error(e, attempt)
+                if delay is None:
+                    if started:
+                        self.breaker.failure()
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.success()
+            return
+
+
+def _fails_over(exc: BaseException) -> bool:
+    return classify(exc) in RETRYABLE | {"circuit_open"}
+
+
+class FailoverChat(Runnable):
+    """주 모델이 재시도 후에도 일시 오류(또는 브레이커 open)면 예비 모델로 전환."""
+
+    def __init__(self, primary: Any, fallback: Any, primary_name: str,
+                 fallback_name: str):
+        self.primary = primary
+        self.fallback = fallback
+        self.primary_name = primary_name
+        self.fallback_name = fallback_name
+
+    def _switch(self, exc: BaseException) -> None:
+        _stats.add(self.primary_name, "failovers")
+        logger.warning(f"[FAILOVER] {self.primary_name} → "
+                       f"{self.fallback_name}: {exc}")
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        try:
+            return self.primary.invoke(input, config, **kwargs)
+        except Exception as e:
+            if not _fails_over(e):
+                raise
+            self._switch(e)
+        return self.fallback.invoke(input, config, **kwargs)
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        try:
+            return await self.primary.ainvoke(input, config, **kwargs)
+        except Exception as e:
+            if not _fails_over(e):
+                raise
+            self._switch(e)
+        return await self.fallback.ainvoke(input, config, **kwargs)
+
+    def stream(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Iterator[Any]:
+        started = False
+        try:
+            for chunk in self.primary.stream(input, config, **kwargs):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or not _fails_over(e):
+                raise
+            self._switch(e)
+        yield from self.fallback.stream(input, config, **kwargs)
+
+    async def astream(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[Any]:
+        started = False
+        try:
+            async for chunk in self.primary.astream(input, config, **kwargs):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or not _fails_over(e):
+                raise
+            self._switch(e)
+        async for chunk in self.fallback.astream(input, config, **kwargs):
+            yield chunk
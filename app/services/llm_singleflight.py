@@ -0,0 +1,186 @@
+# app/services/llm_singleflight.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import threading
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.services.llm_cache import cache_key
+from app.services.llm_messages import as_messages
+
+# 진행 중인 같은 요청 합치기(single-flight)
+# - 키: 응답 캐시와 같은 해시(모델 + 파라미터 + 렌더링된 메시지)
+# - 먼저 온 호출(leader)만 업스트림을 부르고, 그동안 들어온 같은 키 호출은 그 결과(또는 예외)를 공유
+# - 동기 호출은 스레드끼리, 비동기 호출은 같은 이벤트 루프 안에서만 합침
+# - 스트리밍은 합치지 않음(청크를 각자 받아야 함)
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+def _copy(resp: Any) -> Any:
+    # 대기자마다 별도 메시지 객체(호출자가 고쳐도 서로 영향 없음)
+    copy = getattr(resp, "model_copy", None)
+    return copy(deep=True) if callable(copy) else resp
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync: Dict[str, _Flight] = {}
+        self._async: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.calls = 0  # 업스트림으로 나간 호출
+        self.coalesced = 0  # 합쳐져서 아낀 호출
+        self.by_role: Dict[str, Dict[str, int]] = {}
+
+    def roles(self) -> set[str]:
+        return {
+            r.strip().lower()
+            for r in (settings.LLM_SINGLEFLIGHT_ROLES or "").split(",")
+            if r.strip()
+        }
+
+    def enabled_for(self, role: str) -> bool:
+        return role.lower() in self.roles()
+
+    def _count(self, role: str, field: str) -> None:
+        # lock 안에서 호출
+        setattr(self, field, getattr(self, field) + 1)
+        st = self.by_role.setdefault(role, {"calls": 0, "coalesced": 0})
+        st[field] += 1
+
+    def do(self, role: str, key: str, fn) -> Any:
+        with self._lock:
+            flight = self._sync.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync[key] = _Flight()
+            self._count(role, "calls" if leader else "coalesced")
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy(flight.result)
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._sync.pop(key, None)
+            flight.done.set()
+
+    async def ado(self, role: str, key: str, fn) -> Any:
+        loop = asyncio.get_running_loop()
+        fkey = (id(loop), key)
+        while True:
+            with self._lock:
+                fut = self._async.get(fkey)
+                leader = fut is None or fut.get_loop() is not loop
+                if leader:
+                    fut = self._async[fkey] = loop.create_future()
+                self._count(role, "calls" if leader else "coalesced")
+            if leader:
+                break
+            try:
+                return _copy(await asyncio.shield(fut))
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise  # 대기자 자신이 취소됨
+                # leader가 취소됨 → 이 호출이 다시 leader로 시도
+                with self._lock:
+                    self.coalesced -= 1
+                    self.by_role[role]["coalesced"] -= 1
+
+        try:
+            resp = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # 대기자가 없어도 "never retrieved" 경고 없음
+            raise
+        else:
+            fut.set_result(resp)
+            return resp
+        finally:
+            with self._lock:
+                if self._async.get(fkey) is fut:
+                    del self._async[fkey]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.calls + self.coalesced
+            return {
+                "roles": sorted(self.roles()),
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "saved_ratio": round(self.coalesced / total, 4) if total else 0.0,
+                "in_flight": len(self._sync) + len(self._async),
+                "by_role": {k: dict(v) for k, v in self.by_role.items()},
+            }
+
+
+single_flight = SingleFlight()
+
+
+class SingleFlightChat(Runnable):
+    """동시에 들어온 같은 invoke/ainvoke 요청을 업스트림 호출 1번으로 합침."""
+
+    def __init__(self, role: str, llm: Any, model: str,
+                 params: Dict[str, Any]):
+        self.role = role
+        self.llm = llm
+        self.model = model
+        self.params = params
+
+    def _key(self, input: Any, kwargs: Dict[str, Any]) -> str:
+        return cache_key(self.model, self.params, as_messages(input), kwargs)
+
+    def invoke(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any) -> Any:
+        return single_flight.do(
+            self.role, self._key(input, kwargs),
+            lambda: self.llm.invoke(input, config, **kwargs))
+
+    async def ainvoke(self,
+                      input: Any,
+                      config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> Any:
+        return await single_flight.ado(
+            self.role, self._key(input, kwargs),
+            lambda: self.llm.ainvoke(input, config, **kwargs))
+
+    def stream(self,
+               input: Any,
+               config: Optional[RunnableConfig] = None,
+               **kwargs: Any):
+        return self.llm.stream(input, config, **kwargs)
+
+    def astream(self,
+                input: Any,
+                config: Optional[RunnableConfig] = None,
+                **kwargs: Any):
+        return self.llm.astream(input, config, **kwargs)
+
+
+def wrap_single_flight(role: str, llm: Any, model: str,
+                       params: Dict[str, Any]) -> Any:
+    """역할이 대상이면 SingleFlightChat으로 감싸고, 아니면 그대로 반환."""
+    if not single_flight.enabled_for(role):
+        return llm
+    return SingleFlightChat(role, llm, model, params)
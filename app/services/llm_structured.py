@@ -0,0 +1,194 @@
+# app/services/llm_structured.py
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type, TypeVar
+import json
+import threading
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_function
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.utils.tolerant_json import TolerantJSONError, tolerant_loads
+
+logger = get_logger(__name__)
+
+# 판정/플래너/사후평가 구조화 출력
+# - 호출 시 OpenAI response_format(json_schema, strict)로 스키마를 강제(LLM_STRUCTURED_OUTPUT)
+# - 응답은 Pydantic 모델로 검증. JSON 문법이 깨졌으면 관대한 파서(tolerant_json)로 한 번 보정
+#   (코드펜스·스마트 따옴표·안쪽 따옴표·잘린 출력 등 → LLM 재호출 없이 복구, 통계의 repaired)
+# - 그래도 실패할 때만 짧은 재질의(re-ask): 원 프롬프트 없이
+#   스키마 + 검증 오류 + 이전 출력만 보내 "고쳐서 다시" 받는다(LLM_STRUCTURED_REASK회)
+# - 역할별 파싱 실패율 집계(/metrics/llm-structured)
+
+M = TypeVar("M", bound=BaseModel)
+
+_REASK_SYSTEM = ("이전 출력이 JSON 스키마 검증에 실패했다. 내용(판단·문장)은 그대로 두고 "
+                 "스키마에 맞는 JSON 객체 1개로만 고쳐서 출력하라. 코드블록·설명 금지.")
+
+
+class StructuredOutputError(ValueError):
+    """재질의까지 했는데도 스키마에 맞는 출력을 받지 못함."""
+
+
+@lru_cache(maxsize=None)
+def response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    fn = convert_to_openai_function(schema, strict=True)
+    fn["schema"] = fn.pop("parameters")
+    return {"type": "json_schema", "json_schema": fn}
+
+
+def bind_schema(llm: Any, schema: Type[BaseModel]) -> Any:
+    """LLM_STRUCTURED_OUTPUT이면 호출에 response_format을 실어 보냄(래퍼들이 kwargs를 그대로 전달)."""
+    if not settings.LLM_STRUCTURED_OUTPUT:
+        return llm
+    return llm.bind(response_format=response_format(schema))
+
+
+def _json_invalid(exc: ValueError) -> bool:
+    return isinstance(exc, ValidationError) and any(
+        e["type"] == "json_invalid" for e in exc.errors())
+
+
+def parse_output(schema: Type[M], text: str, role: str | None = None) -> M:
+    """
+    JSON 파싱 + 스키마 검증(실패 시 ValueError/ValidationError).
+    JSON 문법 오류일 때만 관대한 파서로 보정해 다시 검증(LLM_STRUCTURED_TOLERANT).
+    """
+    raw = (text or "").strip()
+    try:
+        return schema.model_validate_json(raw)
+    except ValueError as e:
+        if not (settings.LLM_STRUCTURED_TOLERANT and _json_invalid(e)):
+            raise
+        err = e
+    try:
+        data = tolerant_loads(raw)
+    except TolerantJSONError:
+        raise err from None
+    out = schema.model_validate(data)
+    if role is not None:
+        _stats.add(role, "repaired")
+    return out
+
+
+def _error_text(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "\n".join(f"- {'.'.join(map(str, e['loc']))}: {e['msg']}"
+                         for e in exc.errors()[:10])
+    return str(exc)[:500]
+
+
+def _reask_messages(schema: Type[BaseModel], raw: str, exc: Exception):
+    schema_json = json.dumps(response_format(schema)["json_schema"]["schema"],
+                             ensure_ascii=False)
+    return [
+        SystemMessage(_REASK_SYSTEM),
+        HumanMessage(f"[스키마]\n{schema_json}\n\n[검증 오류]\n{_error_text(exc)}"
+                     f"\n\n[이전 출력]\n{raw}"),
+    ]
+
+
+class _Stats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.data: Dict[str, Dict[str, int]] = {}
+
+    def add(self, role: str, field: str) -> None:
+        with self._lock:
+            st = self.data.setdefault(role, {
+                "calls": 0,
+                "repaired": 0,
+                "parse_failures": 0,
+                "reasks": 0,
+                "reask_ok": 0,
+                "failed": 0,
+            })
+            st[field] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {}
+            for role, st in self.data.items():
+                calls = st["calls"]
+                out[role] = {
+                    **st,
+                    "parse_failure_rate":
+                    round(st["parse_failures"] / calls, 4) if calls else 0.0,
+                }
+            return out
+
+
+_stats = _Stats()
+
+
+def structured_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+def _content(resp: Any) -> str:
+    return str(getattr(resp, "content", resp) or "")
+
+
+def structured_invoke(role: str,
+                      llm: Any,
+                      schema: Type[M],
+                      input: Any,
+                      prompt: Optional[Any] = None) -> M:
+    """(prompt |) llm 호출 → 스키마 검증, 실패 시에만 재질의."""
+    chain = bind_schema(llm, schema)
+    raw = _content((prompt | chain if prompt is not None else chain).invoke(input))
+    _stats.add(role, "calls")
+    try:
+        return parse_output(schema, raw, role)
+    except ValueError as e:  # ValidationError 포함
+        _stats.add(role, "parse_failures")
+        err = e
+    for _ in range(int(settings.LLM_STRUCTURED_REASK)):
+        _stats.add(role, "reasks")
+        logger.warning(f"[STRUCTURED] {role} re-ask: {_error_text(err)[:200]}")
+        raw = _content(chain.invoke(_reask_messages(schema, raw, err)))
+        try:
+            out = parse_output(schema, raw, role)
+        except ValueError as e:
+            err = e
+            continue
+        _stats.add(role, "reask_ok")
+        return out
+    _stats.add(role, "failed")
+    raise StructuredOutputError(
+        f"{role} 출력 스키마 검증 실패: {_error_text(err)}\nRAW:\n{raw[:500]}")
+
+
+async def astructured_invoke(role: str,
+                             llm: Any,
+                             schema: Type[M],
+                             input: Any,
+                             prompt: Optional[Any] = None) -> M:
+    chain = bind_schema(llm, schema)
+    raw = _content(await (prompt | chain if prompt is not None else chain
+                          ).ainvoke(input))
+    _stats.add(role, "calls")
+    try:
+        return parse_output(schema, raw, role)
+    except ValueError as e:
+        _stats.add(role, "parse_failures")
+        err = e
+    for _ in range(int(settings.LLM_STRUCTURED_REASK)):
+        _stats.add(role, "reasks")
+        logger.warning(f"[STRUCTURED] {role} re-ask: {_error_text(err)[:200]}")
+        raw = _content(await chain.ainvoke(_reask_messages(schema, raw, err)))
+        try:
+            out = parse_output(schema, raw, role)
+        except ValueError as e:
+            err = e
+            continue
+        _stats.add(role, "reask_ok")
+        return out
+    _stats.add(role, "failed")
+    raise StructuredOutputError(
+        f"{role} 출력 스키마 검증 실패: {_error_text(err)}\nRAW:\n{raw[:500]}")
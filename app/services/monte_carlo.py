@@ -0,0 +1,145 @@
+# app/services/monte_carlo.py
+from __future__ import annotations
+
+from statistics import NormalDist
+from typing import Any, AsyncIterator, Dict, Tuple
+from uuid import UUID
+import asyncio
+import copy
+import math
+
+from app.db import models as m
+from app.db.session import SessionLocal
+from app.core.config import settings
+from app.services.opening_cache import opening_cache_bypass
+from app.services.simulation import run_two_bot_simulation_async
+
+
+def wilson_interval(successes: int,
+                    n: int,
+                    confidence: float = 0.95) -> Tuple[float, float]:
+    """이항 비율의 Wilson score 신뢰구간(표본이 적거나 0%/100% 근처에서도 안정적)."""
+    if n <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def outcome_stats(phished: int, judged: int,
+                  confidence: float) -> Dict[str, Any]:
+    lo, hi = wilson_interval(phished, judged, confidence)
+    return {
+        "samples": judged,
+        "phished": phished,
+        "phishing_rate": round(phished / judged, 4) if judged else None,
+        "ci_low": round(lo, 4),
+        "ci_high": round(hi, 4),
+        "ci_half_width": round((hi - lo) / 2, 4),
+        "confidence": confidence,
+    }
+
+
+def _read_verdict(db, case_id: UUID) -> bool | None:
+    case = db.get(m.AdminCase, case_id)
+    return None if case is None else case.phishing
+
+
+async def _one_sample(req: Any) -> Dict[str, Any]:
+    """독립 케이스 1건 실행(자체 세션) → 판정 결과까지."""
+    db = SessionLocal()
+    try:
+        # 표본끼리 독립이어야 하므로 첫 발화 풀을 재사용하지 않음
+        with opening_cache_bypass():
+            case_id, turns = await run_two_bot_simulation_async(db, req)
+        phishing = await asyncio.to_thread(_read_verdict, db, case_id)
+        return {"case_id": str(case_id), "turns": turns, "phishing": phishing}
+    finally:
+        db.close()
+
+
+async def run_monte_carlo(
+    req: Any,
+    n: int,
+    *,
+    concurrency: int | None = None,
+    ci_half_width: float | None = None,
+    min_samples: int | None = None,
+    confidence: float = 0.95,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    같은 공격자/피해자 페어를 최대 n번 독립 실행(각각 새 케이스)하며 끝나는 대로 이벤트를 낸다.
+    - {"type": "sample"}: 실행 1건 결과 + 누적 통계(피싱 성공률, Wilson 신뢰구간)
+    - {"type": "error"} : 실행 실패(통계에서 제외)
+    - {"type": "summary"}: 최종 통계
+    완료 표본이 min_samples 이상이고 신뢰구간 반폭이 ci_half_width 이하이면
+    새 실행을 더 띄우지 않는다(진행 중인 실행은 끝까지 기다림).
+    """
+    limit = max(1, int(concurrency or settings.SIM_CONCURRENCY))
+    target = float(settings.MC_CI_HALF_WIDTH
+                   if ci_half_width is None else ci_half_width)
+    floor = max(1, int(settings.MC_MIN_SAMPLES
+                       if min_samples is None else min_samples))
+
+    launched = done = phished = judged = errors = 0
+    pending: Dict[asyncio.Task, int] = {}
+
+    def _tight() -> bool:
+        if judged < floor or target <= 0:
+            return False
+        lo, hi = wilson_interval(phished, judged, confidence)
+        return (hi - lo) / 2 <= target
+
+    def _launch() -> None:
+        nonlocal launched
+        # 요청 객체는 실행 중 변경되지 않지만, 실행마다 독립 사본 사용
+        task = asyncio.create_task(_one_sample(copy.copy(req)))
+        pending[task] = launched
+        launched += 1
+
+    try:
+        while launched < min(n, limit):
+            _launch()
+
+        while pending:
+            finished, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                idx = pending.pop(task)
+                done += 1
+                exc = task.exception()
+                if exc is not None:
+                    errors += 1
+                    yield {"type": "error", "index": idx, "error": str(exc)}
+                    continue
+                res = task.result()
+                if res["phishing"] is not None:
+                    judged += 1
+                    phished += int(bool(res["phishing"]))
+                yield {
+                    "type": "sample",
+                    "index": idx,
+                    **res,
+                    "stats": outcome_stats(phished, judged, confidence),
+                }
+
+            if not _tight():
+                while launched < n and len(pending) < limit:
+                    _launch()
+    finally:
+        # 클라이언트가 스트림을 끊으면 남은 실행 취소
+        for task in pending:
+            task.cancel()
+
+    yield {
+        "type": "summary",
+        "requested": n,
+        "launched": launched,
+        "completed": done,
+        "errors": errors,
+        "stopped_early": launched < n,
+        **outcome_stats(phished, judged, confidence),
+    }
@@ -0,0 +1,181 @@
+# app/services/opening_cache.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List
+import asyncio
+import hashlib
+import json
+import random
+import threading
+
+from app.core.config import settings
+from app.services.llm_cassette import cassette_mode
+from app.services.llm_providers import attacker_chat
+from app.services.prompts import ATTACKER_PROMPT
+
+# 공격자 첫 발화(opening) 풀
+# 첫 턴은 히스토리/피해자 발화가 비어 있으므로 (단계0, 지침, 모델, 프롬프트)에만 의존한다.
+# → 같은 시나리오라면 피해자가 달라도 미리 뽑아 둔 첫 발화를 재사용(LLM 왕복 1회 절약)
+# 기본은 꺼짐(OPENING_CACHE_POOL_SIZE=0): 켜면 같은 페어를 다시 돌려도 첫 발화가 풀 안에서만 나온다.
+# 독립 표본이 필요한 실행(몬테카를로)은 opening_cache_bypass()로 항상 새로 생성
+_PROMPT_HASH = hashlib.sha256(str(ATTACKER_PROMPT).encode("utf-8")).hexdigest()
+
+_bypass: ContextVar[bool] = ContextVar("opening_cache_bypass", default=False)
+
+
+@contextmanager
+def opening_cache_bypass() -> Iterator[None]:
+    """이 블록 안의 시뮬레이션은 첫 발화 풀을 쓰지도 채우지도 않음."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def opening_inputs(step0: str,
+                   guidance_text: str | None = None,
+                   guidance_type: str | None = None) -> Dict[str, Any]:
+    """_SimRun.attacker_inputs()가 첫 턴에 만드는 것과 같은 입력."""
+    return {
+        "history": [],
+        "last_victim": "",
+        "current_step": step0 or "",
+        "guidance": guidance_text or "",
+        "guidance_type": guidance_type or "",
+    }
+
+
+def opening_key(inputs: Dict[str, Any]) -> str:
+    raw = json.dumps(
+        [
+            inputs.get("current_step") or "",
+            inputs.get("guidance") or "",
+            inputs.get("guidance_type") or "",
+            settings.ATTACKER_MODEL,
+            _PROMPT_HASH,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class OpeningCache:
+    """
+    키별로 최대 pool_size개의 첫 발화를 모아 두고, 풀이 차면 그중 하나를 무작위로 재사용.
+    풀이 차기 전에는 매번 새로 생성해 풀에 추가(다양성 유지).
+    """
+
+    def __init__(self, pool_size: int | None = None):
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pools: Dict[str, List[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def pool_size(self) -> int:
+        return int(settings.OPENING_CACHE_POOL_SIZE
+                   if self._pool_size is None else self._pool_size)
+
+    @property
+    def enabled(self) -> bool:
+        # cassette 녹화/재생 중에는 실제 호출 순서를 그대로 남기기 위해 사용 안 함
+        return (self.pool_size > 0 and not _bypass.get()
+                and cassette_mode() == "off")
+
+    def take(self, key: str) -> str | None:
+        with self._lock:
+            pool = self._pools.get(key) or []
+            if len(pool) >= self.pool_size:
+                self.hits += 1
+                return random.choice(pool)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.pool_size:
+                pool.append(text)
+
+    def missing(self, key: str) -> int:
+        with self._lock:
+            return max(0, self.pool_size - len(self._pools.get(key) or []))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pools.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "pool_size": self.pool_size,
+                "keys": len(self._pools),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+opening_cache = OpeningCache()
+
+
+def cached_opening(inputs: Dict[str, Any], generate: Callable[[],
+                                                              str]) -> str:
+    """첫 턴 공격자 발화: 풀에서 꺼내거나, 없으면 generate() 후 풀에 추가."""
+    if not opening_cache.enabled:
+        return generate()
+    key = opening_key(inputs)
+    text = opening_cache.take(key)
+    if text is None:
+        text = generate()
+        opening_cache.put(key, text)
+    return text
+
+
+async def acached_opening(inputs: Dict[str, Any],
+                          agenerate: Callable[[], Awaitable[str]]) -> str:
+    if not opening_cache.enabled:
+        return await agenerate()
+    key = opening_key(inputs)
+    text = opening_cache.take(key)
+    if text is None:
+        text = await agenerate()
+        opening_cache.put(key, text)
+    return text
+
+
+async def prewarm_openings(items: Iterable[Dict[str, Any]],
+                           *,
+                           concurrency: int | None = None) -> int:
+    """
+    배치 시작 전에 시나리오별 첫 발화 풀을 미리 채운다(동시 호출).
+    items: opening_inputs(...) 결과들. 생성한 발화 수를 반환.
+    """
+    if not opening_cache.enabled:
+        return 0
+    chain = ATTACKER_PROMPT | attacker_chat()
+    sem = asyncio.Semaphore(max(1, int(concurrency
+                                       or settings.SIM_CONCURRENCY)))
+    jobs = []
+    seen = set()
+    for inputs in items:
+        key = opening_key(inputs)
+        if key in seen:
+            continue
+        seen.add(key)
+        jobs.extend((key, inputs) for _ in range(opening_cache.missing(key)))
+
+    async def _one(key: str, inputs: Dict[str, Any]) -> None:
+        async with sem:
+            resp = await chain.ainvoke(inputs)
+        opening_cache.put(key, getattr(resp, "content", str(resp)).strip())
+
+    await asyncio.gather(*(_one(k, i) for k, i in jobs))
+    return len(jobs)
@@ -0,0 +1,323 @@
+# app/services/prejudge.py
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import re
+import threading
+
+# 규칙 기반 사전 판정(PREJUDGE_ENABLED)
+# - PROMPT_LLM_ONLY의 기준 A~D 중 피해자 발화에 그대로 드러나는 경우만 로컬에서 결정
+#   true : 완료형 실행 발화(송금했/설치했/OTP는 …)가 부정·의문 없이 1개 이상
+#   false: 실행 발화가 전혀 없고, 위험 단어(송금/계좌/OTP/앱/돈…)가 나온 발화는 모두 방어 발화이며,
+#          방어(신고/끊겠/못 알려…)가 1개 이상. 방어는 문맥 없이도 거절·신고인 구절만 쓰고
+#          ("은행에 가서", "대표번호", "경찰에"는 따르는 발화에도 흔해서 제외),
+#          따르겠다는 발화(드릴게요/찾아올게요/할게요)는 방어와 같은 발화에 있어도 위험으로 봄
+#   그 외(부정·의문이 붙은 실행 발화, 방어 없는 위험 언급 등)는 애매 → LLM 판정
+# - 사전(lexicon)은 공백 제거 + 소문자로 정규화한 문장에 Aho-Corasick으로 한 번에 매칭
+
+PREJUDGE_TAG = "[규칙 판정]"
+
+# 실행(완료) 발화: 종류 → 구절
+_EXEC: Dict[str, Tuple[str, ...]] = {
+    # A) 금전 이동
+    "money": (
+        "송금했", "송금완료", "송금해드렸", "송금해놨", "이체했", "이체완료", "이체해드렸",
+        "이체해놨", "입금했", "입금완료", "입금해드렸", "돈보냈", "돈을보냈", "만원보냈",
+        "원보냈", "돈보내드렸", "인출했", "출금했", "현금찾았", "돈찾았",
+        "현금뽑았", "돈뽑았", "보관함에넣었", "락커에넣었", "사물함에넣었", "현금전달했",
+        "현금을전달했", "돈을전달했", "건네드렸", "대출받았", "대출실행했", "대출이나왔",
+        "안전계좌로옮겼", "안전계좌로보냈", "자동이체신청했", "카드론받았"),
+    # B) 민감 정보 제공
+    # ("비밀번호는"처럼 끝나는 구절은 질문일 때가 많아 숫자와 함께일 때만 — _EXEC_RE)
+    "info": (
+        "인증번호불러드", "인증번호알려드", "인증번호보내드", "otp불러드", "otp알려드",
+        "비밀번호불러드", "비밀번호알려드", "주민번호불러드", "주민번호알려드", "계좌번호불러드",
+        "계좌번호알려드", "카드번호불러드", "카드번호알려드", "보안카드번호불러드"),
+    # C) 디지털 접근 허용
+    "digital": (
+        "설치했", "설치완료", "설치해놨", "깔았", "다운받았", "다운로드했", "링크눌렀",
+        "링크를눌렀", "링크클릭했", "링크들어갔", "링크로들어갔", "접속했", "qr찍었",
+        "qr코드찍었", "qr코드를찍었", "원격허용했", "원격승인했", "승인눌렀", "권한허용했",
+        "허용눌렀"),
+}
+# 숫자 자체를 불러준 경우(민감정보 이름 + 숫자, 주민번호 형태)
+_EXEC_RE: Tuple[Tuple[str, re.Pattern], ...] = (
+    ("info",
+     re.compile(r"(otp|인증번호|비밀번호|비번|cvc|보안카드|계좌번호|카드번호|주민번호|주민등록번호)"
+                r"[^0-9]{0,6}\d{3,}")),
+    ("info", re.compile(r"\d{6}-?[1-4]\d{6}")),
+)
+# 방어 발화(문맥 없이도 거절·신고·의심인 구절만)
+_DEFENSE: Tuple[str, ...] = (
+    "신고하겠", "신고할게", "신고할거", "신고했", "끊겠", "끊을게", "끊습니다", "끊어요",
+    "못믿", "믿을수없", "보이스피싱같", "보이스피싱이죠", "보이스피싱이네", "사기같네",
+    "사기같아", "사기같습", "사기죠", "사기전화", "거절하겠", "거절할게", "안하겠", "안할게",
+    "안할래", "알려드릴수없", "못알려", "안알려", "안보내", "못보내", "보내지않", "안깔",
+    "설치안", "설치하지않", "누르지않", "안누를")
+# 따르겠다는 발화(미래형 실행 약속) — 같은 발화에 방어가 있어도 위험으로 셈
+# (방어 구절 안에 들어 있는 경우는 제외: "신고할게"의 "할게", "알려드릴수없"의 "알려드릴")
+_COMPLY: Tuple[str, ...] = (
+    "드릴게", "드리겠", "할게", "하겠", "갈게", "가겠", "찾아올게", "찾아오겠", "찾아갈게",
+    "보낼게", "보내겠", "알려드릴", "불러드릴", "누를게", "따를게", "따르겠", "시키는대로",
+    "말씀하신대로")
+# 위험 단어(언급만으로는 판정하지 않고, 방어 없는 언급이면 애매로 돌림)
+_RISK: Tuple[str, ...] = (
+    "송금", "이체", "입금", "출금", "인출", "계좌", "otp", "인증번호", "비밀번호", "비번",
+    "주민", "카드번호", "cvc", "보안카드", "설치", "앱", "어플", "링크", "url", "qr", "원격",
+    "현금", "대출", "보관함", "락커", "사물함", "안전계좌", "팀뷰어", "애니데스크", "돈")
+# 실행 구절 앞/뒤에 붙으면 부정·가정·의문으로 보고 실행으로 치지 않음
+_NEG_BEFORE = ("안", "못", "아직")
+_NEG_AFTER = ("지않", "지못", "지말", "지는않", "냐", "나요", "을까", "으면", "다면", "어야",
+              "야하", "야되", "야돼", "려고", "라고", "다고", "는지", "을지")
+_KIND_LABEL = {
+    "money": "금전 이동",
+    "info": "민감정보 제공",
+    "digital": "앱/링크/원격 접근 허용",
+}
+_MAX_QUOTES = 5
+_QUOTE_CHARS = 60
+
+
+class _Automaton:
+    """Aho-Corasick 다중 패턴 매처(구절 → 태그)."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        for phrase, tag in patterns:
+            node = 0
+            for ch in phrase:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((phrase, tag))
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                if self._fail[nxt] == nxt:
+                    self._fail[nxt] = 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """(시작, 끝, 구절, 태그) 목록 — 겹치는 매칭 포함."""
+        hits = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for phrase, tag in self._out[node]:
+                hits.append((i - len(phrase) + 1, i + 1, phrase, tag))
+        return hits
+
+
+_matcher = _Automaton([(p, f"exec:{kind}") for kind, phrases in _EXEC.items()
+                       for p in phrases] + [(p, "defense") for p in _DEFENSE] +
+                      [(p, "comply") for p in _COMPLY] +
+                      [(p, "risk") for p in _RISK])
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", "", text or "").lower()
+
+
+def _negated(norm: str, start: int, end: int) -> bool:
+    before = norm[max(0, start - 2):start]
+    after = norm[end:end + 6]
+    if any(before.endswith(n) for n in _NEG_BEFORE):
+        return True
+    if any(after.startswith(n) for n in _NEG_AFTER):
+        return True
+    # 실행 구절이 들어 있는 문장이 의문문이면 확인 질문으로 봄
+    mark = re.search(r"[.!?。\n]", norm[end:])
+    return mark is not None and mark.group(0) == "?"
+
+
+@dataclass
+class Hit:
+    turn: int
+    kind: str  # money | info | digital | defense | comply | risk
+    phrase: str
+    text: str  # 원문 발화
+    negated: bool = False
+
+
+@dataclass
+class PreVerdict:
+    """phishing=None이면 애매(LLM 판정 필요)."""
+    phishing: Optional[bool]
+    evidence: str = ""
+    reason: str = ""
+    hits: List[Hit] = field(default_factory=list)
+
+    @property
+    def decided(self) -> bool:
+        return self.phishing is not None
+
+
+def scan(turn: int, text: str) -> List[Hit]:
+    norm = normalize(text)
+    hits: List[Hit] = []
+    found = _matcher.find(norm)
+    defense_spans = [(s, e) for s, e, _, tag in found if tag == "defense"]
+    for start, end, phrase, tag in found:
+        kind = tag.split(":", 1)[-1]
+        if kind == "comply" and any(s <= start and end <= e
+                                    for s, e in defense_spans):
+            continue
+        negated = tag.startswith("exec:") and _negated(norm, start, end)
+        hits.append(Hit(turn, kind, phrase, text, negated))
+    for kind, pat in _EXEC_RE:
+        for mt in pat.finditer(norm):
+            hits.append(
+                Hit(turn, kind, mt.group(0), text,
+                    _negated(norm, mt.start(), mt.end())))
+    return hits
+
+
+def _quote(hit: Hit) -> str:
+    text = hit.text.strip().replace("\n", " ")
+    if len(text) > _QUOTE_CHARS:
+        text = text[:_QUOTE_CHARS] + "…"
+    return f"turn {hit.turn} 『{text}』"
+
+
+def _evidence(summary: str, hits: List[Hit]) -> str:
+    seen, quotes = set(), []
+    for h in hits:
+        if h.turn in seen:
+            continue
+        seen.add(h.turn)
+        label = _KIND_LABEL.get(h.kind)
+        quotes.append(_quote(h) + (f"({label})" if label else ""))
+        if len(quotes) >= _MAX_QUOTES:
+            break
+    return f"{PREJUDGE_TAG} {summary} 근거 발화: {', '.join(quotes)}."
+
+
+class _Stats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "local_true": 0, "local_false": 0,
+                       "ambiguous": 0}
+
+    def add(self, verdict: PreVerdict) -> None:
+        key = ("ambiguous" if verdict.phishing is None else
+               "local_true" if verdict.phishing else "local_false")
+        with self._lock:
+            self.counts["calls"] += 1
+            self.counts[key] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self.counts)
+        calls = out["calls"]
+        out["local_ratio"] = (round(
+            (out["local_true"] + out["local_false"]) / calls, 4)
+                              if calls else 0.0)
+        return out
+
+
+_stats = _Stats()
+
+
+def prejudge_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+def _decide(turns: Iterable[Tuple[int, str]]) -> PreVerdict:
+    hits: List[Hit] = []
+    risky_turns: List[int] = []
+    for turn, text in turns:
+        found = scan(turn, text)
+        kinds = {h.kind for h in found}
+        if "comply" in kinds:
+            # "은행 가서 돈 찾아 드릴게요": 방어 구절이 섞여 있어도 따르는 발화
+            risky_turns.append(turn)
+        elif "defense" in kinds:
+            # 실행 구절과 방어가 한 발화에 섞이면("계좌번호 알려드렸는데 신고할게요") 애매
+            for h in found:
+                if h.kind in _KIND_LABEL:
+                    h.negated = True
+        elif "risk" in kinds:
+            risky_turns.append(turn)
+        hits.extend(found)
+
+    executed = [h for h in hits if h.kind in _KIND_LABEL and not h.negated]
+    if executed:
+        kinds = sorted({h.kind for h in executed}, key=list(_KIND_LABEL).index)
+        summary = ("피해자 발화 기준, " +
+                   "·".join(_KIND_LABEL[k] for k in kinds) + " 완료 발화가 확인됨.")
+        return PreVerdict(True, _evidence(summary, executed), "executed", hits)
+
+    if any(h.kind in _KIND_LABEL for h in hits):
+        return PreVerdict(None, reason="negated_exec", hits=hits)
+    if risky_turns:
+        return PreVerdict(None, reason="risk_mention", hits=hits)
+    defenses = [h for h in hits if h.kind == "defense"]
+    if not defenses:
+        return PreVerdict(None, reason="no_signal", hits=hits)
+    summary = ("피해자 발화 기준, 금전 이동·민감정보 제공·앱/링크 실행 발화가 없고 "
+               "피해자가 명확히 방어함.")
+    return PreVerdict(False, _evidence(summary, defenses), "defended", hits)
+
+
+def prejudge(turns: Iterable[Tuple[int, str]]) -> PreVerdict:
+    """피해자 발화 [(turn_index, 내용), ...] → 로컬 판정(애매하면 phishing=None)."""
+    verdict = _decide(turns)
+    _stats.add(verdict)
+    return verdict
+
+
+def agreement(corpus: Iterable[Tuple[bool, List[Tuple[int, str]]]],
+              show: int = 0) -> Dict[str, Any]:
+    """
+    저장된 LLM 판정과 규칙 판정 비교. corpus: [(LLM phishing, 피해자 발화), ...]
+    local_ratio(로컬로 결정한 비율) / agreement(로컬 결정 중 LLM과 같은 비율)
+    """
+    out: Dict[str, Any] = {
+        "cases": 0,
+        "local": 0,
+        "agree": 0,
+        "confusion": {"tt": 0, "tf": 0, "ft": 0, "ff": 0},  # 규칙/LLM
+        "ambiguous": {},
+        "disagreements": [],
+    }
+    for llm_phishing, turns in corpus:
+        out["cases"] += 1
+        pre = _decide(turns)
+        if not pre.decided:
+            out["ambiguous"][pre.reason] = out["ambiguous"].get(pre.reason,
+                                                                0) + 1
+            continue
+        out["local"] += 1
+        key = ("t" if pre.phishing else "f") + ("t" if llm_phishing else "f")
+        out["confusion"][key] += 1
+        if pre.phishing == bool(llm_phishing):
+            out["agree"] += 1
+        elif len(out["disagreements"]) < show:
+            out["disagreements"].append({
+                "llm": bool(llm_phishing),
+                "rule": pre.phishing,
+                "evidence": pre.evidence,
+            })
+    out["local_ratio"] = round(out["local"] / out["cases"],
+                               4) if out["cases"] else 0.0
+    out["agreement"] = round(out["agree"] / out["local"],
+                             4) if out["local"] else 0.0
+    return out
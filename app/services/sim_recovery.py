@@ -0,0 +1,149 @@
+# app/services/sim_recovery.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+from uuid import UUID
+import asyncio
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.db import models as m
+from app.db.session import SessionLocal
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.simulation import resume_simulation
+
+logger = get_logger(__name__)
+
+# 상태 흐름: running --(스위퍼가 원자적으로 선점)--> resuming --(판정)--> completed
+# 재개 중 다시 죽은 resuming 케이스는 자동으로 다시 잡지 않는다(중복 재개 방지).
+#   → sweep_stalled_cases(retry_resuming=True)로 수동 재시도
+# 대상은 엔진이 재개 표식(마지막 턴 payload.max_rounds)을 남긴 run뿐.
+# 표식이 없는 케이스(구버전 로그, 다른 경로가 만든 running 케이스)는 상태를 바꾸지 않는다.
+
+
+def is_resumable(db: Session, case_id: UUID) -> bool:
+    """마지막 run의 턴이 0부터 연속이고 마지막 턴에 재개 표식(max_rounds)이 있는지."""
+    last_run = db.execute(
+        select(func.max(m.ConversationLog.run)).where(
+            m.ConversationLog.case_id == case_id)).scalar()
+    if last_run is None:
+        return False
+    in_run = (m.ConversationLog.case_id == case_id,
+              m.ConversationLog.run == last_run)
+    count, last_turn = db.execute(
+        select(func.count(),
+               func.max(m.ConversationLog.turn_index)).where(*in_run)).one()
+    if last_turn is None or count != last_turn + 1:
+        return False
+    payload = db.execute(
+        select(m.ConversationLog.payload).where(
+            *in_run, m.ConversationLog.turn_index == last_turn)).scalar()
+    return "max_rounds" in (payload or {})
+
+
+def find_stalled_cases(db: Session,
+                       *,
+                       stale_sec: float,
+                       status: str = "running",
+                       limit: int | None = None) -> List[UUID]:
+    """마지막 턴 저장(없으면 케이스 생성) 이후 stale_sec 이상 멈춘, 재개 가능한 케이스."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_sec)
+    last_activity = (select(func.max(m.ConversationLog.created_at)).where(
+        m.ConversationLog.case_id == m.AdminCase.id).correlate(
+            m.AdminCase).scalar_subquery())
+    stmt = (select(m.AdminCase.id).where(
+        m.AdminCase.status == status,
+        func.coalesce(last_activity, m.AdminCase.created_at) < cutoff,
+    ).order_by(m.AdminCase.created_at.asc()))
+    out: List[UUID] = []
+    for case_id in db.execute(stmt).scalars().all():
+        if limit and len(out) >= limit:
+            break
+        if is_resumable(db, case_id):
+            out.append(case_id)
+    db.commit()  # 조회 트랜잭션 종료
+    return out
+
+
+def claim_case(db: Session, case_id: UUID, *, from_status: str) -> bool:
+    """from_status → resuming 원자적 전환. 다른 워커가 먼저 잡았으면 False."""
+    res = db.execute(
+        update(m.AdminCase).where(
+            m.AdminCase.id == case_id,
+            m.AdminCase.status == from_status).values(status="resuming"))
+    db.commit()
+    return res.rowcount == 1
+
+
+def sweep_stalled_cases(*,
+                        stale_sec: float | None = None,
+                        limit: int | None = None,
+                        retry_resuming: bool = False) -> List[Dict[str, Any]]:
+    """
+    멈춘 케이스를 찾아 선점 후 재개(동기, 한 케이스씩).
+    선점 후 재개할 수 없다고 판명되면(ValueError) 원래 상태로 되돌리고 건너뜀.
+    """
+    stale = float(settings.SIM_RESUME_STALE_SEC
+                  if stale_sec is None else stale_sec)
+    lim = int(settings.SIM_RESUME_MAX_CASES if limit is None else limit)
+    from_status = "resuming" if retry_resuming else "running"
+
+    db = SessionLocal()
+    results: List[Dict[str, Any]] = []
+    try:
+        for case_id in find_stalled_cases(db,
+                                          stale_sec=stale,
+                                          status=from_status,
+                                          limit=lim):
+            if not claim_case(db, case_id, from_status=from_status):
+                continue
+            try:
+                _, run_no, turns = resume_simulation(db, case_id)
+                results.append({
+                    "case_id": str(case_id),
+                    "run": run_no,
+                    "status": "resumed",
+                    "total_turns": turns
+                })
+                logger.info(f"[RESUME] case={case_id} run={run_no} "
+                            f"turns={turns}")
+            except ValueError as e:
+                db.rollback()
+                db.execute(
+                    update(m.AdminCase).where(
+                        m.AdminCase.id == case_id,
+                        m.AdminCase.status == "resuming").values(
+                            status=from_status))
+                db.commit()
+                results.append({
+                    "case_id": str(case_id),
+                    "status": "skipped",
+                    "error": str(e)
+                })
+                logger.warning(f"[RESUME] case={case_id} skipped: {e}")
+            except Exception as e:
+                # 일시 오류(LLM 등): resuming으로 남겨 두고 다음 케이스 진행
+                db.rollback()
+                results.append({
+                    "case_id": str(case_id),
+                    "status": "error",
+                    "error": str(e)
+                })
+                logger.exception(f"[RESUME] case={case_id} failed")
+    finally:
+        db.close()
+    return results
+
+
+async def sweeper_loop() -> None:
+    """서버 기동 후 주기적으로 스위프(각 스위프는 스레드에서 실행)."""
+    interval = max(1.0, float(settings.SIM_RESUME_SWEEP_INTERVAL_SEC))
+    while True:
+        try:
+            await asyncio.to_thread(sweep_stalled_cases)
+        except Exception:
+            logger.exception("[RESUME] sweep failed")
+        await asyncio.sleep(interval)
@@ -1,18 +1,37 @@
 # app/services/simulation.py
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple
-from uuid import UUID
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple, Iterable
+from uuid import UUID, uuid4
+import asyncio
 import re
 
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 
 from app.db import models as m
+from app.db.session import SessionLocal, release_connection
 from app.core.config import settings
+from app.core.logging import get_logger
 
 from langchain_core.messages import HumanMessage, AIMessage
 from app.services.llm_providers import attacker_chat, victim_chat
-from app.services.admin_summary import summarize_case
+from app.services.admin_summary import summarize_case, summarize_case_async
+from app.services.live_judge import LiveJudge, afinish_live_judge, finish_live_judge
+from app.services.turn_buffer import TurnBuffer
+from app.services.context_window import RollingContext
+from app.services.llm_cassette import cassette_scope, set_turn
+from app.services.llm_cascade import CascadeStats, is_key_step, set_cascade_hint
+from app.services.opening_cache import cached_opening, acached_opening
+from app.services.turn_metrics import timed_invoke, atimed_invoke
+from app.services.llm_cost import (
+    BudgetExceeded,
+    case_budget,
+    check_budget,
+    prior_case_spend,
+)
 
 from app.services.prompts import (
     ATTACKER_PROMPT,
@@ -20,6 +39,8 @@ from app.services.prompts import (
 )
 from app.schemas.conversation import ConversationRunRequest
 
+logger = get_logger(__name__)
+
 MAX_TURNS_PER_ROUND = 2
 MAX_OFFENDER_TURNS = settings.MAX_OFFENDER_TURNS
 MAX_VICTIM_TURNS = settings.MAX_VICTIM_TURNS
@@ -29,47 +50,6 @@ END_TRIGGERS = [r"마무리하겠습니다"]
 VICTIM_END_LINE = "시뮬레이션을 종료합니다."
 
 
-def _assert_turn_role(turn_index: int, role: str):
-    expected = "offender" if turn_index % 2 == 0 else "victim"
-    if role != expected:
-        raise ValueError(f"Turn {turn_index} must be {expected}, got {role}")
-
-
-def _save_turn(
-    db: Session,
-    case_id: UUID,
-    offender_id: int,
-    victim_id: int,
-    turn_index: int,
-    role: str,
-    content: str,
-    label: str | None = None,
-    *,
-    # 메타 표식(옵션)
-    use_agent: bool = False,
-    run: int = 1,
-    guidance_type: str | None = None,
-    guideline: str | None = None,
-):
-    """ConversationLog에 한 턴을 저장."""
-    _assert_turn_role(turn_index, role)
-    log = m.ConversationLog(
-        case_id=case_id,
-        offender_id=offender_id,
-        victim_id=victim_id,
-        turn_index=turn_index,
-        role=role,
-        content=content,
-        label=label,
-        use_agent=use_agent,
-        run=run,
-        guidance_type=guidance_type,
-        guideline=guideline,
-    )
-    db.add(log)
-    db.commit()
-
-
 #ds
 def _hit_end(text: str) -> bool:
     """공격자의 종료 문구 감지(느슨 매칭)."""
@@ -77,15 +57,257 @@ def _hit_end(text: str) -> bool:
     return any(re.search(pat, norm) for pat in END_TRIGGERS)
 
 
-def run_two_bot_simulation(db: Session,
-                           req: ConversationRunRequest) -> Tuple[UUID, int]:
+def _content(msg: Any) -> str:
+    return getattr(msg, "content", str(msg)).strip()
+
+
+# =========================
+# 실행 컨텍스트/상태 (동기·비동기 엔진 공용)
+# =========================
+@dataclass
+class _SimContext:
     """
-    시뮬레이터 메인.
-    - 기본: 새 AdminCase 생성
-    - case_id_override/run_no/use_agent/guidance_type/guideline 지원
-    - Step-Lock: current_step 기반으로 진행
-    - 모델 판단형 종결: 다음 공격자 턴에서 "여기서 마무리하겠습니다." 출력 유도
-      (단계가 소진돼도 마지막 한 턴은 빈 단계로 허용)
+    한 번의 시뮬레이션 실행에서 변하지 않는 값.
+    ORM 객체 대신 원시값을 보관 → 속성 재로딩으로 커넥션을 다시 잡는 일이 없다.
+    """
+    case_id: UUID
+    offender_id: int
+    victim_id: int
+    run_no: int
+    use_agent: bool
+    guidance_text: str | None
+    guidance_type: str | None
+    steps: List[str]
+    victim_meta: Any
+    victim_knowledge: Any
+    victim_traits: Any
+    max_rounds: int
+
+
+@dataclass
+class _SimState:
+    """턴이 진행되며 바뀌는 값(히스토리, 커서, 카운터)."""
+    history_attacker: list = field(default_factory=list)
+    history_victim: list = field(default_factory=list)
+    turn_index: int = 0
+    attacks: int = 0
+    replies: int = 0
+    current_step_idx: int = 0
+    # 첫 턴은 빈 문자열(패턴 유도 방지)
+    last_victim_text: str = ""
+    last_offender_text: str = ""
+
+
+class _SimRun:
+    """
+    Step-Lock 진행 규칙을 한곳에 모은 실행기.
+    LLM 호출 방식(invoke/ainvoke)만 엔진별로 다르고, 입력 구성·턴 기록·종료 판단은 공유한다.
+    """
+
+    def __init__(self, ctx: _SimContext, state: _SimState | None = None):
+        self.ctx = ctx
+        self.st = state or _SimState()
+        # 프롬프트로 보내는 히스토리 창(전체 히스토리는 st에 그대로 유지)
+        self.window_attacker = RollingContext("attacker")
+        self.window_victim = RollingContext("victim")
+        # 예산 초과로 루프를 멈췄으면 그 사유(판정 없이 마감)
+        self.budget_stop: str | None = None
+        # 피해자 모델 캐스케이드 통계(VICTIM_CASCADE일 때만 채워짐)
+        self.cascade = CascadeStats()
+        # 실시간 판정(LIVE_JUDGE일 때 루프 시작 시 붙음) — 피해자 턴마다 백그라운드 갱신
+        self.judge: LiveJudge | None = None
+        # 이번 실행에서 마지막으로 만든 턴(실행 통계를 payload.run_stats로 붙일 자리)
+        self.last_row: Dict[str, Any] | None = None
+
+    # ---- 라운드 진행 ----
+    def rounds_left(self) -> int:
+        return max(0, self.ctx.max_rounds - self.st.attacks)
+
+    def is_opening(self) -> bool:
+        """공격자 첫 발화(히스토리 없음) → 피해자와 무관하므로 캐시 가능."""
+        return self.st.turn_index == 0 and not self.st.history_attacker
+
+    def next_role(self) -> str:
+        # 짝수 턴=공격자, 홀수 턴=피해자 (분기/재개 시 피해자 턴부터 시작할 수 있음)
+        return "offender" if self.st.turn_index % 2 == 0 else "victim"
+
+    def can_attack(self) -> bool:
+        return self.st.attacks < MAX_OFFENDER_TURNS
+
+    def can_reply(self) -> bool:
+        return self.st.replies < MAX_VICTIM_TURNS
+
+    def current_step(self) -> str:
+        # 단계 소진 이후에도 모델이 '종결 규칙'을 수행할 수 있도록 빈 단계 허용
+        if self.st.current_step_idx < len(self.ctx.steps):
+            return self.ctx.steps[self.st.current_step_idx]
+        return ""
+
+    # ---- 프롬프트 입력 ----
+    def attacker_inputs(self) -> Dict[str, Any]:
+        set_turn(self.st.turn_index)  # LLM cassette 키(turn)
+        return {
+            "history": self.window_attacker.view(self.st.history_attacker),
+            "last_victim": self.st.last_victim_text,
+            "current_step": self.current_step(),
+            "guidance": self.ctx.guidance_text or "",
+            "guidance_type": self.ctx.guidance_type or "",
+        }
+
+    def cascade_trigger(self) -> str | None:
+        """피해자 턴을 처음부터 큰 모델로 보낼 사유(캐스케이드용, 없으면 None)."""
+        if settings.VICTIM_CASCADE_ON_GUIDANCE and self.ctx.guidance_text:
+            return "guidance"
+        # 직전 공격자 턴이 수행한 단계(커서는 공격자 턴 뒤에 전진)
+        idx = self.st.current_step_idx - 1
+        step = self.ctx.steps[idx] if 0 <= idx < len(self.ctx.steps) else ""
+        if is_key_step(step, self.st.last_offender_text):
+            return "key_step"
+        return None
+
+    def victim_inputs(self) -> Dict[str, Any]:
+        set_turn(self.st.turn_index)
+        if settings.VICTIM_CASCADE:
+            set_cascade_hint(self.cascade_trigger(), self.cascade)
+        return {
+            "history": self.window_victim.view(self.st.history_victim),
+            "last_offender": self.st.last_offender_text,
+            "meta": self.ctx.victim_meta,
+            "knowledge": self.ctx.victim_knowledge,
+            "traits": self.ctx.victim_traits,
+            "guidance": self.ctx.guidance_text or "",
+            "guidance_type": self.ctx.guidance_type or "",
+        }
+
+    # ---- 턴 기록 ----
+    def turn_row(self,
+                 role: str,
+                 text: str,
+                 metrics: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """저장할 한 턴(ConversationLog 컬럼과 동일한 키)."""
+        payload: Dict[str, Any] = {"max_rounds": self.ctx.max_rounds}
+        if metrics:
+            payload["metrics"] = metrics
+        row = {
+            "case_id": self.ctx.case_id,
+            "offender_id": self.ctx.offender_id,
+            "victim_id": self.ctx.victim_id,
+            "turn_index": self.st.turn_index,
+            "role": role,
+            "content": text,
+            "label": None,
+            "use_agent": self.ctx.use_agent,
+            "run": self.ctx.run_no,
+            "guidance_type": self.ctx.guidance_type,
+            "guideline": self.ctx.guidance_text,
+            # 재개에 필요한 실행 파라미터 + 턴 계측값
+            "payload": payload,
+        }
+        self.last_row = row
+        return row
+
+    def on_attacker(self,
+                    text: str,
+                    metrics: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        row = self.turn_row("offender", text, metrics)
+        self.st.history_attacker.append(AIMessage(text))
+        self.st.history_victim.append(HumanMessage(text))
+        self.st.last_offender_text = text
+        self.st.turn_index += 1
+        self.st.attacks += 1
+        # 실제 단계였을 때만 커서 전진
+        if self.st.current_step_idx < len(self.ctx.steps):
+            self.st.current_step_idx += 1
+        return row
+
+    def on_victim(self,
+                  text: str,
+                  metrics: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        row = self.turn_row("victim", text, metrics)
+        if self.judge is not None:
+            self.judge.add(self.st.turn_index, text)
+        self.st.history_victim.append(AIMessage(text))
+        self.st.history_attacker.append(HumanMessage(text))
+        self.st.last_victim_text = text
+        self.st.turn_index += 1
+        self.st.replies += 1
+        return row
+
+    def end_rows(self, attacker_text: str) -> List[Dict[str, Any]] | None:
+        """
+        공격자 종료 선언이면 피해자 종료 한 줄(여유가 있을 때)을 만들고 리스트 반환.
+        종료가 아니면 None.
+        """
+        if not _hit_end(attacker_text):
+            return None
+        if self.can_reply():
+            return [self.on_victim(VICTIM_END_LINE)]
+        return []
+
+    def stop_for_budget(self, e: BudgetExceeded) -> None:
+        """예산 초과로 루프를 멈춤(사유는 판정 없이 마감할 때 사용)."""
+        self.budget_stop = str(e)
+        logger.warning(f"[BUDGET] case={self.ctx.case_id} run={self.ctx.run_no} "
+                       f"stopped at turn {self.st.turn_index}: {e}")
+
+    # ---- 실행 통계 ----
+    def context_stats(self) -> Dict[str, Any]:
+        """히스토리 창 적용으로 절감한 프롬프트 토큰(역할별 + 합계)."""
+        a = self.window_attacker.stats()
+        v = self.window_victim.stats()
+        full = a["history_tokens_full"] + v["history_tokens_full"]
+        saved = a["saved_tokens"] + v["saved_tokens"]
+        return {
+            "attacker": a,
+            "victim": v,
+            "saved_tokens": saved,
+            "saved_ratio": round(saved / full, 3) if full else 0.0,
+        }
+
+    def run_stats(self) -> Dict[str, Any]:
+        """마지막 턴 payload.run_stats로 저장할 실행 통계(캐스케이드는 VICTIM_CASCADE일 때만)."""
+        stats: Dict[str, Any] = {"context": self.context_stats()}
+        if settings.VICTIM_CASCADE:
+            stats["cascade"] = self.cascade.summary()
+        return stats
+
+    def log_run_stats(self) -> None:
+        cs = self.context_stats()
+        logger.info(f"[CTX] case={self.ctx.case_id} run={self.ctx.run_no} "
+                    f"saved_tokens={cs['saved_tokens']} "
+                    f"({cs['saved_ratio'] * 100:.1f}%) "
+                    f"attacker={cs['attacker']['saved_tokens']} "
+                    f"victim={cs['victim']['saved_tokens']}")
+        if settings.VICTIM_CASCADE:
+            cc = self.cascade.summary()
+            logger.info(
+                f"[CASCADE] case={self.ctx.case_id} run={self.ctx.run_no} "
+                f"escalated={cc['escalated']}/{cc['turns']} "
+                f"({cc['escalation_rate'] * 100:.1f}%) "
+                f"saved_usd={cc['saved_cost_usd']:.6f} "
+                f"saved_ms~{cc['saved_latency_ms']:.0f} "
+                f"reasons={cc['escalations']}")
+
+
+def _resolve_steps(scenario: Dict[str, Any],
+                   offender: m.PhishingOffender) -> List[str]:
+    """Step-Lock 단계: 시나리오 steps → 시나리오 profile.steps → 공격자 profile.steps."""
+    steps: List[str] = ((scenario.get("steps") or [])
+                        or ((scenario.get("profile") or {}).get("steps") or [])
+                        or ((offender.profile or {}).get("steps") or []))
+
+    print("[DEBUG] steps_len:", len(steps), "step0:",
+          (steps[0] if steps else None))
+    if not steps:
+        raise ValueError(
+            "시나리오 steps가 비어 있습니다. case_scenario.steps 또는 profile.steps를 확인하세요."
+        )
+    return list(steps)
+
+
+def _prepare_simulation(db: Session, req: Any) -> _SimContext:
+    """
+    케이스 생성/이어쓰기 + 참여자/단계 확인 → 실행 컨텍스트.
     """
     # 기존 케이스 이어쓰기 or 신규 생성
     case_id_override: UUID | None = getattr(req, "case_id_override", None)
@@ -96,6 +318,9 @@ def run_two_bot_simulation(db: Session,
         scenario = case.scenario or {}
         scenario.update(getattr(req, "case_scenario", {}) or {})
         case.scenario = scenario
+        # 새 run 진행 중(중단되면 재개 스위퍼가 찾을 수 있도록)
+        case.status = "running"
+        case.completed_at = None
         db.add(case)
         db.commit()
         db.refresh(case)
@@ -113,167 +338,515 @@ def run_two_bot_simulation(db: Session,
         raise ValueError(f"Victim {req.victim_id} not found")
 
     # 런/지침 표식
-    run_no: int = int(getattr(req, "run_no", 1))
-    use_agent: bool = bool(getattr(req, "use_agent", False))
     cs: Dict[str, Any] = getattr(req, "case_scenario", {}) or {}
     guidance_text: str | None = getattr(req, "guideline",
                                         None) or cs.get("guideline")
     guidance_type: str | None = getattr(req, "guidance_type",
                                         None) or cs.get("guidance_type")
 
-    # LLM 체인
-    attacker_llm = attacker_chat()
-    victim_llm = victim_chat()
-    attacker_chain = ATTACKER_PROMPT | attacker_llm
-    victim_chain = VICTIM_PROMPT | victim_llm
-
-    history_attacker: list = []
-    history_victim: list = []
-    turn_index = 0
-    attacks = replies = 0
-
-    # Step-Lock: 단계와 커서
+    # Step-Lock: 단계
     scenario_all = (req.case_scenario
                     or {}) if not case_id_override else (case.scenario or {})
-    steps: List[str] = ((scenario_all.get("steps") or [])
-                        or ((scenario_all.get("profile") or {}).get("steps")
-                            or [])
-                        or ((offender.profile or {}).get("steps") or []))
+    steps = _resolve_steps(scenario_all, offender)
+
+    ctx = _SimContext(
+        case_id=case.id,
+        offender_id=offender.id,
+        victim_id=victim.id,
+        run_no=int(getattr(req, "run_no", 1)),
+        use_agent=bool(getattr(req, "use_agent", False)),
+        guidance_text=guidance_text,
+        guidance_type=guidance_type,
+        steps=list(steps),
+        victim_meta=getattr(req, "meta", None)
+        or getattr(victim, "meta", "정보 없음"),
+        victim_knowledge=getattr(req, "knowledge", None)
+        or getattr(victim, "knowledge", "정보 없음"),
+        victim_traits=getattr(req, "traits", None)
+        or getattr(victim, "traits", "정보 없음"),
+        max_rounds=int(req.max_rounds),
+    )
+    # 이후 LLM 대기 동안 커넥션을 잡지 않도록 트랜잭션 종료(ctx는 원시값만 보관)
+    release_connection(db)
+    return ctx
 
-    print("[DEBUG] steps_len:", len(steps), "step0:",
-          (steps[0] if steps else None))
-    if not steps:
-        raise ValueError(
-            "시나리오 steps가 비어 있습니다. case_scenario.steps 또는 profile.steps를 확인하세요."
-        )
 
-    current_step_idx = 0
+def _cassette_name(req: Any, ctx: _SimContext) -> str:
+    """LLM cassette 파일명: 요청에 cassette_id가 있으면(재생) 그것, 아니면 case_id."""
+    return str(getattr(req, "cassette_id", None) or ctx.case_id)
 
-    # 첫 턴은 빈 문자열(패턴 유도 방지)
-    last_victim_text = ""
-    last_offender_text = ""
 
-    for _ in range(req.max_rounds):
-        # ---- 공격자 턴 ----
-        if attacks >= MAX_OFFENDER_TURNS:
-            break
+def _attacker_turn(chain: Any, run: _SimRun) -> Tuple[str, Dict[str, Any]]:
+    """공격자 발화 + 계측값. 첫 턴은 opening 풀을 먼저 본다."""
+    inputs = run.attacker_inputs()
+    metrics: Dict[str, Any] = {}
+
+    def _generate() -> str:
+        msg, mt = timed_invoke(chain, inputs, settings.ATTACKER_MODEL)
+        metrics.update(mt)
+        return _content(msg)
 
-        # 단계 소진 이후에도 모델이 '종결 규칙'을 수행할 수 있도록
-        if current_step_idx < len(steps):
-            current_step_str = steps[current_step_idx]
+    if not run.is_opening():
+        return _generate(), metrics
+    text = cached_opening(inputs, _generate)
+    return text, (metrics or {"opening_cache_hit": True})
+
+
+async def _attacker_turn_async(chain: Any,
+                               run: _SimRun) -> Tuple[str, Dict[str, Any]]:
+    inputs = run.attacker_inputs()
+    metrics: Dict[str, Any] = {}
+
+    async def _generate() -> str:
+        msg, mt = await atimed_invoke(chain, inputs, settings.ATTACKER_MODEL)
+        metrics.update(mt)
+        return _content(msg)
+
+    if not run.is_opening():
+        return await _generate(), metrics
+    text = await acached_opening(inputs, _generate)
+    return text, (metrics or {"opening_cache_hit": True})
+
+
+def _flush_with_stats(db: Session, run: _SimRun, buf: TurnBuffer) -> None:
+    """
+    정상 종료: 실행 통계를 이번 실행의 마지막 턴 payload.run_stats에 붙여 남은 턴과 함께 저장.
+    마지막 턴이 이미 저장됐으면(버퍼에 없으면) 그 행의 payload만 갱신.
+    """
+    row = run.last_row
+    if row is not None:
+        row["payload"]["run_stats"] = run.run_stats()
+        if not buf.pending(row):
+            db.execute(
+                update(m.ConversationLog).where(
+                    m.ConversationLog.case_id == row["case_id"],
+                    m.ConversationLog.run == row["run"],
+                    m.ConversationLog.turn_index == row["turn_index"],
+                ).values(payload=row["payload"]))
+            db.commit()
+    buf.flush()
+
+
+# =========================
+# 동기 엔진
+# =========================
+def _run_loop(db: Session, run: _SimRun) -> None:
+    attacker_chain = ATTACKER_PROMPT | attacker_chat()
+    victim_chain = VICTIM_PROMPT | victim_chat()
+    buf = TurnBuffer(db)
+    if settings.LIVE_JUDGE:
+        # 이미 저장된 피해자 발화(이전 run, 분기/재개로 복사된 앞부분)부터 판정 시작
+        run.judge = LiveJudge.start(db, run.ctx.case_id)
+
+    try:
+        while True:
+            if run.next_role() == "offender":
+                # ---- 공격자 턴 ----
+                if run.rounds_left() <= 0 or not run.can_attack():
+                    break
+                attacker_text, mt = _attacker_turn(attacker_chain, run)
+                mt["db_last_flush_ms"] = buf.last_flush_ms
+                if buf.add(run.on_attacker(attacker_text, mt)):
+                    buf.flush()
+
+                # 공격자 종료 선언: 피해자 종료 한 줄 후 즉시 종료
+                end_rows = run.end_rows(attacker_text)
+                if end_rows is not None:
+                    buf.add(*end_rows)
+                    break
+            else:
+                # ---- 피해자 턴 ----
+                if not run.can_reply():
+                    break
+                msg, mt = timed_invoke(victim_chain, run.victim_inputs(),
+                                       settings.VICTIM_MODEL)
+                mt["db_last_flush_ms"] = buf.last_flush_ms
+                if buf.add(run.on_victim(_content(msg), mt)):
+                    buf.flush()
+    except BudgetExceeded as e:
+        # 예산 초과: 여기까지의 턴은 저장하고 깔끔하게 종료
+        run.stop_for_budget(e)
+    except BaseException:
+        # LLM 오류 등: 남은 턴을 저장하되, 저장 실패가 원래 예외를 가리지 않게
+        buf.flush_quietly()
+        run.log_run_stats()
+        raise
+    # 정상 종료: 남은 턴 + 실행 통계 저장
+    _flush_with_stats(db, run, buf)
+    run.log_run_stats()
+
+
+def _mark_budget_exceeded(db: Session, case_id: UUID) -> None:
+    case = db.get(m.AdminCase, case_id)
+    case.status = "budget_exceeded"
+    case.completed_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def _finish_case(db: Session, run: _SimRun) -> None:
+    """
+    판정. 실시간 판정이 있으면 그 결과를 저장하고, 없거나 실패했으면 summarize_case.
+    예산 초과로 멈춘 실행은 LLM 판정 없이 budget_exceeded로 마감.
+    """
+    if run.budget_stop is None:
+        try:
+            if run.judge is None or not finish_live_judge(db, run.judge):
+                summarize_case(db, run.ctx.case_id)
+            return
+        except BudgetExceeded as e:
+            run.budget_stop = str(e)
+    if run.judge is not None:
+        run.judge.cancel()
+    _mark_budget_exceeded(db, run.ctx.case_id)
+
+
+async def _finish_case_async(db: Session, run: _SimRun) -> None:
+    if run.budget_stop is None:
+        try:
+            if run.judge is None or not await afinish_live_judge(
+                    db, run.judge):
+                await summarize_case_async(db, run.ctx.case_id)
+            return
+        except BudgetExceeded as e:
+            run.budget_stop = str(e)
+    if run.judge is not None:
+        run.judge.cancel()
+    await asyncio.to_thread(_mark_budget_exceeded, db, run.ctx.case_id)
+
+
+def run_two_bot_simulation(db: Session,
+                           req: ConversationRunRequest) -> Tuple[UUID, int]:
+    """
+    시뮬레이터 메인.
+    - 기본: 새 AdminCase 생성
+    - case_id_override/run_no/use_agent/guidance_type/guideline 지원
+    - Step-Lock: current_step 기반으로 진행
+    - 모델 판단형 종결: 다음 공격자 턴에서 "여기서 마무리하겠습니다." 출력 유도
+      (단계가 소진돼도 마지막 한 턴은 빈 단계로 허용)
+    """
+    ctx = _prepare_simulation(db, req)
+    run = _SimRun(ctx)
+    spent = prior_case_spend(db, ctx.case_id)
+    with cassette_scope(_cassette_name(req, ctx), ctx.run_no), \
+            case_budget(ctx.case_id, ctx.run_no, spent):
+        _run_loop(db, run)
+
+        # 관리자 요약/판정 실행
+        _finish_case(db, run)
+    return ctx.case_id, run.st.turn_index
+
+
+# =========================
+# 비동기 엔진 (ainvoke 기반, 한 이벤트 루프에서 다수 실행)
+# =========================
+async def _run_loop_async(db: Session, run: _SimRun) -> None:
+    attacker_chain = ATTACKER_PROMPT | attacker_chat()
+    victim_chain = VICTIM_PROMPT | victim_chat()
+    buf = TurnBuffer(db)
+    if settings.LIVE_JUDGE:
+        run.judge = await LiveJudge.astart(db, run.ctx.case_id)
+
+    try:
+        while True:
+            if run.next_role() == "offender":
+                # ---- 공격자 턴 ----
+                if run.rounds_left() <= 0 or not run.can_attack():
+                    break
+                attacker_text, mt = await _attacker_turn_async(
+                    attacker_chain, run)
+                mt["db_last_flush_ms"] = buf.last_flush_ms
+                if buf.add(run.on_attacker(attacker_text, mt)):
+                    await asyncio.to_thread(buf.flush)
+
+                end_rows = run.end_rows(attacker_text)
+                if end_rows is not None:
+                    buf.add(*end_rows)
+                    break
+            else:
+                # ---- 피해자 턴 ----
+                if not run.can_reply():
+                    break
+                msg, mt = await atimed_invoke(victim_chain,
+                                              run.victim_inputs(),
+                                              settings.VICTIM_MODEL)
+                mt["db_last_flush_ms"] = buf.last_flush_ms
+                if buf.add(run.on_victim(_content(msg), mt)):
+                    await asyncio.to_thread(buf.flush)
+    except BudgetExceeded as e:
+        run.stop_for_budget(e)
+    except BaseException:
+        # 취소(CancelledError) 중에도 이벤트 루프 밖 스레드를 기다리지 않고 바로 저장
+        buf.flush_quietly()
+        run.log_run_stats()
+        raise
+    await asyncio.to_thread(_flush_with_stats, db, run, buf)
+    run.log_run_stats()
+
+
+async def run_two_bot_simulation_async(
+        db: Session, req: ConversationRunRequest) -> Tuple[UUID, int]:
+    """
+    run_two_bot_simulation의 비동기 버전.
+    - LLM 호출은 ainvoke로 이벤트 루프에서 대기(스레드 점유 없음)
+    - 짧은 DB 작업만 스레드로 넘김 → 같은 ConversationLog 행과 (case_id, turns) 결과
+    """
+    ctx = await asyncio.to_thread(_prepare_simulation, db, req)
+    run = _SimRun(ctx)
+    spent = await asyncio.to_thread(prior_case_spend, db, ctx.case_id)
+    with cassette_scope(_cassette_name(req, ctx), ctx.run_no), \
+            case_budget(ctx.case_id, ctx.run_no, spent):
+        await _run_loop_async(db, run)
+
+        await _finish_case_async(db, run)
+    return ctx.case_id, run.st.turn_index
+
+
+async def run_simulations_async(
+    reqs: Iterable[Any],
+    *,
+    concurrency: int | None = None,
+    return_exceptions: bool = True,
+) -> List[Tuple[UUID, int] | BaseException]:
+    """
+    여러 시뮬레이션을 한 이벤트 루프에서 동시에 실행(동시 실행 수 상한 적용).
+    - 각 실행은 자체 세션을 사용
+    - 결과는 입력 순서대로 (case_id, turns) 또는 예외
+    """
+    limit = max(1, int(concurrency or settings.SIM_CONCURRENCY))
+    sem = asyncio.Semaphore(limit)
+
+    async def _one(req: Any) -> Tuple[UUID, int]:
+        async with sem:
+            # 배치 예산이 이미 소진됐으면 새 케이스를 만들지 않음
+            check_budget()
+            db = SessionLocal()
+            try:
+                return await run_two_bot_simulation_async(db, req)
+            finally:
+                db.close()
+
+    return await asyncio.gather(*(_one(r) for r in reqs),
+                                return_exceptions=return_exceptions)
+
+
+# =========================
+# 분기(fork): 기존 런의 앞부분을 새 케이스로 복사하고 그 지점부터 이어서 실행
+# =========================
+def _replay_turns(run: _SimRun,
+                  turns: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    저장된 턴(turn_index 순)을 LLM 호출 없이 다시 적용 → 히스토리/커서/카운터 복원.
+    run 기준으로 다시 만든 행 목록을 반환(새 run으로 복사할 때 사용).
+    """
+    rows: List[Dict[str, Any]] = []
+    for t in turns:
+        if t["role"] == "offender":
+            row = run.on_attacker(t["content"])
         else:
-            current_step_str = ""  # 빈 단계 → 종결 판단만 가능
-
-        attacker_msg = attacker_chain.invoke({
-            "history":
-            history_attacker,
-            "last_victim":
-            last_victim_text,
-            "current_step":
-            current_step_str,
-            "guidance":
-            guidance_text or "",
-            "guidance_type":
-            guidance_type or "",
-        })
-        attacker_text = getattr(attacker_msg, "content",
-                                str(attacker_msg)).strip()
-
-        _save_turn(
-            db,
-            case.id,
-            offender.id,
-            victim.id,
-            turn_index,
-            "offender",
-            attacker_text,
-            label=None,
-            use_agent=use_agent,
-            run=run_no,
-            guidance_type=guidance_type,
-            guideline=guidance_text,
-        )
-        history_attacker.append(AIMessage(attacker_text))
-        history_victim.append(HumanMessage(attacker_text))
-        last_offender_text = attacker_text
-        turn_index += 1
-        attacks += 1
+            row = run.on_victim(t["content"])
+        row["label"] = t.get("label")
+        rows.append(row)
+    # 다시 만든 행의 payload는 저장된 것(계측값 포함)과 다름 → 실행 통계를 붙일 자리로 쓰지 않음
+    run.last_row = None
+    return rows
+
+
+def _fork_rows(db: Session, case_id: UUID, run: int,
+               turn_index: int) -> List[m.ConversationLog]:
+    return (db.query(m.ConversationLog).filter(
+        m.ConversationLog.case_id == case_id,
+        m.ConversationLog.run == run,
+        m.ConversationLog.turn_index < turn_index,
+    ).order_by(m.ConversationLog.turn_index.asc()).all())
+
+
+def _context_from_log(db: Session, case: m.AdminCase,
+                      head: m.ConversationLog, run_no: int,
+                      max_rounds: int) -> _SimContext:
+    """저장된 로그 한 행(참여자/지침 표식)으로 실행 컨텍스트 구성 + 케이스를 진행 중으로."""
+    offender = db.get(m.PhishingOffender, head.offender_id)
+    victim = db.get(m.Victim, head.victim_id)
+    ctx = _SimContext(
+        case_id=case.id,
+        offender_id=offender.id,
+        victim_id=victim.id,
+        run_no=int(run_no),
+        use_agent=bool(head.use_agent),
+        guidance_text=head.guideline,
+        guidance_type=head.guidance_type,
+        steps=_resolve_steps(case.scenario or {}, offender),
+        victim_meta=getattr(victim, "meta", "정보 없음"),
+        victim_knowledge=getattr(victim, "knowledge", "정보 없음"),
+        victim_traits=getattr(victim, "traits", "정보 없음"),
+        max_rounds=int(max_rounds),
+    )
+    if case.status != "resuming":
+        case.status = "running"
+    case.completed_at = None
+    db.commit()
+    return ctx
 
-        # 실제 단계였을 때만 커서 전진
-        if current_step_idx < len(steps):
-            current_step_idx += 1
-
-        # 공격자 종료 선언: 피해자 종료 한 줄 후 즉시 종료
-        if _hit_end(attacker_text):
-            if replies < MAX_VICTIM_TURNS:
-                victim_text = VICTIM_END_LINE
-                _save_turn(
-                    db,
-                    case.id,
-                    offender.id,
-                    victim.id,
-                    turn_index,
-                    "victim",
-                    victim_text,
-                    label=None,
-                    use_agent=use_agent,
-                    run=run_no,
-                    guidance_type=guidance_type,
-                    guideline=guidance_text,
-                )
-                history_victim.append(AIMessage(victim_text))
-                history_attacker.append(HumanMessage(victim_text))
-                last_victim_text = victim_text
-                turn_index += 1
-                replies += 1
-            break
-
-        # ---- 피해자 턴 ----
-        if replies >= MAX_VICTIM_TURNS:
-            break
-
-        victim_msg = victim_chain.invoke({
-            "history":
-            history_victim,
-            "last_offender":
-            last_offender_text,
-            "meta":
-            getattr(req, "meta", None) or getattr(victim, "meta", "정보 없음"),
-            "knowledge":
-            getattr(req, "knowledge", None)
-            or getattr(victim, "knowledge", "정보 없음"),
-            "traits":
-            getattr(req, "traits", None) or getattr(victim, "traits", "정보 없음"),
-            "guidance":
-            guidance_text or "",
-            "guidance_type":
-            guidance_type or "",
-        })
-        victim_text = getattr(victim_msg, "content", str(victim_msg)).strip()
-
-        _save_turn(
-            db,
-            case.id,
-            offender.id,
-            victim.id,
-            turn_index,
-            "victim",
-            victim_text,
-            label=None,
-            use_agent=use_agent,
-            run=run_no,
-            guidance_type=guidance_type,
-            guideline=guidance_text,
-        )
-        history_victim.append(AIMessage(victim_text))
-        history_attacker.append(HumanMessage(victim_text))
-        last_victim_text = victim_text
-        turn_index += 1
-        replies += 1
-
-    # 관리자 요약/판정 실행
-    summarize_case(db, case.id)
-    return case.id, turn_index
+
+def _log_turns(rows: Iterable[m.ConversationLog]) -> List[Dict[str, Any]]:
+    return [{
+        "role": r.role,
+        "content": r.content,
+        "label": r.label
+    } for r in rows]
+
+
+def _fork_max_rounds(src: List[m.ConversationLog],
+                     max_rounds: int | None) -> int:
+    """지정값이 없으면 원본 run에 저장된 max_rounds(재개 표식)를 이어받음."""
+    if max_rounds is not None:
+        return int(max_rounds)
+    stored = (src[-1].payload or {}).get("max_rounds")
+    if stored is None:
+        raise ValueError("원본 run에 max_rounds 기록이 없습니다. max_turns를 지정하세요.")
+    return int(stored)
+
+
+def fork_case(
+    db: Session,
+    case_id: UUID,
+    *,
+    run: int = 1,
+    turn_index: int,
+    inject_text: str | None = None,
+    max_rounds: int | None = None,
+) -> Tuple[UUID, int]:
+    """
+    (case_id, run)의 turn_index 직전까지를 새 AdminCase(같은 run 번호)로 복사(LLM 호출 없음).
+    - 원본 케이스의 로그/판정은 건드리지 않는다(분기 판정은 새 케이스에 따로 저장)
+    - inject_text가 있으면 turn_index 턴을 그 문장으로 고정(역할은 턴 번호로 결정, 공격/응답 한도 적용)
+    - 복사한 턴 payload.forked_from에 원본 위치를 남긴다
+    - 이어서 실행은 resume_simulation(새 케이스) — 저장된 턴에 재개 표식이 있으므로 그대로 이어감
+    return: (새 case_id, 저장한 턴 수)
+    """
+    src_case = db.get(m.AdminCase, case_id)
+    if src_case is None:
+        raise ValueError(f"AdminCase {case_id} not found")
+    if turn_index < 1:
+        raise ValueError("turn_index는 1 이상이어야 합니다(0이면 새 시뮬레이션).")
+
+    src = _fork_rows(db, case_id, run, turn_index)
+    if len(src) != turn_index:
+        raise ValueError(
+            f"case {case_id} run={run}에 turn_index < {turn_index} 로그가 "
+            f"{len(src)}개뿐입니다.")
+    rounds = _fork_max_rounds(src, max_rounds)
+
+    # 새 케이스는 inject 검증이 끝난 뒤에 세션에 넣음(거절된 분기가 빈 케이스로 남지 않게)
+    case = m.AdminCase(id=uuid4(),
+                       scenario=dict(src_case.scenario or {}),
+                       status="running")
+    # commit 전에 읽어 둠(commit 후 속성 접근은 행마다 재조회)
+    prefix = _log_turns(src)
+    ctx = _context_from_log(db, case, src[0], run, rounds)
+
+    run_ = _SimRun(ctx)
+    origin = {"case_id": str(case_id), "run": int(run)}
+    rows = _replay_turns(run_, prefix)
+    for row in rows:
+        row["payload"]["forked_from"] = origin
+    if inject_text:
+        if run_.next_role() == "offender":
+            if run_.rounds_left() <= 0 or not run_.can_attack():
+                raise ValueError(
+                    f"turn_index={turn_index}: 공격 한도에 도달해 공격자 발화를 넣을 수 없습니다.")
+            rows.append(run_.on_attacker(inject_text))
+        else:
+            if not run_.can_reply():
+                raise ValueError(
+                    f"turn_index={turn_index}: 응답 한도에 도달해 피해자 발화를 넣을 수 없습니다.")
+            rows.append(run_.on_victim(inject_text))
+
+    db.add(case)
+    db.flush()
+    buf = TurnBuffer(db, flush_every=len(rows) + 1)
+    buf.add(*rows)
+    buf.flush()
+    return ctx.case_id, len(rows)
+
+
+def fork_simulation(
+    db: Session,
+    case_id: UUID,
+    *,
+    run: int = 1,
+    turn_index: int,
+    inject_text: str | None = None,
+    max_rounds: int | None = None,
+) -> Tuple[UUID, int, int]:
+    """
+    fork_case로 분기 케이스를 만들고 끝까지 실행 + 분기 케이스만 판정.
+    return: (새 case_id, run, 총 턴 수)
+    """
+    new_case_id, _ = fork_case(db,
+                               case_id,
+                               run=run,
+                               turn_index=turn_index,
+                               inject_text=inject_text,
+                               max_rounds=max_rounds)
+    return resume_simulation(db, new_case_id)
+
+
+# =========================
+# 재개(resume): 중단된 run을 마지막으로 저장된 턴부터 이어서 실행
+# =========================
+def _prepare_resume(db: Session,
+                    case_id: UUID) -> Tuple[_SimContext, List[Dict[str, Any]]]:
+    case = db.get(m.AdminCase, case_id)
+    if case is None:
+        raise ValueError(f"AdminCase {case_id} not found")
+
+    last_run = (db.query(func.max(m.ConversationLog.run)).filter(
+        m.ConversationLog.case_id == case_id).scalar())
+    if last_run is None:
+        raise ValueError(f"case {case_id}: 저장된 턴이 없어 재개할 수 없습니다.")
+    rows = (db.query(m.ConversationLog).filter(
+        m.ConversationLog.case_id == case_id,
+        m.ConversationLog.run == last_run,
+    ).order_by(m.ConversationLog.turn_index.asc()).all())
+
+    if [r.turn_index for r in rows] != list(range(len(rows))):
+        raise ValueError(f"case {case_id} run={last_run}: turn_index가 연속되지 않습니다.")
+    max_rounds = (rows[-1].payload or {}).get("max_rounds")
+    if max_rounds is None:
+        raise ValueError(f"case {case_id} run={last_run}: 재개 정보(max_rounds)가 없습니다.")
+
+    turns = _log_turns(rows)
+    ctx = _context_from_log(db, case, rows[0], last_run, max_rounds)
+    release_connection(db)
+    return ctx, turns
+
+
+def resume_simulation(db: Session, case_id: UUID) -> Tuple[UUID, int, int]:
+    """
+    중단된 케이스의 마지막 run을 저장된 ConversationLog로 복원해 이어서 실행.
+    - 히스토리/단계 커서/공격·응답 카운터는 저장된 턴을 다시 적용해 복원(LLM 재호출 없음)
+    - 공격자 종료 선언까지 저장돼 있으면 남은 종료 줄만 쓰고 판정
+    return: (case_id, run, 총 턴 수)
+    """
+    ctx, turns = _prepare_resume(db, case_id)
+    run = _SimRun(ctx)
+    _replay_turns(run, turns)
+    spent = prior_case_spend(db, ctx.case_id)
+
+    with cassette_scope(ctx.case_id, ctx.run_no), \
+            case_budget(ctx.case_id, ctx.run_no, spent):
+        end_at = next((i for i, t in enumerate(turns)
+                       if t["role"] == "offender" and _hit_end(t["content"])),
+                      None)
+        if end_at is None:
+            _run_loop(db, run)
+        elif end_at == len(turns) - 1:
+            # 종료 선언 직후 중단 → 피해자 종료 한 줄만 마저 기록
+            buf = TurnBuffer(db)
+            buf.add(*(run.end_rows(turns[end_at]["content"]) or []))
+            buf.flush()
+        _finish_case(db, run)
+    return ctx.case_id, ctx.run_no, run.st.turn_index
 
 
 def advance_one_tick(
@@ -0,0 +1,105 @@
+# app/services/turn_buffer.py
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.db import models as m
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _assert_turn_role(turn_index: int, role: str):
+    expected = "offender" if turn_index % 2 == 0 else "victim"
+    if role != expected:
+        raise ValueError(f"Turn {turn_index} must be {expected}, got {role}")
+
+
+class TurnBuffer:
+    """
+    ConversationLog 쓰기 지연(write-behind) 버퍼.
+    - 턴마다 commit 하지 않고 모아서 multi-row INSERT 1회 + commit 1회
+    - flush 조건: N턴 누적 / 가장 오래된 턴이 interval초 이상 대기 / 실행 종료
+    - /conversations/{case_id}/tail 폴러에는 최대 (interval + LLM 1회 응답시간) 안에 보임
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        flush_every: int | None = None,
+        flush_interval: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.db = db
+        self.flush_every = max(
+            1, int(flush_every or settings.TURN_FLUSH_EVERY))
+        self.flush_interval = float(settings.TURN_FLUSH_INTERVAL_SEC
+                                    if flush_interval is None else
+                                    flush_interval)
+        self._clock = clock
+        self._rows: List[Dict[str, Any]] = []
+        self._oldest: float | None = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_ms: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, *rows: Dict[str, Any]) -> bool:
+        """턴을 버퍼에 넣고, flush가 필요하면 True."""
+        for row in rows:
+            _assert_turn_role(row["turn_index"], row["role"])
+            # created_at은 생성 시점 기준(버퍼 대기시간이 섞이지 않도록)
+            row.setdefault("created_at", datetime.now(timezone.utc))
+            self._rows.append(row)
+        if self._rows and self._oldest is None:
+            self._oldest = self._clock()
+        return self.due()
+
+    def pending(self, row: Dict[str, Any]) -> bool:
+        """row가 아직 저장되지 않고 버퍼에 있는지."""
+        return any(r is row for r in self._rows)
+
+    def due(self) -> bool:
+        if not self._rows:
+            return False
+        if len(self._rows) >= self.flush_every:
+            return True
+        return (self._clock() - (self._oldest or 0.0)) >= self.flush_interval
+
+    def flush(self) -> int:
+        """버퍼의 턴을 한 번에 INSERT 후 commit. 쓴 행 수를 반환.
+        실패하면 rollback 후 예외를 그대로 올리고, 턴은 버퍼에 남김(다음 flush에서 재시도)."""
+        if not self._rows:
+            return 0
+        rows = self._rows
+        started = time.perf_counter()
+        try:
+            self.db.execute(insert(m.ConversationLog), rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        # commit이 성공한 뒤에만 비움
+        self._rows, self._oldest = [], None
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def flush_quietly(self) -> int:
+        """예외 처리 중의 마지막 flush: 실패해도 원래 예외를 가리지 않도록 로그만 남김."""
+        try:
+            return self.flush()
+        except Exception as e:
+            logger.error(f"[TURN] final flush failed, {len(self._rows)} turns "
+                         f"not saved: {type(e).__name__}: {e}")
+            return 0
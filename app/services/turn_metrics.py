@@ -0,0 +1,147 @@
+# app/services/turn_metrics.py
+from __future__ import annotations
+
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+import time
+
+from sqlalchemy import Float, and_, func, select
+from sqlalchemy.orm import Session
+
+from app.db import models as m
+
+# 턴별 계측값(ConversationLog.payload["metrics"])
+# - wall_ms: LLM 호출 전체 시간 / ttft_ms: 첫 토큰까지(스트리밍 기준)
+# - prompt_tokens / completion_tokens: 프로바이더 usage (없으면 None)
+# - model: 응답에 찍힌 모델명(없으면 설정값)
+# - retries: 같은 호출에서 HTTP 요청을 다시 보낸 횟수(httpx 훅으로 집계, 모르면 None)
+# - db_last_flush_ms: 이 턴 직전 TurnBuffer flush(INSERT+commit) 소요 시간
+
+# 현재 LLM 호출에서 나간 HTTP 요청 수(None이면 집계 안 함)
+_http_attempts: ContextVar[List[int] | None] = ContextVar("llm_http_attempts",
+                                                          default=None)
+
+
+def _count_request(request) -> None:
+    box = _http_attempts.get()
+    if box is not None:
+        box[0] += 1
+
+
+async def _acount_request(request) -> None:
+    _count_request(request)
+
+
+# httpx.Client / AsyncClient(event_hooks=...)에 그대로 넘길 훅
+HTTPX_EVENT_HOOKS = {"request": [_count_request]}
+AHTTPX_EVENT_HOOKS = {"request": [_acount_request]}
+
+
+def _ms(sec: float) -> float:
+    return round(sec * 1000, 1)
+
+
+def _collect(msg: Any, model: str | None, started: float,
+             first: float | None, attempts: int) -> Dict[str, Any]:
+    usage = getattr(msg, "usage_metadata", None) or {}
+    meta = getattr(msg, "response_metadata", None) or {}
+    ended = time.perf_counter()
+    return {
+        "wall_ms": _ms(ended - started),
+        "ttft_ms": _ms((first or ended) - started),
+        "prompt_tokens": usage.get("input_tokens"),
+        "completion_tokens": usage.get("output_tokens"),
+        "model": meta.get("model_name") or meta.get("model") or model,
+        "retries": max(0, attempts - 1) if attempts else None,
+    }
+
+
+def timed_invoke(chain: Any,
+                 inputs: Any,
+                 model: str | None = None) -> Tuple[Any, Dict[str, Any]]:
+    """
+    chain.stream()으로 호출해 첫 청크 시각(TTFT)과 전체 시간을 잰다.
+    return: (합쳐진 메시지, metrics)
+    """
+    token = _http_attempts.set([0])
+    try:
+        started = time.perf_counter()
+        first = None
+        msg = None
+        for chunk in chain.stream(inputs):
+            if first is None:
+                first = time.perf_counter()
+            msg = chunk if msg is None else msg + chunk
+        return msg, _collect(msg, model, started, first,
+                             _http_attempts.get()[0])
+    finally:
+        _http_attempts.reset(token)
+
+
+async def atimed_invoke(chain: Any,
+                        inputs: Any,
+                        model: str | None = None) -> Tuple[Any, Dict[str, Any]]:
+    token = _http_attempts.set([0])
+    try:
+        started = time.perf_counter()
+        first = None
+        msg = None
+        async for chunk in chain.astream(inputs):
+            if first is None:
+                first = time.perf_counter()
+            msg = chunk if msg is None else msg + chunk
+        return msg, _collect(msg, model, started, first,
+                             _http_attempts.get()[0])
+    finally:
+        _http_attempts.reset(token)
+
+
+# =========================
+# 집계: 역할·모델별 p50/p95/p99
+# =========================
+_FIELDS = ("wall_ms", "ttft_ms", "prompt_tokens", "completion_tokens",
+           "db_last_flush_ms")
+_PCTS = (0.5, 0.95, 0.99)
+
+
+def turn_latency_percentiles(db: Session,
+                             *,
+                             since_minutes: float = 60.0) -> List[Dict[str, Any]]:
+    """최근 since_minutes분 동안 기록된 턴 계측값의 분위수(Postgres percentile_cont)."""
+    since = datetime.now(timezone.utc) - timedelta(minutes=since_minutes)
+    metrics = m.ConversationLog.payload["metrics"]
+    model = metrics["model"].astext
+
+    cols = []
+    for f in _FIELDS:
+        val = metrics[f].astext.cast(Float)
+        for p in _PCTS:
+            cols.append(
+                func.percentile_cont(p).within_group(val).label(
+                    f"{f}_p{int(p * 100)}"))
+
+    stmt = (select(m.ConversationLog.role.label("role"),
+                   model.label("model"),
+                   func.count().label("turns"),
+                   *cols).where(
+                       and_(m.ConversationLog.created_at >= since,
+                            m.ConversationLog.payload.has_key("metrics"))).
+            group_by(m.ConversationLog.role,
+                     model).order_by(m.ConversationLog.role, model))
+    out = []
+    for row in db.execute(stmt).mappings():
+        item: Dict[str, Any] = {
+            "role": row["role"],
+            "model": row["model"],
+            "turns": row["turns"],
+        }
+        for f in _FIELDS:
+            item[f] = {
+                f"p{int(p * 100)}":
+                (None if row[f"{f}_p{int(p * 100)}"] is None else round(
+                    float(row[f"{f}_p{int(p * 100)}"]), 1))
+                for p in _PCTS
+            }
+        out.append(item)
+    return out
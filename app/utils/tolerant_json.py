@@ -0,0 +1,274 @@
+# app/utils/tolerant_json.py
+from __future__ import annotations
+
+from typing import Any, List
+import re
+
+# LLM 출력용 관대한(tolerant) JSON 파서 — 앞에서 뒤로 한 번만 훑으며 바로 값을 만든다
+# (정규식 치환 → json.loads → ast.literal_eval 처럼 여러 번 다시 파싱하지 않음)
+# 보정하는 것:
+# - 앞뒤 설명문/코드펜스(```json ... ```): 첫 '{'(없으면 '[')부터 그 값이 끝날 때까지만 읽음
+# - 스마트 따옴표(“ ” ‘ ’)와 작은따옴표로 감싼 키/문자열, 따옴표 없는 키
+# - 문자열 안의 이스케이프 안 된 큰따옴표: 닫는 따옴표 뒤가 구분자(, } ] :)처럼 보일 때만 닫음
+# - 숫자 앞 0(03 → 3), 트레일링/중복 콤마, True/False/None
+# - 잘린 출력: 열린 문자열/괄호를 닫고, 값이 없는 마지막 키는 버림
+# 잘 만든 JSON이면 json.loads와 같은 결과. JSON 값이 전혀 없거나 MAX_DEPTH보다 깊으면 TolerantJSONError.
+
+
+class TolerantJSONError(ValueError):
+    """보정해도 JSON 값을 찾을 수 없음."""
+
+
+# 중첩 상한(재귀 하강이라 "[[[[…"에 RecursionError 대신 ValueError로 → 재질의 가능)
+MAX_DEPTH = 64
+
+
+_MISSING = object()
+
+# 여는 따옴표 → 닫는 따옴표 후보
+_CLOSERS = {'"': '"', "“": "”\"", "'": "'", "‘": "’'"}
+_STOP = {q: re.compile("[\\\\" + re.escape(c) + "]") for q, c in _CLOSERS.items()}
+_ESCAPES = {
+    "n": "\n",
+    "t": "\t",
+    "r": "\r",
+    "b": "\b",
+    "f": "\f",
+    "/": "/",
+    "\\": "\\",
+    '"': '"',
+    "'": "'",
+}
+_WS = re.compile(r"\s*")
+_NUM = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_BARE_END = re.compile(r"[,}\]\n]")
+_BARE_KEY = re.compile(r"[A-Za-z_]\w*\s*[:=]")
+_LITERALS = {
+    "true": True,
+    "True": True,
+    "false": False,
+    "False": False,
+    "null": None,
+    "None": None,
+}
+_VALUE_START = set("\"“'‘{[-+.0123456789tfnTFN")
+
+# 문자열이 놓인 자리(닫는 따옴표 판단 기준)
+_KEY, _IN_OBJ, _IN_ARR, _TOP = range(4)
+
+
+class _Parser:
+
+    def __init__(self, s: str):
+        self.s = s
+        self.n = len(s)
+        self.i = 0
+        self.depth = 0
+
+    def ws(self) -> None:
+        self.i = _WS.match(self.s, self.i).end()
+
+    def eof(self) -> bool:
+        return self.i >= self.n
+
+    # ---- 값 ----
+    def value(self, where: int) -> Any:
+        self.ws()
+        if self.eof():
+            return _MISSING
+        c = self.s[self.i]
+        if c == "{":
+            return self.obj()
+        if c == "[":
+            return self.arr()
+        if c in _CLOSERS:
+            return self.string(c, where)
+        if c in "-+.0123456789":
+            return self.number()
+        return self.word()
+
+    def enter(self) -> None:
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise TolerantJSONError(f"중첩이 {MAX_DEPTH}단계를 넘음(위치 {self.i})")
+
+    def obj(self) -> dict:
+        self.enter()
+        self.i += 1
+        out: dict = {}
+        while True:
+            self.ws()
+            if self.eof():
+                return out
+            c = self.s[self.i]
+            if c in "}]":
+                self.i += 1
+                self.depth -= 1
+                return out
+            if c == ",":
+                self.i += 1
+                continue
+            key = self.key()
+            if key is _MISSING:
+                continue
+            self.ws()
+            if self.eof():
+                return out  # 값 없이 잘린 키는 버림
+            if self.s[self.i] in ":=":
+                self.i += 1
+            val = self.value(_IN_OBJ)
+            if val is not _MISSING:
+                out[key] = val
+
+    def arr(self) -> list:
+        self.enter()
+        self.i += 1
+        out: List[Any] = []
+        while True:
+            self.ws()
+            if self.eof():
+                return out
+            c = self.s[self.i]
+            if c in "]}":
+                self.i += 1
+                self.depth -= 1
+                return out
+            if c == ",":
+                self.i += 1
+                continue
+            val = self.value(_IN_ARR)
+            if val is not _MISSING:
+                out.append(val)
+
+    def key(self) -> Any:
+        c = self.s[self.i]
+        if c in _CLOSERS:
+            return self.string(c, _KEY)
+        start = self.i
+        while not self.eof() and self.s[self.i] not in ":=,{}[]\n":
+            self.i += 1
+        key = self.s[start:self.i].strip()
+        if not key:
+            self.i = max(self.i, start + 1)  # 진행 보장(키 없이 ':' 등)
+            return _MISSING
+        return key
+
+    def string(self, quote: str, where: int) -> str:
+        s, n = self.s, self.n
+        closers, stop = _CLOSERS[quote], _STOP[quote]
+        self.i += 1
+        buf: List[str] = []
+        while True:
+            m = stop.search(s, self.i)
+            if m is None:  # 잘린 문자열
+                buf.append(s[self.i:])
+                self.i = n
+                return "".join(buf)
+            j = m.start()
+            buf.append(s[self.i:j])
+            c = s[j]
+            if c == "\\":
+                self.i = j + 1
+                buf.append(self.escape())
+                continue
+            if c in closers and self.closes_at(j + 1, where):
+                self.i = j + 1
+                return "".join(buf)
+            buf.append(c)  # 이스케이프 안 된 안쪽 따옴표
+            self.i = j + 1
+
+    def escape(self) -> str:
+        s = self.s
+        if self.eof():
+            return ""
+        c = s[self.i]
+        self.i += 1
+        if c in _ESCAPES:
+            return _ESCAPES[c]
+        if c == "u":
+            code = s[self.i:self.i + 4]
+            try:
+                cp = int(code, 16)
+            except ValueError:
+                return "u"
+            self.i += len(code)
+            if 0xD800 <= cp < 0xDC00 and s.startswith("\\u", self.i):
+                try:
+                    lo = int(s[self.i + 2:self.i + 6], 16)
+                except ValueError:
+                    lo = 0
+                if 0xDC00 <= lo < 0xE000:
+                    self.i += 6
+                    cp = 0x10000 + ((cp - 0xD800) << 10) + (lo - 0xDC00)
+            return chr(cp)
+        return c  # 알 수 없는 이스케이프는 문자 그대로
+
+    def closes_at(self, j: int, where: int) -> bool:
+        """j 직전의 따옴표가 문자열을 닫는지: 뒤따르는 내용이 구분자처럼 보이면 닫음."""
+        s = self.s
+        k = _WS.match(s, j).end()
+        if k >= self.n or where == _TOP:
+            return True
+        c = s[k]
+        if where == _KEY:
+            return c in ":="
+        if c == ("}" if where == _IN_OBJ else "]"):
+            return True
+        if c != ",":
+            return False
+        k = _WS.match(s, k + 1).end()
+        if k >= self.n:
+            return True
+        if where == _IN_OBJ:
+            return (s[k] in _CLOSERS or s[k] == "}"
+                    or _BARE_KEY.match(s, k) is not None)
+        return s[k] in _VALUE_START or s[k] == "]"
+
+    def number(self) -> Any:
+        m = _NUM.match(self.s, self.i)
+        if m is None or not self.at_delim(m.end()):
+            return self.bare()
+        text = m.group()
+        self.i = m.end()
+        if any(ch in text for ch in ".eE"):
+            return float(text)
+        return int(text)  # "03" → 3
+
+    def word(self) -> Any:
+        m = _WORD.match(self.s, self.i)
+        if m is None or not self.at_delim(m.end()):
+            return self.bare()
+        w = m.group()
+        if m.end() >= self.n and any(
+                lit.startswith(w) and lit != w for lit in _LITERALS):
+            self.i = self.n  # 잘린 true/false/null
+            return _MISSING
+        if w not in _LITERALS:
+            return self.bare()
+        self.i = m.end()
+        return _LITERALS[w]
+
+    def at_delim(self, j: int) -> bool:
+        return j >= self.n or self.s[j] in " \t\r\n,}]"
+
+    def bare(self) -> str:
+        """따옴표 없는 값: 다음 구분자까지를 문자열로."""
+        m = _BARE_END.search(self.s, self.i)
+        end = self.n if m is None else m.start()
+        text = self.s[self.i:end].strip()
+        self.i = max(end, self.i + 1)
+        return text
+
+
+def tolerant_loads(text: str) -> Any:
+    """LLM 출력에서 첫 JSON 객체(없으면 배열)를 한 번 훑어 보정하며 파싱."""
+    s = text or ""
+    start = s.find("{")
+    if start == -1:
+        start = s.find("[")
+    if start == -1:
+        raise TolerantJSONError(f"JSON 값이 없음: {s[:200]!r}")
+    p = _Parser(s)
+    p.i = start
+    return p.value(_TOP)
@@ -0,0 +1,357 @@
+# rejudge.py
+"""
+과거 AdminCase 일괄 재판정(판정 프롬프트/모델을 바꾼 뒤 기존 케이스 다시 판정).
+
+  python rejudge.py --since 2026-09-01 --concurrency 16
+  python rejudge.py --judge-model gpt-4.1-mini --model o4-mini --limit 500
+  python rejudge.py --resume        # 중단된 실행을 체크포인트부터 이어서
+
+- 기본 대상: status=completed 이면서 judge_version이 현재 JUDGE_PROMPT_VERSION이 아닌 케이스
+- N개 워커가 동시에 판정(LLM 호출은 공용 rate limiter를 거침), 결과는 --batch-size건씩 모아 UPDATE
+- 케이스 id 순으로 처리하고, 앞에서부터 끝난 구간까지를 체크포인트 파일에 기록 → --resume
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import or_, update
+
+from app.core.config import settings
+from app.db import models as m
+from app.db.session import SessionLocal
+from app.services.admin_summary import judge_case_async
+from app.services.llm_cost import (
+    BudgetExceeded,
+    budget_exhausted,
+    budget_scope,
+    cost_summary,
+    ledger_scope,
+)
+from app.services.llm_providers import aclose_llm_clients, close_llm_clients
+
+PAGE_SIZE = 500
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="AdminCase 일괄 재판정")
+    # 대상 선택
+    p.add_argument("--since", help="created_at 이후(YYYY-MM-DD 또는 ISO 시각)")
+    p.add_argument("--until", help="created_at 이전(미포함)")
+    p.add_argument("--status", default="completed", help="케이스 상태(빈 값이면 전체)")
+    p.add_argument("--judge-model",
+                   help="이 모델로 판정된 케이스만(none=판정 모델 기록 없음)")
+    p.add_argument("--version", help="이 판정 버전인 케이스만")
+    p.add_argument("--not-version",
+                   default=settings.JUDGE_PROMPT_VERSION,
+                   help="이 판정 버전이 아닌 케이스만(기본: 현재 JUDGE_PROMPT_VERSION)")
+    p.add_argument("--all",
+                   action="store_true",
+                   help="--not-version 기본 필터 끄기(버전과 무관하게 다시 판정)")
+    p.add_argument("--limit", type=int, default=0, help="최대 처리 건수(0이면 전체)")
+    # 실행
+    p.add_argument("--model", help="판정 모델(기본 ADMIN_MODEL)")
+    p.add_argument("--concurrency", type=int, default=8, help="동시 판정 수")
+    p.add_argument("--batch-size", type=int, default=50, help="한 번에 쓰는 결과 수")
+    p.add_argument("--checkpoint",
+                   default=".rejudge_checkpoint.json",
+                   help="체크포인트 파일 경로")
+    p.add_argument("--resume", action="store_true", help="체크포인트부터 이어서 실행")
+    p.add_argument("--budget-usd",
+                   type=float,
+                   default=0.0,
+                   help="이번 실행의 LLM 비용 상한(USD, 0이면 무제한)")
+    p.add_argument("--dry-run", action="store_true", help="대상 건수만 출력")
+    return p.parse_args()
+
+
+# =========================
+# 대상 선택
+# =========================
+def filter_spec(args) -> Dict[str, Any]:
+    """체크포인트에 남기는 대상 조건(재개 시 같은 조건인지 확인)."""
+    return {
+        "since": args.since,
+        "until": args.until,
+        "status": args.status or None,
+        "judge_model": args.judge_model,
+        "version": args.version,
+        "not_version": None if args.all else args.not_version,
+    }
+
+
+def _conditions(spec: Dict[str, Any]) -> List[Any]:
+    c = m.AdminCase
+    cond: List[Any] = []
+    if spec["since"]:
+        cond.append(c.created_at >= datetime.fromisoformat(spec["since"]))
+    if spec["until"]:
+        cond.append(c.created_at < datetime.fromisoformat(spec["until"]))
+    if spec["status"]:
+        cond.append(c.status == spec["status"])
+    if spec["judge_model"]:
+        cond.append(
+            c.judge_model.is_(None) if spec["judge_model"] ==
+            "none" else c.judge_model == spec["judge_model"])
+    if spec["version"]:
+        cond.append(c.judge_version == spec["version"])
+    if spec["not_version"]:
+        cond.append(
+            or_(c.judge_version.is_(None),
+                c.judge_version != spec["not_version"]))
+    return cond
+
+
+def count_cases(db, spec: Dict[str, Any], after: str | None) -> int:
+    q = db.query(m.AdminCase.id).filter(*_conditions(spec))
+    if after:
+        q = q.filter(m.AdminCase.id > UUID(after))
+    return q.count()
+
+
+def fetch_page(db, spec: Dict[str, Any], after: str | None,
+               size: int) -> List[Tuple[UUID, bool | None]]:
+    """id 순 keyset 페이지: [(case_id, 기존 phishing), ...]"""
+    q = db.query(m.AdminCase.id,
+                 m.AdminCase.phishing).filter(*_conditions(spec))
+    if after:
+        q = q.filter(m.AdminCase.id > UUID(after))
+    rows = q.order_by(m.AdminCase.id.asc()).limit(size).all()
+    db.rollback()  # 다음 페이지까지 커넥션을 잡지 않음
+    return [(r.id, r.phishing) for r in rows]
+
+
+def write_batch(db, rows: List[Dict[str, Any]]) -> None:
+    """판정 결과 일괄 UPDATE(기본키 기준 executemany)."""
+    if not rows:
+        return
+    db.execute(update(m.AdminCase), rows)
+    db.commit()
+
+
+# =========================
+# 체크포인트
+# =========================
+class Checkpoint:
+
+    def __init__(self, path: str, spec: Dict[str, Any]):
+        self.path = Path(path)
+        self.spec = spec
+        self.cursor: str | None = None  # 여기까지(포함) id 순으로 처리 완료
+        self.done = 0
+        self.changed = 0
+        self.failed: List[str] = []
+
+    @classmethod
+    def load(cls, path: str, spec: Dict[str, Any]) -> "Checkpoint":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data["spec"] != spec:
+            raise SystemExit(f"체크포인트의 대상 조건이 다릅니다: {data['spec']} != {spec}")
+        ck = cls(path, spec)
+        ck.cursor = data.get("cursor")
+        ck.done = data.get("done", 0)
+        ck.changed = data.get("changed", 0)
+        ck.failed = data.get("failed", [])
+        return ck
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(
+            {
+                "spec": self.spec,
+                "cursor": self.cursor,
+                "done": self.done,
+                "changed": self.changed,
+                "failed": self.failed,
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+            },
+            ensure_ascii=False,
+            indent=2),
+                       encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+# =========================
+# 실행
+# =========================
+class Rejudge:
+    """워커 N개 + 배치 쓰기 + 체크포인트 전진."""
+
+    def __init__(self, args, ck: Checkpoint, total: int):
+        self.args = args
+        self.ck = ck
+        self.total = total
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+        self.in_order: deque = deque()  # 배정 순서(id 순)
+        self.finished: set = set()  # 기록 끝난 id(성공/실패)
+        self.pending: List[Tuple[str, Dict[str, Any] | None, bool]] = []
+        self.flush_lock = asyncio.Lock()
+        self.db = SessionLocal()  # 결과 쓰기 전용(flush_lock 안에서만 사용)
+        self.started = time.perf_counter()
+        self.done_now = 0
+        self.stopped: str | None = None
+
+    async def produce(self) -> None:
+        after, left = self.ck.cursor, self.args.limit or None
+        db = SessionLocal()  # 페이지 조회 전용
+        try:
+            while self.stopped is None:
+                size = PAGE_SIZE if left is None else min(PAGE_SIZE, left)
+                if size <= 0:
+                    break
+                page = await asyncio.to_thread(fetch_page, db, self.ck.spec,
+                                               after, size)
+                if not page:
+                    break
+                for case_id, old in page:
+                    if budget_exhausted():
+                        self.stopped = "budget"
+                        break
+                    self.in_order.append(str(case_id))
+                    await self.queue.put((case_id, old))
+                after = str(page[-1][0])
+                if left is not None:
+                    left -= len(page)
+        finally:
+            db.close()
+            for _ in range(self.args.concurrency):
+                await self.queue.put(None)
+
+    async def work(self) -> None:
+        db = SessionLocal()
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is None:
+                    return
+                case_id, old = item
+                if self.stopped is not None:
+                    continue  # 기록하지 않음 → 체크포인트가 넘어가지 않아 재개 시 다시 처리
+                try:
+                    verdict = await judge_case_async(db, case_id,
+                                                     self.args.model)
+                except BudgetExceeded:
+                    self.stopped = "budget"
+                    continue
+                except Exception as e:
+                    print(f"[REJUDGE] case={case_id} 실패: {e}")
+                    await self.add(str(case_id), None, False)
+                    continue
+                changed = old is not None and old != verdict["phishing"]
+                await self.add(str(case_id), {
+                    "id": case_id,
+                    **verdict
+                }, changed)
+        finally:
+            db.close()
+
+    async def add(self, case_id: str, row: Dict[str, Any] | None,
+                  changed: bool) -> None:
+        self.pending.append((case_id, row, changed))
+        if len(self.pending) >= self.args.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self.flush_lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            rows = [row for _, row, _ in batch if row is not None]
+            await asyncio.to_thread(write_batch, self.db, rows)
+            for case_id, row, changed in batch:
+                self.finished.add(case_id)
+                if row is None:
+                    self.ck.failed.append(case_id)
+                else:
+                    self.ck.done += 1
+                    self.done_now += 1
+                    self.ck.changed += int(changed)
+            # 앞에서부터 끊김 없이 끝난 구간까지만 커서 전진
+            while self.in_order and self.in_order[0] in self.finished:
+                self.ck.cursor = self.in_order.popleft()
+                self.finished.discard(self.ck.cursor)
+            await asyncio.to_thread(self.ck.save)
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = time.perf_counter() - self.started
+        rate = self.done_now / elapsed if elapsed > 0 else 0.0
+        left = max(0, self.total - self.done_now - len(self.ck.failed))
+        eta = f"{left / rate:.0f}s" if rate > 0 and not final else "-"
+        print(f"[REJUDGE] done={self.done_now}/{self.total} "
+              f"failed={len(self.ck.failed)} changed={self.ck.changed} "
+              f"rate={rate:.2f}/s elapsed={elapsed:.0f}s eta={eta}")
+
+    async def run(self) -> None:
+        try:
+            workers = [
+                asyncio.create_task(self.work())
+                for _ in range(self.args.concurrency)
+            ]
+            await asyncio.gather(self.produce(), *workers)
+            await self.flush()
+        finally:
+            self.db.close()
+            await aclose_llm_clients()  # 이 루프의 비동기 커넥션 풀 정리
+
+
+def main():
+    args = parse_args()
+    spec = filter_spec(args)
+    path = Path(args.checkpoint)
+    if args.resume and path.exists():
+        ck = Checkpoint.load(args.checkpoint, spec)
+        print(f"[REJUDGE] 체크포인트에서 재개: cursor={ck.cursor} done={ck.done}")
+    else:
+        ck = Checkpoint(args.checkpoint, spec)
+
+    db = SessionLocal()
+    try:
+        total = count_cases(db, spec, ck.cursor)
+    finally:
+        db.close()
+    if args.limit:
+        total = min(total, args.limit)
+    print(f"[REJUDGE] 대상 {total}건 spec={json.dumps(spec, ensure_ascii=False)} "
+          f"model={args.model or settings.ADMIN_MODEL} "
+          f"version={settings.JUDGE_PROMPT_VERSION}")
+    if args.dry_run or total == 0:
+        return
+
+    batch_id = f"rejudge-{uuid4().hex[:12]}"
+    scope = ExitStack()
+    scope.enter_context(ledger_scope(batch_id=batch_id))
+    scope.enter_context(budget_scope("rejudge", args.budget_usd))
+    job = Rejudge(args, ck, total)
+    try:
+        asyncio.run(job.run())
+    finally:
+        scope.close()
+        close_llm_clients()
+
+    job.report(final=True)
+    if job.stopped == "budget":
+        print(f"[BUDGET] 예산 ${args.budget_usd:.2f} 소진 → --resume 으로 이어서 실행")
+    if ck.failed:
+        print(f"[REJUDGE] 실패 {len(ck.failed)}건(체크포인트 failed 목록)")
+    if settings.LLM_LEDGER_ENABLED:
+        db = SessionLocal()
+        try:
+            print(f"LLM cost (batch_id={batch_id}):",
+                  json.dumps(cost_summary(db, batch_id=batch_id),
+                             ensure_ascii=False))
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -124,12 +124,27 @@ from __future__ import annotations
 import json
 from typing import Any, Dict, List, Tuple
 import argparse
+import asyncio
+from contextlib import ExitStack
+from uuid import uuid4
 
 from sqlalchemy import text
 from app.db.session import SessionLocal
 from app.db import models as m
-from app.services.simulation import run_two_bot_simulation
+from app.services.simulation import run_two_bot_simulation, run_simulations_async
+from app.services.llm_providers import close_llm_clients, aclose_llm_clients
+from app.services.opening_cache import (
+    opening_cache,
+    opening_inputs,
+    prewarm_openings,
+)
 from app.services.admin_summary import summarize_case
+from app.services.llm_cost import (
+    budget_exhausted,
+    budget_scope,
+    cost_summary,
+    ledger_scope,
+)
 from app.schemas.conversation import ConversationRunRequest
 from app.core.config import settings
 from app.services.prompts import (
@@ -148,6 +163,27 @@ def parse_args():
         default=0,
         help="이미 처리한 offender×victim 페어 개수만큼 건너뛰기 (예: 35면 36번째부터 실행)",
     )
+    p.add_argument(
+        "--async-engine",
+        action="store_true",
+        default=settings.SIM_ASYNC_ENGINE,
+        help="비동기 엔진으로 여러 페어를 동시에 실행",
+    )
+    p.add_argument("--concurrency",
+                   type=int,
+                   default=settings.SIM_CONCURRENCY,
+                   help="비동기 엔진 동시 실행 수 상한")
+    p.add_argument("--opening-pool",
+                   type=int,
+                   default=settings.OPENING_CACHE_POOL_SIZE or 4,
+                   help="공격자 첫 발화 풀 크기(페어 간 재사용, 0이면 사용 안 함)")
+    p.add_argument("--no-prewarm",
+                   action="store_true",
+                   help="공격자 첫 발화 풀을 미리 채우지 않음")
+    p.add_argument("--budget-usd",
+                   type=float,
+                   default=settings.LLM_BUDGET_PER_CYCLE_USD,
+                   help="이번 실행의 LLM 비용 상한(USD, 0이면 무제한)")
     return p.parse_args()
 
 
@@ -168,10 +204,10 @@ def _case_scenario_from_offender(
     return scen
 
 
-def run_one(db, offender: m.PhishingOffender, victim: m.Victim,
-            max_rounds: int) -> Tuple[str, int]:
+def build_request(offender: m.PhishingOffender, victim: m.Victim,
+                  max_rounds: int) -> ConversationRunRequest:
     """
-    하나의 시뮬레이션 케이스 실행 (공격자 + 피해자 프롬프트 변수 세팅)
+    공격자 + 피해자 프롬프트 변수를 세팅한 시뮬레이션 요청 생성
     """
     case_scenario = _case_scenario_from_offender(offender)
 
@@ -190,28 +226,115 @@ def run_one(db, offender: m.PhishingOffender, victim: m.Victim,
     })
 
     # 3) 시뮬레이션 요청 객체 생성
-    req = ConversationRunRequest(offender_id=offender.id,
-                                 victim_id=victim.id,
-                                 case_scenario=case_scenario,
-                                 max_rounds=max_rounds,
-                                 history=[],
-                                 last_victim="",
-                                 last_offender="",
-                                 **attacker_vars,
-                                 **victim_vars)
+    return ConversationRunRequest(offender_id=offender.id,
+                                  victim_id=victim.id,
+                                  case_scenario=case_scenario,
+                                  max_rounds=max_rounds,
+                                  history=[],
+                                  last_victim="",
+                                  last_offender="",
+                                  **attacker_vars,
+                                  **victim_vars)
+
+
+def prewarm(offenders: List[m.PhishingOffender], concurrency: int) -> None:
+    """
+    공격자 첫 발화는 피해자와 무관 → 오프너별로 풀을 미리 채워
+    모든 페어가 첫 LLM 왕복 없이 시작하도록 한다.
+    """
+    items = []
+    for off in offenders:
+        steps = _case_scenario_from_offender(off).get("steps") or []
+        if steps:
+            items.append(opening_inputs(steps[0]))
+
+    async def _prewarm() -> int:
+        try:
+            return await prewarm_openings(items, concurrency=concurrency)
+        finally:
+            await aclose_llm_clients()
+
+    n = asyncio.run(_prewarm())
+    print(f"[OPENING] prewarmed {n} openings for {len(items)} offenders")
+
+
+def run_one(db, offender: m.PhishingOffender, victim: m.Victim,
+            max_rounds: int) -> Tuple[str, int]:
+    """
+    하나의 시뮬레이션 케이스 실행 (공격자 + 피해자 프롬프트 변수 세팅)
+    """
+    req = build_request(offender, victim, max_rounds)
 
     # 4) 시뮬레이션 실행
     case_id, total_turns = run_two_bot_simulation(db, req)
 
-    # 5) 결과 요약 저장 (LLM-only 판정)
-    summarize_case(db, case_id)
+    # 5) 결과 요약 저장 (LLM-only 판정) — 실행 예산을 다 썼으면 시뮬레이션 쪽 마감만 유지
+    if not budget_exhausted():
+        summarize_case(db, case_id)
 
     return str(case_id), total_turns
 
 
+def run_batch_async(offenders: List[m.PhishingOffender],
+                    victims: List[m.Victim], cycles: int, max_rounds: int,
+                    skip_n: int, concurrency: int) -> List[Dict[str, Any]]:
+    """
+    비동기 엔진: 남은 페어 전체를 한 이벤트 루프에서 동시 실행.
+    (판정은 시뮬레이션 종료 시 이미 수행됨)
+    """
+    todo = []
+    processed_global = 0
+    for cycle in range(1, cycles + 1):
+        for off in offenders:
+            for vic in victims:
+                processed_global += 1
+                if processed_global <= skip_n:
+                    continue
+                todo.append((processed_global, cycle, off, vic))
+
+    reqs = [
+        build_request(off, vic, max_rounds=max_rounds)
+        for _, _, off, vic in todo
+    ]
+
+    async def _batch():
+        try:
+            return await run_simulations_async(reqs, concurrency=concurrency)
+        finally:
+            await aclose_llm_clients()  # 이 루프의 비동기 커넥션 풀 정리
+
+    outcomes = asyncio.run(_batch())
+
+    results = []
+    for (idx, cycle, off, vic), out in zip(todo, outcomes):
+        if isinstance(out, BaseException):
+            print(
+                f"[{idx}] cycle={cycle} offender={off.id} victim={vic.id} → 실패: {out}"
+            )
+            continue
+        case_id, turns = out
+        results.append({
+            "cycle": cycle,
+            "case_id": str(case_id),
+            "offender_id": off.id,
+            "victim_id": vic.id,
+            "turns": turns
+        })
+        print(
+            f"[{idx}] cycle={cycle} offender={off.id} victim={vic.id} → case={case_id} turns={turns}"
+        )
+    return results
+
+
 def main():
     args = parse_args()
+    settings.OPENING_CACHE_POOL_SIZE = args.opening_pool
     db = SessionLocal()
+    # 실행 단위 원장 귀속(batch_id) + 예산: prewarm~배치 전체에 걸림
+    batch_id = uuid4().hex
+    scope = ExitStack()
+    scope.enter_context(ledger_scope(batch_id=batch_id))
+    scope.enter_context(budget_scope("cycle", args.budget_usd))
     try:
         # --- 연결/데이터 자가진단 ---
         row = db.execute(
@@ -245,36 +368,48 @@ def main():
         MAX_ROUNDS = args.max_rounds
         SKIP_N = args.skip_n
 
+        if not args.no_prewarm:
+            prewarm(offenders, args.concurrency)
+
         total_new = 0  # 이번 실행에서 새로 처리한 케이스 수
         processed_global = 0  # 전체 페어에서 몇 개를 훑었는지 (skip 포함)
         results = []
 
-        for cycle in range(1, CYCLES + 1):
-            print(f"\n=== Cycle {cycle}/{CYCLES} 시작 ===")
-            for off in offenders:
-                for vic in victims:
-                    # 이미 처리한(혹은 이전 실행에서 끝낸) 페어 건너뛰기
-                    if processed_global < SKIP_N:
+        if args.async_engine:
+            results = run_batch_async(offenders, victims, CYCLES, MAX_ROUNDS,
+                                      SKIP_N, args.concurrency)
+            total_new = len(results)
+        else:
+            for cycle in range(1, CYCLES + 1):
+                if budget_exhausted():
+                    break
+                print(f"\n=== Cycle {cycle}/{CYCLES} 시작 ===")
+                for off in offenders:
+                    for vic in victims:
+                        # 이미 처리한(혹은 이전 실행에서 끝낸) 페어 건너뛰기
+                        if processed_global < SKIP_N:
+                            processed_global += 1
+                            continue
+                        if budget_exhausted():
+                            break
+
+                        case_id, turns = run_one(db,
+                                                 off,
+                                                 vic,
+                                                 max_rounds=MAX_ROUNDS)
                         processed_global += 1
-                        continue
-
-                    case_id, turns = run_one(db,
-                                             off,
-                                             vic,
-                                             max_rounds=MAX_ROUNDS)
-                    processed_global += 1
-                    total_new += 1
-
-                    results.append({
-                        "cycle": cycle,
-                        "case_id": case_id,
-                        "offender_id": off.id,
-                        "victim_id": vic.id,
-                        "turns": turns
-                    })
-                    print(
-                        f"[{processed_global}] cycle={cycle} offender={off.id} victim={vic.id} → case={case_id} turns={turns}"
-                    )
+                        total_new += 1
+
+                        results.append({
+                            "cycle": cycle,
+                            "case_id": case_id,
+                            "offender_id": off.id,
+                            "victim_id": vic.id,
+                            "turns": turns
+                        })
+                        print(
+                            f"[{processed_global}] cycle={cycle} offender={off.id} victim={vic.id} → case={case_id} turns={turns}"
+                        )
 
         print("\n=== Batch summary ===")
         expected = len(offenders) * len(victims) * CYCLES
@@ -282,11 +417,20 @@ def main():
         print(
             f"예상 총 케이스 수: {expected} ( {len(offenders)} x {len(victims)} x {CYCLES} )"
         )
+        print("opening cache:", opening_cache.stats())
+        if budget_exhausted():
+            print(f"[BUDGET] 실행 예산 ${args.budget_usd:.2f} 소진 → 남은 페어는 건너뜀")
+        if settings.LLM_LEDGER_ENABLED:
+            print(f"LLM cost (batch_id={batch_id}):",
+                  json.dumps(cost_summary(db, batch_id=batch_id),
+                             ensure_ascii=False))
         if results:
             print(json.dumps(results[:5], ensure_ascii=False, indent=2))
 
     finally:
+        scope.close()
         db.close()
+        close_llm_clients()
 
 
 if __name__ == "__main__":
@@ -193,12 +193,25 @@ def patch_conversationlog_schema() -> None:
             conn.execute(text(sql))
 
 
+def patch_admincase_schema() -> None:
+    """Alembic 없이 케이스 테이블에 판정 모델/버전 컬럼을 안전 추가."""
+    ddl = [
+        "ALTER TABLE admincase ADD COLUMN IF NOT EXISTS judge_model varchar(100)",
+        "ALTER TABLE admincase ADD COLUMN IF NOT EXISTS judge_version varchar(40)",
+        "CREATE INDEX IF NOT EXISTS ix_admincase_judge_version ON admincase (judge_version)",
+    ]
+    with engine.begin() as conn:
+        for sql in ddl:
+            conn.execute(text(sql))
+
+
 def main() -> None:
     # 1) 신규 테이블 생성 (없으면 생성)
     Base.metadata.create_all(bind=engine)
 
-    # 1-1) 기존 테이블 스키마 패치(대화로그 새 컬럼/인덱스)
+    # 1-1) 기존 테이블 스키마 패치(대화로그 새 컬럼/인덱스, 케이스 판정 버전)
     patch_conversationlog_schema()
+    patch_admincase_schema()
 
     db = SessionLocal()
     try:
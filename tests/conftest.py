@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db import models as m
+from app.services import sim_recovery, simulation
+
+STEPS = ["기관 사칭", "계좌 확인", "송금 유도", "마무리"]
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def sim_db(monkeypatch, tmp_path):
+    """가짜 프로바이더 + sqlite DB(피싱범/피해자 1명씩) → sessionmaker.
+    파일 DB: 세션마다 커넥션이 따로라 동시 실행(스레드 flush)에서도 트랜잭션이 섞이지 않음."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'sim.db'}",
+                           connect_args={"check_same_thread": False})
+    m.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(m.PhishingOffender(id=1, name="검찰 사칭",
+                                  profile={"steps": STEPS}))
+        db.add(m.Victim(id=1, name="피해자", meta={}, knowledge={},
+                        traits={}))
+        db.commit()
+
+    for key, value in {
+            "ATTACKER_MODEL": "fake",
+            "ADMIN_MODEL": "fake",
+            "VICTIM_PROVIDER": "fake",
+            "LLM_FAKE_LATENCY_MEDIAN_MS": 0,
+            "LLM_FAKE_ATTACKER_TURNS": 3,
+            "LLM_FAKE_SEED": 7,
+            "LLM_CACHE_BACKEND": "off",
+            "LLM_CASSETTE_MODE": "off",
+            "LLM_LEDGER_ENABLED": False,
+            "JUDGE_MEMO_ENABLED": False,
+            "PREJUDGE_ENABLED": False,
+            "LIVE_JUDGE": False,
+            "VICTIM_CASCADE": False,
+            "OPENING_CACHE_POOL_SIZE": 0,
+    }.items():
+        monkeypatch.setattr(settings, key, value)
+    monkeypatch.setattr(simulation, "SessionLocal", Session)
+    monkeypatch.setattr(sim_recovery, "SessionLocal", Session)
+    yield Session
+    engine.dispose()
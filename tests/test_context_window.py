@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app.core.config import settings
+from app.db import models as m
+from app.schemas.conversation import ConversationRunRequest
+from app.services import simulation
+from app.services.context_window import RollingContext
+
+
+def _history(n: int) -> list:
+    return [(AIMessage if i % 2 == 0 else HumanMessage)(f"메시지 {i} 입니다. " + "고객님 계좌 확인이 필요합니다. " * 10)
+            for i in range(n)]
+
+
+def test_keeps_recent_turns_and_folds_older_into_summary():
+    ctx = RollingContext("attacker", keep_turns=4, token_budget=0)
+    view = ctx.view(_history(10))
+
+    assert isinstance(view[0], SystemMessage)
+    assert "사기범: 메시지 0" in view[0].content
+    assert [m.content[:6] for m in view[1:]] == [f"메시지 {i} " for i in range(6, 10)]
+    assert ctx.stats()["saved_tokens"] > 0
+
+
+def test_disabled_window_sends_full_history():
+    ctx = RollingContext("victim", keep_turns=0, token_budget=0)
+    hist = _history(6)
+    assert ctx.view(hist) == hist
+    assert ctx.stats()["saved_tokens"] == 0
+
+
+def test_token_budget_folds_more_but_keeps_last_two():
+    ctx = RollingContext("victim", keep_turns=8, token_budget=1,
+                         summary_budget=0)
+    view = ctx.view(_history(8))
+    assert len([m for m in view if not isinstance(m, SystemMessage)]) == 2
+
+
+@pytest.mark.parametrize("flush_every,max_turns", [(1, 2), (100, 10)])
+def test_run_context_stats_are_stored_on_last_turn(sim_db, monkeypatch,
+                                                   flush_every, max_turns):
+    # (1, 2): 라운드 소진으로 끝나 마지막 턴이 이미 저장됨 → payload 갱신
+    # (100, 10): 종료 선언 줄이 버퍼에 남아 있음 → 남은 턴과 함께 INSERT
+    monkeypatch.setattr(settings, "TURN_FLUSH_EVERY", flush_every)
+    monkeypatch.setattr(settings, "SIM_CONTEXT_KEEP_TURNS", 1)
+    with sim_db() as db:
+        case_id, turns = simulation.run_two_bot_simulation(
+            db, ConversationRunRequest(offender_id=1, victim_id=1,
+                                       max_turns=max_turns))
+        rows = (db.query(m.ConversationLog).filter_by(case_id=case_id)
+                .order_by(m.ConversationLog.turn_index).all())
+    assert len(rows) == turns
+    assert all("run_stats" not in r.payload for r in rows[:-1])
+    ctx = rows[-1].payload["run_stats"]["context"]
+    assert ctx["attacker"]["history_tokens_full"] > 0
+    assert ctx["saved_tokens"] == (ctx["attacker"]["saved_tokens"] +
+                                   ctx["victim"]["saved_tokens"])
+    assert rows[-1].payload["max_rounds"] == max_turns
@@ -0,0 +1,109 @@
+import importlib
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.db import models as m
+from app.schemas.conversation import ConversationRunRequest
+from app.services import simulation as sim
+from app.utils.deps import get_db
+
+# app.routers 패키지는 같은 이름으로 APIRouter를 내보냄 → 모듈은 직접 로드
+conversations = importlib.import_module("app.routers.conversations")
+
+
+def _source_case(Session, max_turns: int = 10):
+    with Session() as db:
+        case_id, turns = sim.run_two_bot_simulation(
+            db, ConversationRunRequest(offender_id=1, victim_id=1,
+                                       max_turns=max_turns))
+    return case_id, turns
+
+
+def _rows(db, case_id):
+    return (db.query(m.ConversationLog).filter_by(case_id=case_id)
+            .order_by(m.ConversationLog.turn_index).all())
+
+
+def test_fork_judges_only_the_branch(sim_db):
+    src_id, _ = _source_case(sim_db)
+    with sim_db() as db:
+        before = db.get(m.AdminCase, src_id)
+        verdict = (before.phishing, before.evidence, before.completed_at)
+        src_rows = [(r.role, r.content) for r in _rows(db, src_id)]
+
+    with sim_db() as db:
+        new_id, run, total = sim.fork_simulation(db, src_id, turn_index=3,
+                                                 inject_text="지금 바로 이체하세요")
+    assert new_id != src_id and run == 1
+
+    with sim_db() as db:
+        parent = db.get(m.AdminCase, src_id)
+        assert (parent.phishing, parent.evidence,
+                parent.completed_at) == verdict
+        assert [(r.role, r.content) for r in _rows(db, src_id)] == src_rows
+
+        branch = _rows(db, new_id)
+        assert [r.turn_index for r in branch] == list(range(total))
+        assert [(r.role, r.content) for r in branch[:3]] == src_rows[:3]
+        assert branch[3].content == "지금 바로 이체하세요"
+        assert branch[0].payload["forked_from"] == {"case_id": str(src_id),
+                                                    "run": 1}
+        assert "forked_from" not in branch[3].payload
+        # max_turns를 안 주면 원본 run의 max_rounds(10)를 이어받음
+        assert {r.payload["max_rounds"] for r in branch} == {10}
+        case = db.get(m.AdminCase, new_id)
+        assert case.status == "completed" and case.phishing is not None
+
+
+def test_inject_respects_attack_limit(sim_db):
+    src_id, turns = _source_case(sim_db, max_turns=2)
+    assert turns == 4  # 공격 2회 후 라운드 소진
+    n_cases = sim_db().query(m.AdminCase).count()
+
+    with sim_db() as db, pytest.raises(ValueError, match="공격 한도"):
+        sim.fork_case(db, src_id, turn_index=4, inject_text="한 번 더")
+    assert sim_db().query(m.AdminCase).count() == n_cases
+
+    with sim_db() as db:
+        new_id, stored = sim.fork_case(db, src_id, turn_index=4,
+                                       inject_text="한 번 더", max_rounds=3)
+        assert stored == 5
+        assert _rows(db, new_id)[-1].payload["max_rounds"] == 3
+
+
+def test_fork_route_returns_job(sim_db, monkeypatch):
+    src_id, _ = _source_case(sim_db)
+    app = FastAPI()
+    app.include_router(conversations.router)
+
+    def _db():
+        db = sim_db()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _db
+    monkeypatch.setattr(conversations, "SessionLocal", sim_db)
+
+    with TestClient(app) as client:
+        bad = client.post(f"/conversations/{src_id}/fork",
+                          json={"turn_index": 99})
+        assert bad.status_code == 400
+
+        res = client.post(f"/conversations/{src_id}/fork",
+                          json={"turn_index": 2})
+        assert res.status_code == 200
+        body = res.json()
+        assert body["forked_from_case_id"] == str(src_id)
+        assert body["stored_turns"] == 2 and body["status"] == "accepted"
+
+        deadline = time.monotonic() + 10
+        job = client.get(f"/conversations/job/{body['job_id']}").json()
+        while job["status"] == "running" and time.monotonic() < deadline:
+            time.sleep(0.02)
+            job = client.get(f"/conversations/job/{body['job_id']}").json()
+    assert job["status"] == "done" and job["case_id"] == body["case_id"]
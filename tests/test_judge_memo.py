@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.db import models as m
+from app.schemas.llm_outputs import JudgeVerdict
+from app.services import admin_summary, judge_memo
+
+
+@pytest.fixture
+def memo_db(monkeypatch):
+    engine = create_engine("sqlite://",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    m.JudgeMemo.__table__.create(engine)
+    monkeypatch.setattr(judge_memo, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(settings, "JUDGE_MEMO_ENABLED", True)
+    monkeypatch.setattr(settings, "PREJUDGE_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "off")
+    monkeypatch.setattr(settings, "LLM_LEDGER_ENABLED", False)
+    return engine
+
+
+def test_same_victim_dialog_is_judged_once(memo_db, monkeypatch):
+    dialog = {"lines": ["3 [피해자] 네 300만원 보냈어요"]}
+    calls = []
+
+    def _prompt(db, case_id):
+        return None, [], "PROMPT\n" + "\n".join(dialog["lines"])
+
+    def _invoke(role, llm, schema, prompt):
+        calls.append(prompt)
+        return JudgeVerdict(phishing=True, evidence=f"call {len(calls)}")
+
+    monkeypatch.setattr(admin_summary, "_judge_prompt", _prompt)
+    monkeypatch.setattr(admin_summary, "admin_chat", lambda model=None: None)
+    monkeypatch.setattr(admin_summary, "structured_invoke", _invoke)
+
+    first = admin_summary.judge_case(None, "case-1", "m1")
+    again = admin_summary.judge_case(None, "case-1", "m1")
+    assert len(calls) == 1 and again == first
+    assert first["judge_model"] == "m1"
+
+    # 모델 / 프롬프트 버전 / 피해자 발화가 바뀌면 다시 판정
+    admin_summary.judge_case(None, "case-1", "m2")
+    monkeypatch.setattr(settings, "JUDGE_PROMPT_VERSION", "v9")
+    admin_summary.judge_case(None, "case-1", "m2")
+    dialog["lines"].append("5 [피해자] 신고할게요")
+    admin_summary.judge_case(None, "case-1", "m2")
+    assert len(calls) == 4
+
+    st = judge_memo.judge_memo_stats()
+    assert st["hits"] >= 1 and st["errors"] == 0
+
+
+def test_disabled_or_missing_table_falls_through(memo_db, monkeypatch):
+    key = judge_memo.memo_key("p", "m", "v1")
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "replay")
+    assert not judge_memo.memo_enabled()
+
+    m.JudgeMemo.__table__.drop(memo_db)
+    assert judge_memo.memo_get(key) is None
+    judge_memo.memo_put(key, {"phishing": False, "evidence": "e",
+                              "judge_model": "m", "judge_version": "v1"})
@@ -0,0 +1,54 @@
+import json
+import threading
+import uuid
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.core.config import settings
+from app.services import live_judge as lj
+
+
+def test_updates_carry_prior_verdict_and_send_only_new_lines(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", False)
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "off")
+    gate = threading.Event()
+    prompts = []
+    verdicts = iter([True, False, False])
+
+    def _judge(prompt):
+        prompts.append(prompt)
+        gate.wait(5)
+        return AIMessage(json.dumps({
+            "phishing": next(verdicts),
+            "evidence": f"근거 {len(prompts)}"
+        }))
+
+    monkeypatch.setattr(lj, "admin_chat", lambda: RunnableLambda(_judge))
+    judge = lj.LiveJudge(uuid.uuid4(), "{}", ["1 [피해자] 이전 run 발화"])
+    judge.add(1, "누구세요?")  # 첫 갱신이 도는 동안 쌓임 → 한 번에 묶임
+    judge.add(3, "OTP 불러드릴게요")
+    gate.set()
+    judge.result()
+    judge.add(5, "끊을게요")
+    verdict = judge.result()
+
+    assert len(prompts) == 3
+    assert "이전 run 발화" in prompts[0] and lj._NO_PRIOR in prompts[0]
+    assert "누구세요?" in prompts[1] and "OTP 불러드릴게요" in prompts[1]
+    assert "이전 run 발화" not in prompts[1] and "근거 1" in prompts[1]
+    assert "끊을게요" in prompts[2] and "OTP 불러" not in prompts[2]
+    # 한 번 true면 유지
+    assert verdict.phishing is True and verdict.evidence == "근거 3"
+    assert judge.updates == 3 and judge.lines_sent == judge.lines_total == 4
+
+
+def test_failed_update_falls_back(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", False)
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_REASK", 0)
+    monkeypatch.setattr(lj, "admin_chat",
+                        lambda: RunnableLambda(lambda p: AIMessage("oops")))
+    judge = lj.LiveJudge(uuid.uuid4(), "{}", [])
+    judge.add(1, "네")
+    assert judge.result() is None
+    assert lj.LiveJudge(uuid.uuid4(), "{}", []).result().phishing is False
@@ -0,0 +1,92 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.core.config import settings
+from app.services import llm_cache as lcache
+
+
+def _fresh(monkeypatch, backend, **overrides):
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", backend)
+    monkeypatch.setattr(settings, "LLM_CACHE_ROLES", "admin")
+    for k, v in overrides.items():
+        monkeypatch.setattr(settings, k, v)
+    cache = lcache.LLMCache()
+    monkeypatch.setattr(lcache, "llm_cache", cache)
+    return cache
+
+
+def test_memory_lru_evicts_oldest_and_expires(monkeypatch):
+    b = lcache._MemoryBackend(max_entries=2, ttl_sec=0)
+    b.put("a", "A", "admin", "m")
+    b.put("b", "B", "admin", "m")
+    assert b.get("a") == "A"  # a가 최근 사용 → b가 가장 오래됨
+    b.put("c", "C", "admin", "m")
+    assert b.get("b") is None and b.get("a") == "A" and b.get("c") == "C"
+
+    b.ttl_sec = 1
+    monkeypatch.setattr(lcache.time, "time", lambda: 10**12)
+    assert b.get("a") is None
+
+
+def test_cached_chat_reuses_response_only_for_opted_in_roles(
+        monkeypatch, tmp_path):
+    cache = _fresh(monkeypatch,
+                   "sqlite",
+                   LLM_CACHE_SQLITE_PATH=str(tmp_path / "c.sqlite3"))
+    prompt = ChatPromptTemplate.from_messages([("human", "{q}")])
+
+    judge = lcache.wrap_cache(
+        "admin", FakeListChatModel(responses=["첫 판정", "두 번째"]), "m",
+        {"temperature": 1})
+    chain = prompt | judge
+    assert chain.invoke({"q": "같은 입력"}).content == "첫 판정"
+    hit = chain.invoke({"q": "같은 입력"})
+    assert hit.content == "첫 판정"
+    assert hit.response_metadata["llm_cache_hit"] is True
+    assert chain.invoke({"q": "다른 입력"}).content == "두 번째"
+    assert cache.stats()["hits"] == 1
+
+    victim = FakeListChatModel(responses=["x"])
+    assert lcache.wrap_cache("victim", victim, "m", {}) is victim
+
+
+def test_key_uses_public_message_conversion(monkeypatch):
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    from app.services.llm_messages import as_messages
+
+    fake = FakeListChatModel(responses=["x"])
+    prompt = ChatPromptTemplate.from_messages([("system", "s"),
+                                               ("human", "{q}")])
+    for inp in ("hi", [("human", "hi"), ("ai", "yo")],
+                prompt.invoke({"q": "hi"})):
+        assert as_messages(inp) == fake._convert_input(inp).to_messages()
+
+    # 내부 모델이 채팅 모델이 아니어도(다른 래퍼/람다) 키를 만들 수 있음
+    _fresh(monkeypatch, "memory")
+    calls = []
+    llm = RunnableLambda(lambda _: calls.append(1) or AIMessage("ok"))
+    chat = lcache.CachedChat("admin", llm, "m", {})
+    assert chat.invoke("hi").content == "ok"
+    assert chat.invoke("hi").content == "ok" and len(calls) == 1
+
+
+def test_key_covers_invoke_kwargs(monkeypatch):
+    from app.schemas.llm_outputs import JudgeVerdict
+    from app.services.llm_structured import bind_schema
+
+    cache = _fresh(monkeypatch, "memory")
+    chat = lcache.CachedChat(
+        "admin", FakeListChatModel(responses=["평문", '{"phishing": false}']),
+        "m", {})
+
+    def _ask(structured):
+        monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", structured)
+        return bind_schema(chat, JudgeVerdict).invoke("판정").content
+
+    assert _ask(False) == "평문"
+    # response_format이 붙은 호출은 다른 키 → 평문 응답을 재사용하지 않음
+    assert _ask(True) == '{"phishing": false}'
+    assert _ask(False) == "평문" and _ask(True) == '{"phishing": false}'
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,54 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core.config import settings
+from app.db import models as m
+from app.schemas.conversation import ConversationRunRequest
+from app.services import llm_cascade as lc
+from app.services import simulation
+
+
+def _cascade(small_reply):
+    small = FakeListChatModel(responses=[small_reply])
+    strong = FakeListChatModel(responses=["네, 대표번호로 다시 확인해 볼게요."])
+    return lc.CascadeChat(small, strong, "small", "strong")
+
+
+def test_quality_heuristics():
+    assert lc.quality_issue("네? 무슨 일이신데요?") is None
+    assert lc.quality_issue(" ") == "empty"
+    assert lc.quality_issue("피해자: 네 알겠습니다") == "role_leak"
+    assert lc.quality_issue("시뮬레이션을 종료합니다.") == "end_phrase"
+    assert lc.quality_issue("Sure, I can help with that.") == "non_korean"
+    assert lc.quality_issue("네 알겠어요", previous="네 알겠어요") == "repeat"
+
+
+def test_routes_small_first_and_escalates():
+    stats = lc.CascadeStats()
+
+    lc.set_cascade_hint(None, stats)
+    assert _cascade("네? 누구세요?").invoke("hi").content == "네? 누구세요?"
+    # 작은 모델 답이 형식 불량 → 큰 모델 답으로 대체(스트리밍 경로)
+    chunks = list(_cascade("```json```").stream("hi"))
+    assert "".join(c.content for c in chunks).startswith("네, 대표번호")
+    # 트리거가 있으면 작은 모델을 건너뜀
+    lc.set_cascade_hint("key_step", stats)
+    assert _cascade("네? 누구세요?").invoke("hi").content.startswith("네, 대표번호")
+
+    s = stats.summary()
+    assert s["turns"] == 3 and s["small_turns"] == 1
+    assert s["escalations"] == {"quality:format": 1, "key_step": 1}
+
+
+def test_run_cascade_summary_is_stored_on_last_turn(sim_db, monkeypatch):
+    monkeypatch.setattr(settings, "VICTIM_CASCADE", True)
+    with sim_db() as db:
+        case_id, _ = simulation.run_two_bot_simulation(
+            db, ConversationRunRequest(offender_id=1, victim_id=1,
+                                       max_turns=10))
+        rows = (db.query(m.ConversationLog).filter_by(case_id=case_id)
+                .order_by(m.ConversationLog.turn_index).all())
+    stats = rows[-1].payload["run_stats"]
+    # 피해자 LLM 턴만 집계(종료 줄은 LLM 호출 없음)
+    llm_victim_turns = sum(1 for r in rows[:-1] if r.role == "victim")
+    assert stats["cascade"]["turns"] == llm_victim_turns
+    assert set(stats) == {"context", "cascade"}
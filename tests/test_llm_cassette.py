@@ -0,0 +1,37 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core.config import settings
+from app.services import llm_cassette as lc
+
+
+def _chat(mode, responses):
+    return lc.CassetteChat("attacker", lambda: FakeListChatModel(
+        responses=responses), "fake", mode)
+
+
+def test_record_then_replay_returns_same_responses(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CASSETTE_DIR", str(tmp_path))
+
+    rec = _chat("record", ["첫 번째", "두 번째"])
+    with lc.cassette_scope("case-1", 1):
+        lc.set_turn(0)
+        assert rec.invoke("hi").content == "첫 번째"
+        lc.set_turn(2)
+        assert rec.invoke("hi").content == "두 번째"
+
+    # replay: 실제 모델을 만들지 않는다
+    rep = lc.CassetteChat("attacker", lambda: pytest.fail("called model"),
+                          "fake", "replay")
+    with lc.cassette_scope("case-1", 1):
+        lc.set_turn(0)
+        assert rep.invoke("other").content == "첫 번째"
+        lc.set_turn(2)
+        assert rep.invoke("other").content == "두 번째"
+
+
+def test_replay_miss_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CASSETTE_DIR", str(tmp_path))
+    rep = _chat("replay", [])
+    with lc.cassette_scope("missing", 1), pytest.raises(lc.CassetteMiss):
+        rep.invoke("hi")
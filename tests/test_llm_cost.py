@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.core.config import settings
+from app.db import models as m
+from app.schemas.conversation import ConversationRunRequest
+from app.services import llm_cost as lc
+from app.services import simulation
+
+
+def _reply(_):
+    return AIMessage("ok",
+                     response_metadata={"model_name": "gpt-4.1-mini"},
+                     usage_metadata={
+                         "input_tokens": 1_000_000,
+                         "output_tokens": 0,
+                         "total_tokens": 1_000_000,
+                     })
+
+
+def test_price_matches_longest_prefix(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PRICES", {"my-model": [1.0, 2.0]})
+    assert lc.price_for("gpt-4.1-mini-2025-04-14") == (0.40, 1.60)
+    assert lc.price_for("gpt-4.1-2025-04-14") == (2.00, 8.00)
+    assert lc.price_for("my-model") == (1.0, 2.0)
+    assert lc.price_for("unknown") == (0.0, 0.0)
+    assert lc.call_cost("gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(
+        0.75)
+
+
+def test_budget_stops_next_call(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_LEDGER_ENABLED", False)
+    chat = lc.LedgerChat(RunnableLambda(_reply), "victim", "gpt-4.1-mini")
+
+    with lc.ledger_scope(batch_id="b1"), lc.budget_scope("cycle",
+                                                         0.5) as budget:
+        chat.invoke("hi")  # $0.40
+        assert not lc.budget_exhausted()
+        chat.invoke("hi")  # $0.80 → 상한 초과
+        assert budget.spent_usd == pytest.approx(0.8)
+        with pytest.raises(lc.BudgetExceeded):
+            chat.invoke("hi")
+    # 스코프 밖에서는 상한 없음
+    chat.invoke("hi")
+
+
+def test_engine_budget_stop_is_logged_and_marked(sim_db, monkeypatch, caplog):
+    timed_invoke = simulation.timed_invoke
+    calls = []
+
+    def _invoke(chain, inputs, model):
+        calls.append(model)
+        if len(calls) > 2:
+            raise lc.BudgetExceeded("case budget $0.01 exhausted")
+        return timed_invoke(chain, inputs, model)
+
+    monkeypatch.setattr(simulation, "timed_invoke", _invoke)
+    with caplog.at_level(logging.WARNING, logger=simulation.__name__), \
+            sim_db() as db:
+        case_id, turns = simulation.run_two_bot_simulation(
+            db, ConversationRunRequest(offender_id=1, victim_id=1,
+                                       max_turns=10))
+        assert turns == 2
+        assert db.get(m.AdminCase, case_id).status == "budget_exceeded"
+    assert any("[BUDGET]" in r.getMessage() and "stopped at turn 2" in
+               r.getMessage() for r in caplog.records)
@@ -0,0 +1,54 @@
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.core.config import settings
+from app.services import llm_resilience as res
+from app.services.llm_endpoints import PooledChat, endpoint_pool
+
+
+class _HTTPError(Exception):
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _pool(monkeypatch, endpoints):
+    monkeypatch.setattr(settings, "OPENAI_ENDPOINTS", endpoints)
+    return {ep.name: ep for ep in endpoint_pool.endpoints()}
+
+
+def test_least_outstanding_respects_weight_and_model(monkeypatch):
+    _pool(monkeypatch, [
+        {"name": "a", "api_key": "k1", "weight": 2},
+        {"name": "b", "api_key": "k2"},
+        {"name": "local", "base_url": "http://localhost:8001/v1",
+         "models": ["qwen"]},
+    ])
+    picked = [endpoint_pool.acquire("gpt-4.1-mini").name for _ in range(6)]
+    # weight 2:1 → 진행 중 요청이 4:2로 쌓임, 모델을 서빙하지 않는 local은 제외
+    assert picked.count("a") == 4 and picked.count("b") == 2
+    assert endpoint_pool.acquire("qwen").name == "local"
+
+
+def test_failing_endpoint_is_ejected_and_retry_moves_on(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_SEC", 0.0)
+    monkeypatch.setattr(res, "_breakers", {})
+    eps = _pool(monkeypatch, [{"name": "bad", "api_key": "k1"},
+                              {"name": "good", "api_key": "k2"}])
+    eps["good"].outstanding = 1  # 처음엔 bad가 선택되도록
+
+    def _build(ep):
+
+        def _call(_):
+            if ep.name == "bad":
+                raise _HTTPError(503)
+            return AIMessage(ep.name)
+
+        return RunnableLambda(_call)
+
+    chat = res.ResilientChat(PooledChat("gpt-4.1-mini", _build), "openai")
+    assert chat.invoke("hi").content == "good"
+    stats = {s["name"]: s for s in endpoint_pool.stats()}
+    assert not stats["bad"]["healthy"] and stats["bad"]["errors"] == 1
+    assert stats["good"]["outstanding"] == 1 and stats["bad"]["outstanding"] == 0
@@ -0,0 +1,26 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.core.config import settings
+from app.services.llm_fake import fake_chat
+
+
+def test_judge_and_planner_return_valid_deterministic_json(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FAKE_LATENCY_MEDIAN_MS", 0)
+    verdict = json.loads(fake_chat("admin").invoke("대화 A").content)
+    assert set(verdict) == {"phishing", "evidence"}
+    assert json.loads(fake_chat("admin").invoke("대화 A").content) == verdict
+
+    plan = json.loads(fake_chat("planner").invoke("run=1").content)
+    assert plan["guidance"]["type"] in ("P", "A")
+    assert plan["outcome"] in ("attacker_success", "attacker_fail")
+
+
+def test_attacker_ends_after_configured_turns(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FAKE_LATENCY_MEDIAN_MS", 0)
+    monkeypatch.setattr(settings, "LLM_FAKE_ATTACKER_TURNS", 2)
+    history = [AIMessage("a1"), HumanMessage("v1"), AIMessage("a2")]
+    resp = fake_chat("attacker").invoke(history + [HumanMessage("v2")])
+    assert "마무리하겠습니다" in resp.content
+    assert resp.usage_metadata["total_tokens"] > 0
@@ -0,0 +1,47 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core.config import settings
+from app.services import llm_ratelimit as rl
+
+
+def test_bucket_refills_at_per_minute_rate():
+    lim = rl.Limits(rpm=60, tpm=6000, burst_sec=2)  # 용량: 요청 2개, 토큰 200
+    state, wait = rl._take(None, 150, lim, now=0.0)
+    assert wait == 0 and state[1] == 50
+    # 토큰 부족: 100 더 필요 → 분당 6000(초당 100)이면 1초
+    state, wait = rl._take(state, 150, lim, now=0.0)
+    assert abs(wait - 1.0) < 1e-9
+    state, wait = rl._take(state, 150, lim, now=1.0)
+    assert wait == 0
+
+
+def test_file_backend_shares_budget_between_limiters(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_MODE", "file")
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_FILE",
+                        str(tmp_path / "rl.json"))
+    monkeypatch.setattr(settings, "LLM_RPM", 60)
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_BURST_SEC", 1.0)
+    slept = []
+
+    class _Clock:
+        now = 1000.0
+
+        def time(self):
+            return self.now
+
+        def sleep(self, sec):
+            slept.append(sec)
+            self.now += sec
+
+    monkeypatch.setattr(rl, "time", _Clock())
+
+    # 서로 다른 프로세스를 흉내: 한도기 인스턴스 2개가 같은 파일을 사용
+    for _ in range(2):
+        monkeypatch.setattr(rl, "rate_limiter", rl.RateLimiter())
+        chat = rl.limited(FakeListChatModel(responses=["ok"]), "openai",
+                          "fake", "k")
+        assert chat.invoke("hi").content == "ok"
+
+    # 용량 1(초당 1요청) → 두 번째 호출은 기다린 뒤 통과
+    assert slept and rl.rate_limiter.stats()["buckets"]["openai:fake:k"][
+        "throttled"] == 1
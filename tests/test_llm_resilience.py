@@ -0,0 +1,116 @@
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.core.config import settings
+from app.services import llm_resilience as res
+
+
+class _HTTPError(Exception):
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _flaky(errors):
+    """errors를 차례로 던진 뒤 성공하는 가짜 모델."""
+    calls = []
+
+    def _call(_):
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return AIMessage("ok")
+
+    return RunnableLambda(_call), calls
+
+
+@pytest.fixture(autouse=True)
+def _fast(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_SEC", 0.0)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX", 3)
+    monkeypatch.setattr(settings, "LLM_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(res, "_breakers", {})
+
+
+def test_retries_429_and_5xx_but_not_4xx():
+    llm, calls = _flaky([_HTTPError(429), _HTTPError(503)])
+    assert res.ResilientChat(llm, "p1").invoke("hi").content == "ok"
+    assert len(calls) == 3
+    assert res.breaker_for("p1").state == "closed"
+
+    llm, calls = _flaky([_HTTPError(400)])
+    with pytest.raises(_HTTPError):
+        res.ResilientChat(llm, "p2").invoke("hi")
+    assert len(calls) == 1
+
+
+def test_breaker_opens_and_victim_fails_over():
+    broken, calls = _flaky([_HTTPError(500)] * 10)
+    backup, _ = _flaky([])
+    chat = res.FailoverChat(res.ResilientChat(broken, "p3"), backup, "p3",
+                            "backup")
+
+    # 재시도를 다 써도 실패한 호출 2번 → 브레이커 open
+    for _ in range(2):
+        assert chat.invoke("hi").content == "ok"
+    assert len(calls) == 8
+    assert res.breaker_for("p3").state == "open"
+    # 브레이커가 열려 있으면 주 모델을 부르지 않고 바로 전환
+    before = len(calls)
+    assert chat.invoke("hi").content == "ok"
+    assert len(calls) == before
+    assert res.resilience_stats()["p3"]["failovers"] == 3
+
+
+def _open_breaker(name, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BREAKER_RESET_SEC", 0.0)
+    br = res.breaker_for(name)
+    br.failure()
+    br.failure()
+    assert br.state == "open"
+    return br
+
+
+def test_cancelled_probe_releases_half_open(monkeypatch):
+    import asyncio
+
+    br = _open_breaker("p4", monkeypatch)
+
+    async def _hang(_):
+        await asyncio.sleep(10)
+
+    chat = res.ResilientChat(RunnableLambda(lambda _: None, afunc=_hang), "p4")
+
+    async def _cancel_probe():
+        task = asyncio.create_task(chat.ainvoke("hi"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_cancel_probe())
+    assert br.state == "half_open" and br.allow()
+
+
+def test_abandoned_stream_probe_releases_half_open(monkeypatch):
+    br = _open_breaker("p5", monkeypatch)
+
+    def _chunks(_):
+        yield AIMessage("a")
+        yield AIMessage("b")
+
+    chat = res.ResilientChat(RunnableLambda(_chunks), "p5")
+    it = chat.stream("hi")
+    next(it)
+    it.close()  # GeneratorExit
+    assert br.allow()
+
+
+def test_stale_probe_times_out(monkeypatch):
+    br = _open_breaker("p6", monkeypatch)
+    assert br.allow()  # 시험 호출이 결과를 알리지 않고 사라짐
+    assert not br.allow()
+    monkeypatch.setattr(settings, "LLM_BREAKER_PROBE_TIMEOUT_SEC", 0.0)
+    assert br.allow()
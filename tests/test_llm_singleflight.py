@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.services import llm_fake
+from app.services import llm_singleflight as sf
+
+
+def test_concurrent_identical_calls_share_one_upstream(monkeypatch):
+    monkeypatch.setattr(sf, "single_flight", sf.SingleFlight())
+    monkeypatch.setattr(settings, "LLM_FAKE_LATENCY_MEDIAN_MS", 200)
+    monkeypatch.setattr(settings, "LLM_FAKE_LATENCY_SIGMA", 0.0)
+    calls = []
+    reply = llm_fake.fake_reply
+    monkeypatch.setattr(llm_fake, "fake_reply",
+                        lambda *a: calls.append(1) or reply(*a))
+    chat = sf.SingleFlightChat("admin", llm_fake.fake_chat("admin"), "fake",
+                               {})
+
+    out = []
+    threads = [
+        threading.Thread(target=lambda: out.append(chat.invoke("same")))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len({m.content for m in out}) == 1 and len(out) == 5
+
+    async def _many():
+        return await asyncio.gather(*(chat.ainvoke(p)
+                                      for p in ["a", "a", "a", "b"]))
+
+    assert len(asyncio.run(_many())) == 4
+    assert len(calls) == 3  # "a" 1번 + "b" 1번
+    stats = sf.single_flight.stats()
+    assert stats["calls"] == 3 and stats["coalesced"] == 6
@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core.config import settings
+from app.schemas.llm_outputs import JudgeVerdict, PlannerOutput
+from app.services import llm_structured as ls
+
+
+def test_reask_only_after_validation_failure(monkeypatch):
+    monkeypatch.setattr(ls, "_stats", ls._Stats())
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", False)
+    llm = FakeListChatModel(responses=[
+        '{"phishing": true, "evidence": "계좌 이체 요구"}',
+        '```json\n{"phishing": "yes"}\n```',
+        '{"phishing": false, "evidence": "대화 종료"}',
+    ])
+
+    ok = ls.structured_invoke("admin", llm, JudgeVerdict, "첫 판정")
+    assert ok.phishing is True
+    fixed = ls.structured_invoke("admin", llm, JudgeVerdict, "둘째 판정")
+    assert fixed == JudgeVerdict(phishing=False, evidence="대화 종료")
+
+    st = ls.structured_stats()["admin"]
+    assert st["calls"] == 2 and st["parse_failures"] == 1
+    assert st["reasks"] == 1 and st["reask_ok"] == 1 and st["failed"] == 0
+    assert st["parse_failure_rate"] == 0.5
+
+
+def test_gives_up_after_reask_budget(monkeypatch):
+    monkeypatch.setattr(ls, "_stats", ls._Stats())
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", False)
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_REASK", 1)
+    llm = FakeListChatModel(responses=["not json", "{}"])
+    with pytest.raises(ls.StructuredOutputError):
+        ls.structured_invoke("planner", llm, PlannerOutput, "x")
+    assert ls.structured_stats()["planner"]["failed"] == 1
+
+
+def test_response_format_is_strict_json_schema():
+    fmt = ls.response_format(PlannerOutput)
+    assert fmt["type"] == "json_schema"
+    assert fmt["json_schema"]["strict"] is True
+    schema = fmt["json_schema"]["schema"]
+    assert set(schema["required"]) == set(schema["properties"])
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.core.config import settings
+from app.services import monte_carlo as mc
+from app.services import opening_cache as oc
+
+
+def test_wilson_interval_bounds():
+    lo, hi = mc.wilson_interval(0, 10)
+    assert lo < 1e-9 and 0.2 < hi < 0.35
+    lo, hi = mc.wilson_interval(5, 10)
+    assert lo < 0.5 < hi
+
+
+def test_stops_launching_once_interval_is_tight(monkeypatch):
+
+    async def _fake_sample(req):
+        await asyncio.sleep(0)
+        return {"case_id": "x", "turns": 4, "phishing": False}
+
+    monkeypatch.setattr(mc, "_one_sample", _fake_sample)
+
+    async def _collect():
+        return [
+            ev async for ev in mc.run_monte_carlo(
+                object(), 500, concurrency=4, ci_half_width=0.1, min_samples=5)
+        ]
+
+    events = asyncio.run(_collect())
+    summary = events[-1]
+    assert summary["type"] == "summary"
+    assert summary["stopped_early"] is True
+    assert summary["launched"] < 500
+    assert summary["ci_half_width"] <= 0.1
+    assert len([e for e in events if e["type"] == "sample"]) == summary["completed"]
+
+
+def test_monte_carlo_samples_bypass_pool(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "off")
+    monkeypatch.setattr(oc, "opening_cache", oc.OpeningCache(pool_size=4))
+    seen = []
+
+    async def _sim(db, req):
+        seen.append(oc.opening_cache.enabled)
+        return "case", 2
+
+    class _Db:
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(mc, "SessionLocal", _Db)
+    monkeypatch.setattr(mc, "run_two_bot_simulation_async", _sim)
+    monkeypatch.setattr(mc, "_read_verdict", lambda db, case_id: True)
+    asyncio.run(mc._one_sample(object()))
+    assert seen == [False] and oc.opening_cache.enabled
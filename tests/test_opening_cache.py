@@ -0,0 +1,51 @@
+from app.core.config import settings
+from app.services import opening_cache as oc
+
+
+def _gen():
+    n = [0]
+
+    def generate():
+        n[0] += 1
+        return f"opening {n[0]}"
+
+    return n, generate
+
+
+def test_fills_pool_then_reuses(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "off")
+    monkeypatch.setattr(oc, "opening_cache", oc.OpeningCache(pool_size=2))
+    calls, generate = _gen()
+    inputs = oc.opening_inputs("1단계: 기관 사칭")
+
+    texts = [oc.cached_opening(inputs, generate) for _ in range(6)]
+    assert calls[0] == 2
+    assert set(texts) == {"opening 1", "opening 2"}
+    st = oc.opening_cache.stats()
+    assert st["hits"] == 4 and st["misses"] == 2
+    # 다른 단계는 다른 풀
+    oc.cached_opening(oc.opening_inputs("다른 단계"), generate)
+    assert calls[0] == 3
+
+
+def test_off_by_default_and_bypassed(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "off")
+    monkeypatch.setattr(oc, "opening_cache", oc.OpeningCache())
+    assert type(settings).model_fields["OPENING_CACHE_POOL_SIZE"].default == 0
+    monkeypatch.setattr(settings, "OPENING_CACHE_POOL_SIZE", 0)
+    assert not oc.opening_cache.enabled
+
+    monkeypatch.setattr(oc, "opening_cache", oc.OpeningCache(pool_size=1))
+    calls, generate = _gen()
+    inputs = oc.opening_inputs("1단계")
+    # cassette 녹화/재생 중에는 항상 새로 생성
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "replay")
+    oc.cached_opening(inputs, generate)
+    oc.cached_opening(inputs, generate)
+    assert calls[0] == 2 and oc.opening_cache.stats()["keys"] == 0
+    # 호출 단위 우회
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "off")
+    with oc.opening_cache_bypass():
+        assert oc.cached_opening(inputs, generate) == "opening 3"
+    assert oc.opening_cache.enabled
+
@@ -0,0 +1,52 @@
+from app.services.prejudge import PREJUDGE_TAG, agreement, prejudge
+
+
+def test_completed_actions_are_decided_true():
+    v = prejudge([(1, "누구세요?"), (3, "네, 지금 300만원 송금했어요.")])
+    assert v.phishing is True
+    assert v.evidence.startswith(PREJUDGE_TAG) and "turn 3" in v.evidence
+    assert prejudge([(5, "인증번호는 482913이에요")]).phishing is True
+    assert prejudge([(1, "앱 깔았어요")]).phishing is True
+
+
+def test_negation_and_questions_go_to_llm():
+    assert prejudge([(1, "송금했어야 하나요?")]).phishing is None
+    assert prejudge([(1, "아직 안 깔았어요")]).phishing is None
+    assert prejudge([(1, "인증번호는 왜 필요하세요?")]).phishing is None
+    # 실행과 방어가 섞이면 애매
+    assert prejudge([(1, "앱 설치했는데 신고할게요")]).phishing is None
+
+
+def test_clear_defense_is_decided_false():
+    v = prejudge([(1, "계좌번호는 못 알려드려요."), (3, "대표번호로 확인하고 끊겠습니다.")])
+    assert v.phishing is False
+    # 방어 없는 위험 언급 / 신호 없음은 LLM으로
+    assert prejudge([(1, "계좌 확인이요? 잠깐만요"), (3, "끊을게요")]).phishing is None
+    assert prejudge([(1, "네 알겠습니다.")]).phishing is None
+
+
+def test_compliance_is_never_defended():
+    # 따르겠다는 발화 / 돈 언급은 방어처럼 보이는 구절이 있어도 LLM으로
+    for text in (
+            "네 검사님, 지금 은행에 가서 돈 찾아서 말씀하신 분께 드릴게요",
+            "대표번호 맞네요. 말씀하신 대로 할게요",
+            "경찰에서 연락 주신 거죠? 현금 찾아올게요",
+            "끊지 말라고요? 네 그럼 은행 가겠습니다",
+            "신고는 나중에 하고 일단 보낼게요",
+    ):
+        assert prejudge([(1, text)]).phishing is None, text
+    assert prejudge([(1, "안 할게요. 신고할게요")]).phishing is False
+
+
+def test_agreement_report():
+    corpus = [
+        (True, [(1, "이체 완료했습니다")]),
+        (False, [(1, "보이스피싱 같네요. 신고하겠습니다")]),
+        (False, [(1, "OTP 불러드릴게요")]),
+        (True, [(1, "네")]),
+    ]
+    r = agreement(corpus, show=5)
+    assert r["cases"] == 4 and r["local"] == 3 and r["agree"] == 2
+    assert r["confusion"] == {"tt": 1, "tf": 1, "ft": 0, "ff": 1}
+    assert r["ambiguous"] == {"no_signal": 1}
+    assert len(r["disagreements"]) == 1
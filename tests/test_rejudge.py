@@ -0,0 +1,62 @@
+import asyncio
+import json
+import random
+import uuid
+from types import SimpleNamespace
+
+import rejudge
+
+
+class _Session:
+
+    def close(self):
+        pass
+
+
+def _args(**kw):
+    base = dict(limit=0, concurrency=4, batch_size=3, model=None)
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_batches_writes_and_checkpoints_contiguous_prefix(monkeypatch, tmp_path):
+    ids = sorted(uuid.uuid4() for _ in range(10))
+    written = []
+
+    def _page(db, spec, after, size):
+        rest = [i for i in ids if after is None or str(i) > after]
+        return [(i, False) for i in rest[:size]]
+
+    async def _judge(db, case_id, model):
+        await asyncio.sleep(random.random() / 100)  # 순서 뒤섞임
+        if case_id == ids[7]:
+            raise ValueError("bad json")
+        return {"phishing": case_id == ids[0], "evidence": "e",
+                "judge_model": "m", "judge_version": "v2"}
+
+    async def _aclose():
+        pass
+
+    monkeypatch.setattr(rejudge, "fetch_page", _page)
+    monkeypatch.setattr(rejudge, "write_batch",
+                        lambda db, rows: written.append(len(rows)))
+    monkeypatch.setattr(rejudge, "judge_case_async", _judge)
+    monkeypatch.setattr(rejudge, "SessionLocal", _Session)
+    monkeypatch.setattr(rejudge, "aclose_llm_clients", _aclose)
+
+    path = tmp_path / "ck.json"
+    ck = rejudge.Checkpoint(str(path), {"status": "completed"})
+    job = rejudge.Rejudge(_args(), ck, total=len(ids))
+    asyncio.run(job.run())
+
+    assert sum(written) == 9 and max(written) <= 3
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert saved["cursor"] == str(ids[-1])
+    assert saved["done"] == 9 and saved["changed"] == 1
+    assert saved["failed"] == [str(ids[7])]
+
+    # 재개: 커서 이후만 다시 조회 → 남은 대상 없음
+    ck2 = rejudge.Checkpoint.load(str(path), {"status": "completed"})
+    job2 = rejudge.Rejudge(_args(), ck2, total=0)
+    asyncio.run(job2.run())
+    assert sum(written) == 9 and ck2.done == 9
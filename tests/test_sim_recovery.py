@@ -0,0 +1,118 @@
+import uuid
+
+from app.db import models as m
+from app.schemas.conversation import ConversationRunRequest
+from app.services import sim_recovery, simulation as sim
+from tests.conftest import STEPS
+
+
+def _interrupted_case(Session, keep: int) -> uuid.UUID:
+    """가짜 프로바이더로 끝까지 돌린 뒤 앞 keep턴만 남기고 running으로 되돌림(워커 중단 흉내)."""
+    with Session() as db:
+        case_id, _ = sim.run_two_bot_simulation(
+            db, ConversationRunRequest(offender_id=1, victim_id=1,
+                                       max_turns=10))
+        db.query(m.ConversationLog).filter(
+            m.ConversationLog.turn_index >= keep).delete()
+        case = db.get(m.AdminCase, case_id)
+        case.status, case.phishing, case.completed_at = "running", None, None
+        db.commit()
+    return case_id
+
+
+def _legacy_case(Session, turns: list[int], payload: dict) -> uuid.UUID:
+    with Session() as db:
+        case = m.AdminCase(scenario={}, status="running")
+        db.add(case)
+        db.flush()
+        for i in turns:
+            db.add(m.ConversationLog(case_id=case.id, offender_id=1,
+                                     victim_id=1, turn_index=i,
+                                     role="offender" if i % 2 == 0 else
+                                     "victim", content=f"t{i}",
+                                     payload=payload, run=1))
+        db.commit()
+        return case.id
+
+
+def _statuses(Session) -> dict:
+    with Session() as db:
+        return dict(db.query(m.AdminCase.id, m.AdminCase.status).all())
+
+
+def test_replay_turns_restores_run_state():
+    ctx = sim._SimContext(case_id=uuid.uuid4(), offender_id=1, victim_id=1,
+                          run_no=2, use_agent=False, guidance_text=None,
+                          guidance_type=None, steps=list(STEPS),
+                          victim_meta={}, victim_knowledge={},
+                          victim_traits={}, max_rounds=10)
+    run = sim._SimRun(ctx)
+    rows = sim._replay_turns(run, [
+        {"role": "offender", "content": "a0", "label": None},
+        {"role": "victim", "content": "v1", "label": "defend"},
+        {"role": "offender", "content": "a2", "label": None},
+    ])
+    assert [r["turn_index"] for r in rows] == [0, 1, 2]
+    assert {r["run"] for r in rows} == {2} and rows[1]["label"] == "defend"
+    assert (run.st.attacks, run.st.replies, run.st.current_step_idx) == (2, 1, 2)
+    assert run.next_role() == "victim" and run.st.last_offender_text == "a2"
+    assert len(run.st.history_victim) == 3
+
+
+def test_sweep_resumes_interrupted_run(sim_db):
+    case_id = _interrupted_case(sim_db, keep=3)
+    assert sim_recovery.find_stalled_cases(sim_db(), stale_sec=3600) == []
+
+    out = sim_recovery.sweep_stalled_cases(stale_sec=0)
+    assert [(r["case_id"], r["status"]) for r in out] == [(str(case_id),
+                                                            "resumed")]
+    with sim_db() as db:
+        rows = (db.query(m.ConversationLog).filter_by(case_id=case_id)
+                .order_by(m.ConversationLog.turn_index).all())
+        case = db.get(m.AdminCase, case_id)
+        assert [r.turn_index for r in rows] == list(range(8))
+        assert [r.role for r in rows] == ["offender", "victim"] * 4
+        assert rows[-1].content == sim.VICTIM_END_LINE
+        assert case.status == "completed" and case.phishing is not None
+    # 재개 후에는 더 이상 멈춘 케이스가 아님
+    assert sim_recovery.sweep_stalled_cases(stale_sec=0) == []
+
+
+def test_sweep_leaves_unmarked_cases_alone(sim_db, monkeypatch):
+    ok = _interrupted_case(sim_db, keep=2)
+    legacy = _legacy_case(sim_db, [0, 1, 2], payload={})
+    gap = _legacy_case(sim_db, [0, 2], payload={"max_rounds": 10})
+    empty = _legacy_case(sim_db, [], payload={})
+
+    assert sim_recovery.find_stalled_cases(sim_db(), stale_sec=0) == [ok]
+
+    def _resume(db, case_id):
+        raise ValueError("no longer resumable")
+
+    monkeypatch.setattr(sim_recovery, "resume_simulation", _resume)
+    out = sim_recovery.sweep_stalled_cases(stale_sec=0)
+    assert [r["status"] for r in out] == ["skipped"]
+    st = _statuses(sim_db)
+    assert all(st[c] == "running" for c in (ok, legacy, gap, empty))
+
+
+def test_claim_is_exclusive_and_failures_stay_resuming(sim_db, monkeypatch):
+    case_id = _interrupted_case(sim_db, keep=3)
+    with sim_db() as db:
+        assert sim_recovery.claim_case(db, case_id, from_status="running")
+        assert not sim_recovery.claim_case(db, case_id, from_status="running")
+        db.query(m.AdminCase).filter_by(id=case_id).update(
+            {"status": "running"})
+        db.commit()
+
+    def _resume(db, case_id):
+        raise RuntimeError("LLM down")
+
+    monkeypatch.setattr(sim_recovery, "resume_simulation", _resume)
+    out = sim_recovery.sweep_stalled_cases(stale_sec=0)
+    assert out[0]["status"] == "error"
+    assert _statuses(sim_db)[case_id] == "resuming"
+    # resuming은 자동 스위프에서 다시 잡지 않음(수동 재시도만)
+    assert sim_recovery.sweep_stalled_cases(stale_sec=0) == []
+    assert len(sim_recovery.sweep_stalled_cases(stale_sec=0,
+                                                retry_resuming=True)) == 1
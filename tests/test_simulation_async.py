@@ -0,0 +1,44 @@
+import asyncio
+
+from app.core.config import settings
+from app.db import models as m
+from app.schemas.conversation import ConversationRunRequest
+from app.services import simulation as sim
+from app.services.llm_fake import FakeChatModel
+
+
+def test_concurrent_async_runs_keep_their_own_turns(sim_db, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FAKE_LATENCY_MEDIAN_MS", 5)
+    # 두 실행의 LLM 대기가 실제로 겹치는지 기록
+    active, overlap = [0], [0]
+    agenerate = FakeChatModel._agenerate
+
+    async def _agenerate(self, *args, **kwargs):
+        active[0] += 1
+        overlap[0] = max(overlap[0], active[0])
+        try:
+            return await agenerate(self, *args, **kwargs)
+        finally:
+            active[0] -= 1
+
+    monkeypatch.setattr(FakeChatModel, "_agenerate", _agenerate)
+
+    reqs = [
+        ConversationRunRequest(offender_id=1, victim_id=1, max_turns=10)
+        for _ in range(2)
+    ]
+    results = asyncio.run(sim.run_simulations_async(reqs, concurrency=2))
+    assert not any(isinstance(r, BaseException) for r in results), results
+    assert overlap[0] == 2
+    assert len({case_id for case_id, _ in results}) == 2
+
+    with sim_db() as db:
+        for case_id, turns in results:
+            rows = (db.query(m.ConversationLog).filter_by(case_id=case_id)
+                    .order_by(m.ConversationLog.turn_index).all())
+            assert [r.turn_index for r in rows] == list(range(turns))
+            assert [r.role for r in rows] == ["offender", "victim"] * (turns // 2)
+            assert rows[-2].content == "여기서 마무리하겠습니다."
+            assert rows[-1].content == sim.VICTIM_END_LINE
+            case = db.get(m.AdminCase, case_id)
+            assert case.status == "completed" and case.phishing is not None
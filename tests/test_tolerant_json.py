@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core.config import settings
+from app.schemas.llm_outputs import JudgeVerdict
+from app.services import llm_structured as ls
+from app.utils.tolerant_json import TolerantJSONError, tolerant_loads
+from tolerant_json_bench import bench, load_corpus
+
+CORPUS = str(Path(__file__).parent / "data" / "llm_malformed_outputs.jsonl")
+
+
+@pytest.mark.parametrize("case", load_corpus(CORPUS),
+                         ids=lambda c: c["id"])
+def test_corpus(case):
+    if case["expect"] is None:
+        with pytest.raises(TolerantJSONError):
+            tolerant_loads(case["raw"])
+    else:
+        assert tolerant_loads(case["raw"]) == case["expect"]
+
+
+def test_well_formed_json_matches_json_loads():
+    doc = {
+        "a": [1, -2.5e3, True, None, {"b": ""}],
+        "q": "따옴표 \" 와 ” 그리고 ' , } ] 포함",
+        "u": "é😀\n\t\\",
+        "'키'": {"x": []},
+    }
+    for ensure_ascii in (True, False):
+        for indent in (None, 2):
+            s = json.dumps(doc, ensure_ascii=ensure_ascii, indent=indent)
+            assert tolerant_loads(s) == json.loads(s)
+
+
+def test_deep_nesting_is_a_value_error():
+    with pytest.raises(TolerantJSONError):
+        tolerant_loads("[" * 5000)
+    with pytest.raises(TolerantJSONError):
+        tolerant_loads('{"a": ' * 5000 + "1")
+    assert tolerant_loads("[" * 10 + "1") == [[[[[[[[[[1]]]]]]]]]]
+
+
+def test_deep_nesting_goes_to_reask(monkeypatch):
+    monkeypatch.setattr(ls, "_stats", ls._Stats())
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", False)
+    llm = FakeListChatModel(responses=[
+        "[" * 5000,
+        '{"phishing": false, "evidence": "대화 종료"}',
+    ])
+    out = ls.structured_invoke("admin", llm, JudgeVerdict, "판정")
+    assert out.phishing is False
+    assert ls.structured_stats()["admin"]["reask_ok"] == 1
+
+
+def test_structured_invoke_repairs_without_reask(monkeypatch):
+    monkeypatch.setattr(ls, "_stats", ls._Stats())
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", False)
+    llm = FakeListChatModel(responses=[
+        '```json\n{"phishing": true, "evidence": "turn 3 "송금했어요" 확인",}\n```',
+    ])
+    out = ls.structured_invoke("admin", llm, JudgeVerdict, "판정")
+    assert out == JudgeVerdict(phishing=True, evidence='turn 3 "송금했어요" 확인')
+    st = ls.structured_stats()["admin"]
+    assert st["repaired"] == 1 and st["parse_failures"] == 0
+    assert st["reasks"] == 0
+
+
+def test_bench_reports_every_parser():
+    report = bench(load_corpus(CORPUS), repeat=1)
+    tol = report["parsers"]["tolerant"]
+    assert tol["correct"] == report["labeled"]
+    assert tol["correct"] > report["parsers"]["strict"]["correct"]
@@ -0,0 +1,95 @@
+from uuid import uuid4
+
+from app.services.turn_buffer import TurnBuffer
+
+
+class _FakeSession:
+
+    def __init__(self):
+        self.batches = []
+        self.commits = 0
+
+    def execute(self, stmt, rows):
+        self.batches.append(list(rows))
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def _row(turn_index: int) -> dict:
+    return {
+        "case_id": uuid4(),
+        "offender_id": 1,
+        "victim_id": 1,
+        "turn_index": turn_index,
+        "role": "offender" if turn_index % 2 == 0 else "victim",
+        "content": f"turn {turn_index}",
+    }
+
+
+def test_flush_every_n_turns():
+    db = _FakeSession()
+    buf = TurnBuffer(db, flush_every=3, flush_interval=60)
+    due = [buf.add(_row(i)) for i in range(3)]
+    assert due == [False, False, True]
+    assert buf.flush() == 3
+    assert db.commits == 1 and len(db.batches[0]) == 3
+    assert len(buf) == 0 and buf.flush() == 0
+
+
+def test_flush_on_interval():
+    now = [0.0]
+    buf = TurnBuffer(_FakeSession(),
+                     flush_every=10,
+                     flush_interval=2.0,
+                     clock=lambda: now[0])
+    assert buf.add(_row(0)) is False
+    now[0] = 2.5
+    assert buf.add(_row(1)) is True
+
+
+def test_rejects_wrong_role_order():
+    buf = TurnBuffer(_FakeSession())
+    bad = _row(0)
+    bad["role"] = "victim"
+    try:
+        buf.add(bad)
+    except ValueError:
+        return
+    raise AssertionError("role/turn mismatch must raise")
+
+
+class _FailingSession(_FakeSession):
+
+    def __init__(self, fail_times: int):
+        super().__init__()
+        self.fail_times = fail_times
+        self.rollbacks = 0
+
+    def commit(self):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("db down")
+        super().commit()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_failed_flush_keeps_rows_for_retry():
+    db = _FailingSession(fail_times=2)
+    buf = TurnBuffer(db, flush_every=10, flush_interval=60)
+    buf.add(_row(0), _row(1))
+    try:
+        buf.flush()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("flush must re-raise")
+    assert len(buf) == 2 and db.rollbacks == 1
+    # 예외 처리 중 마지막 flush는 로그만 남기고 예외를 올리지 않음
+    assert buf.flush_quietly() == 0 and len(buf) == 2
+    assert buf.flush() == 2 and len(buf) == 0 and buf.rows_written == 2
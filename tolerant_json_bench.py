@@ -0,0 +1,174 @@
+# tolerant_json_bench.py
+"""
+관대한 JSON 파서 벤치마크: 깨진 LLM 출력 코퍼스에서 파서별 복구율·정확도·속도 비교.
+
+  python tolerant_json_bench.py --repeat 200
+  python tolerant_json_bench.py --cassettes cassettes   # 녹화된 실제 출력도 포함
+
+- 코퍼스(JSONL): {"id", "role", "raw", "expect"} — expect가 null이면 "JSON 없음"이 정답
+- 새로 발견한 깨진 출력은 코퍼스에 한 줄씩 추가
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from app.utils.tolerant_json import tolerant_loads
+
+DEFAULT_CORPUS = str(
+    Path(__file__).resolve().parent / "tests" / "data" /
+    "llm_malformed_outputs.jsonl")
+# cassette에서 가져올 역할(JSON을 내는 역할만)
+JSON_ROLES = ("admin", "planner", "assessor", "agent")
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--corpus", default=DEFAULT_CORPUS, help="코퍼스 JSONL 경로")
+    p.add_argument("--cassettes", default=None,
+                   help="LLM cassette 디렉터리(판정/플래너/사후평가 녹화 출력 추가)")
+    p.add_argument("--repeat", type=int, default=200, help="속도 측정 반복 횟수")
+    p.add_argument("--show", type=int, default=5, help="실패 예시 출력 개수(tolerant)")
+    p.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    return p.parse_args()
+
+
+def load_corpus(path: str, cassettes: str | None = None) -> List[Dict[str, Any]]:
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                corpus.append(json.loads(line))
+    if cassettes:
+        for fp in sorted(Path(cassettes).glob("*.jsonl")):
+            with fp.open(encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    if rec.get("role") in JSON_ROLES:
+                        corpus.append({
+                            "id": f"{fp.stem}:{rec['key']}",
+                            "role": rec["role"],
+                            "raw": rec["content"],
+                        })
+    return corpus
+
+
+def _legacy_loads(s: str) -> Any:
+    """예전 admin_summary의 느슨한 파서(블록 추출 → 정규식 보정 → json.loads → ast) 비교용."""
+    start = s.find("{")
+    raw = s.strip()
+    if start != -1:
+        stack: List[str] = []
+        in_str = esc = False
+        end = None
+        for i in range(start, len(s)):
+            ch = s[i]
+            if in_str:
+                if esc:
+                    esc = False
+                elif ch == "\\":
+                    esc = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch in "{[":
+                stack.append("}" if ch == "{" else "]")
+            elif ch in "}]" and stack and stack[-1] == ch:
+                stack.pop()
+                if not stack:
+                    end = i
+                    break
+        raw = s[start:end + 1] if end is not None else s[start:] + "".join(
+            reversed(stack))
+    fixed = (raw.replace("“", "\"").replace("”", "\"").replace("’",
+                                                               "'").replace(
+                                                                   "‘", "'"))
+    fixed = re.sub(r'(:\s*)0+(\d+)(\s*[,\}])', r': \2\3', fixed)
+    fixed = re.sub(r",(\s*[}\]])", r"\1", fixed)
+    try:
+        return json.loads(fixed)
+    except json.JSONDecodeError:
+        pass
+    py_like = re.sub(r'\btrue\b', 'True', fixed)
+    py_like = re.sub(r'\bfalse\b', 'False', py_like)
+    py_like = re.sub(r'\bnull\b', 'None', py_like)
+    return ast.literal_eval(py_like)
+
+
+PARSERS: Dict[str, Callable[[str], Any]] = {
+    "strict": json.loads,
+    "legacy": _legacy_loads,
+    "tolerant": tolerant_loads,
+}
+
+
+def _try(fn: Callable[[str], Any], raw: str) -> tuple[bool, Any]:
+    try:
+        return True, fn(raw)
+    except Exception:
+        return False, None
+
+
+def bench(corpus: List[Dict[str, Any]], repeat: int = 200,
+          show: int = 5) -> Dict[str, Any]:
+    labeled = [c for c in corpus if "expect" in c]
+    report: Dict[str, Any] = {
+        "entries": len(corpus),
+        "labeled": len(labeled),
+        "parsers": {},
+    }
+    for name, fn in PARSERS.items():
+        parsed = correct = 0
+        failures = []
+        for c in corpus:
+            ok, got = _try(fn, c["raw"])
+            parsed += ok and isinstance(got, (dict, list))
+            if "expect" in c:
+                if (got if ok else None) == c["expect"]:
+                    correct += 1
+                elif len(failures) < show:
+                    failures.append({"id": c["id"], "got": got})
+        started = time.perf_counter()
+        for _ in range(max(1, repeat)):
+            for c in corpus:
+                _try(fn, c["raw"])
+        elapsed = time.perf_counter() - started
+        report["parsers"][name] = {
+            "parsed": parsed,
+            "correct": correct,
+            "accuracy": round(correct / len(labeled), 4) if labeled else 0.0,
+            "us_per_doc":
+            round(elapsed / (max(1, repeat) * max(1, len(corpus))) * 1e6, 2),
+            "failures": failures,
+        }
+    return report
+
+
+def main():
+    args = parse_args()
+    report = bench(load_corpus(args.corpus, args.cassettes),
+                   repeat=args.repeat,
+                   show=args.show)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+        return
+    print(f"[TOLERANT-JSON] corpus={report['entries']} "
+          f"labeled={report['labeled']}")
+    for name, st in report["parsers"].items():
+        print(f"  {name:<9} parsed={st['parsed']}/{report['entries']} "
+              f"correct={st['correct']}/{report['labeled']} "
+              f"({st['accuracy'] * 100:.1f}%) {st['us_per_doc']:.1f}us/doc")
+    for f in report["parsers"]["tolerant"]["failures"]:
+        print(f"  - tolerant miss {f['id']}: {f['got']!r}"[:300])
+
+
+if __name__ == "__main__":
+    main()